@@ -0,0 +1,39 @@
+# The rules of chess, importable without side effects, in modules that
+# each import only the ones above them:
+#   bitboards  square numbering, move encoding, the attack and Zobrist tables
+#   scores     material and piece-square tables of the static evaluation
+#   board      the bitboard position and legal move generation
+#   game       SAN and LAN notation and Game, the headless rules engine
+#   terminal   the terminal game: chess, player, the piece classes and board_view
+# Everything is re-exported here, so 'from Chess import ...' keeps working.
+# __all__ lists the re-exports, which also keeps linters from reporting them unused.
+from .bitboards import (WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, p_symbols, p_names, colors,
+                        FULL, QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EP_CAPTURE, PROMOTION,
+                        PROMO_CAPTURE, WK, WQ, BK, BQ, CASTLE_MASK, PACKED, square, square_pos, encode, uci,
+                        bits, DIRECTIONS, ROOK_DIRS, BISHOP_DIRS, walk, TABLES_VERSION, TABLES_CACHE,
+                        ZOBRIST_PIECE, ZOBRIST_SIDE, ZOBRIST_CASTLE, ZOBRIST_EP, KNIGHT_ATTACKS, KING_ATTACKS,
+                        PAWN_ATTACKS, RAYS, BETWEEN, LINE, ROOK_MASK, BISHOP_MASK, ROOK_TABLE, BISHOP_TABLE,
+                        rook_attacks, bishop_attacks)
+from .scores import (MG_VALUES, EG_VALUES, MG_TABLES, EG_TABLES, PHASE_WEIGHTS, FULL_PHASE, EG_SHIFT, PSQT,
+                     unpack_score)
+from .board import position, iter_legal_moves, legal_moves, has_legal_move
+from .game import (IllegalMoveError, AmbiguousMoveError, FILE_TOKEN, RANK_TOKEN, PIECE_TOKEN, CAPTURE_TOKEN,
+                   DASH_TOKEN, PROMO_TOKEN, SAN_TOKENS, FILE_A, NOTATION_CACHE, MOVE_CACHE, parse_notation,
+                   resolve, parse_move, square_name, san, lan, Game)
+from .terminal import (move_parse, chess, player, board_view, glyph, RANK_CACHE, rank_line, board_text, piece,
+                       Pawn, Rook, Knight, Bishop, Queen, King, piece_classes)
+
+__all__ = ['WHITE', 'BLACK', 'PAWN', 'KNIGHT', 'BISHOP', 'ROOK', 'QUEEN', 'KING', 'p_symbols', 'p_names',
+           'colors', 'FULL', 'QUIET', 'DOUBLE_PUSH', 'KING_CASTLE', 'QUEEN_CASTLE', 'CAPTURE', 'EP_CAPTURE',
+           'PROMOTION', 'PROMO_CAPTURE', 'WK', 'WQ', 'BK', 'BQ', 'CASTLE_MASK', 'PACKED', 'square',
+           'square_pos', 'encode', 'uci', 'bits', 'DIRECTIONS', 'ROOK_DIRS', 'BISHOP_DIRS', 'walk',
+           'TABLES_VERSION', 'TABLES_CACHE', 'ZOBRIST_PIECE', 'ZOBRIST_SIDE', 'ZOBRIST_CASTLE',
+           'ZOBRIST_EP', 'KNIGHT_ATTACKS', 'KING_ATTACKS', 'PAWN_ATTACKS', 'RAYS', 'BETWEEN', 'LINE',
+           'ROOK_MASK', 'BISHOP_MASK', 'ROOK_TABLE', 'BISHOP_TABLE', 'rook_attacks', 'bishop_attacks',
+           'MG_VALUES', 'EG_VALUES', 'MG_TABLES', 'EG_TABLES', 'PHASE_WEIGHTS', 'FULL_PHASE', 'EG_SHIFT',
+           'PSQT', 'unpack_score', 'position', 'iter_legal_moves', 'legal_moves', 'has_legal_move',
+           'IllegalMoveError', 'AmbiguousMoveError', 'FILE_TOKEN', 'RANK_TOKEN', 'PIECE_TOKEN',
+           'CAPTURE_TOKEN', 'DASH_TOKEN', 'PROMO_TOKEN', 'SAN_TOKENS', 'FILE_A', 'NOTATION_CACHE',
+           'MOVE_CACHE', 'parse_notation', 'resolve', 'parse_move', 'square_name', 'san', 'lan', 'Game',
+           'move_parse', 'chess', 'player', 'board_view', 'glyph', 'RANK_CACHE', 'rank_line', 'board_text',
+           'piece', 'Pawn', 'Rook', 'Knight', 'Bishop', 'Queen', 'King', 'piece_classes']
@@ -0,0 +1,256 @@
+import sys
+import os
+import struct
+import marshal
+# References:
+# https://docs.python.org/3/library/marshal.html
+# https://www.chessprogramming.org/Bitboards
+# https://www.chessprogramming.org/Zobrist_Hashing
+
+# Bitboard squares are numbered a1 = 0, b1 = 1, ..., h1 = 7, a2 = 8, ..., h8 = 63,
+# so the (file, rank) tuple (f, r) is square (r-1)*8 + (f-1).
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+# Piece codes are colour*6 + piece type, indexing position.bb and p_symbols.
+p_symbols = 'PNBRQKpnbrqk'
+p_names = 'pnbrqk'
+colors = ('white', 'black')
+FULL = 0xFFFFFFFFFFFFFFFF
+
+# Moves are 16-bit ints: from square | to square << 6 | flag << 12.
+QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EP_CAPTURE = 0, 1, 2, 3, 4, 5
+# Promotion flags add the promoted piece type minus KNIGHT (0-3).
+PROMOTION, PROMO_CAPTURE = 8, 12
+# Castling rights bits: white king/queen side, black king/queen side.
+WK, WQ, BK, BQ = 1, 2, 4, 8
+# Rights kept when a move touches a square (king and rook home squares).
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[0], CASTLE_MASK[4], CASTLE_MASK[7] = 15 ^ WQ, 15 ^ (WK | WQ), 15 ^ WK
+CASTLE_MASK[56], CASTLE_MASK[60], CASTLE_MASK[63] = 15 ^ BQ, 15 ^ (BK | BQ), 15 ^ BK
+# Packed positions: the occupancy bitboard, the piece code of each occupied
+# square as a nibble in square order (at most 32 pieces), then
+# side | castling << 1 | (en passant file + 1) << 5, halfmove clock, fullmove number.
+PACKED = struct.Struct('<Q16sHHH')
+
+
+def square(pos):
+    '''Convert a (file, rank) tuple to a square index'''
+    return (pos[1] - 1) * 8 + pos[0] - 1
+
+
+def square_pos(sq):
+    '''Convert a square index to a (file, rank) tuple'''
+    return (sq & 7) + 1, (sq >> 3) + 1
+
+
+def encode(frm, to, flag=QUIET):
+    '''Pack a move into its 16-bit int'''
+    return frm | to << 6 | flag << 12
+
+
+def uci(move):
+    '''Long algebraic (UCI) text of a move, e.g. e2e4 or e7e8q'''
+    frm, to, flag = move & 63, move >> 6 & 63, move >> 12
+    text = 'abcdefgh'[frm & 7] + str((frm >> 3) + 1) + 'abcdefgh'[to & 7] + str((to >> 3) + 1)
+    if flag & PROMOTION:
+        text += 'nbrq'[flag & 3]
+    return text
+
+
+def bits(bb):
+    '''Iterate the square indices of the set bits of a bitboard'''
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _step_table(deltas):
+    '''Build a 64 entry table of single step attacks
+    for a list of (file, rank) deltas.
+    '''
+    table = []
+    for sq in range(64):
+        f, r = sq & 7, sq >> 3
+        bb = 0
+        for df, dr in deltas:
+            if 0 <= f + df < 8 and 0 <= r + dr < 8:
+                bb |= 1 << ((r + dr) * 8 + f + df)
+        table.append(bb)
+    return table
+
+
+# The first four directions step towards higher square indices,
+# so their nearest blocker is the lowest set bit, and vice versa.
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (-1, 1), (0, -1), (-1, 0), (-1, -1), (1, -1)]
+ROOK_DIRS = (0, 1, 4, 5)
+BISHOP_DIRS = (2, 3, 6, 7)
+
+
+def _slide(sq, occ, dirs):
+    '''Walk the rays of a slider
+    stopping at (and including) the first blocker on each ray.
+    '''
+    attacks = 0
+    for d in dirs:
+        ray = RAYS[d][sq]
+        blockers = ray & occ
+        if blockers:
+            if d < 4:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= RAYS[d][first]
+        attacks |= ray
+    return attacks
+
+
+def walk(sq, d, occ):
+    '''Lazily walk a ray from a square in direction d,
+    yielding squares up to and including the first blocker.
+    '''
+    df, dr = DIRECTIONS[d]
+    f, r = sq & 7, sq >> 3
+    while 0 <= f + df < 8 and 0 <= r + dr < 8:
+        f, r = f + df, r + dr
+        to = r * 8 + f
+        yield to
+        if occ >> to & 1:
+            return
+
+
+def _relevant(sq, dirs, rays):
+    '''Occupancy mask of the squares that can block a slider,
+    the last square of each ray never blocks anything behind it.
+    '''
+    mask = 0
+    for d in dirs:
+        ray = rays[d][sq]
+        if ray:
+            last = ray.bit_length() - 1 if d < 4 else (ray & -ray).bit_length() - 1
+            mask |= ray ^ (1 << last)
+    return mask
+
+
+def _build_tables():
+    '''Compute the lookup tables, in the order _load_tables returns them'''
+    # Zobrist keys, from a fixed seed so that position keys are the same
+    # in every process and can be stored on disk.
+    import random
+    rng = random.Random(0x5EED)
+    zobrist_piece = [[rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+    zobrist_side = rng.getrandbits(64)
+    zobrist_castle = [rng.getrandbits(64) for _ in range(16)]
+    zobrist_ep = [rng.getrandbits(64) for _ in range(8)]
+    knight = _step_table([(-1, 2), (1, 2), (-2, 1), (2, 1), (-1, -2), (1, -2), (-2, -1), (2, -1)])
+    king = _step_table([(0, 1), (0, -1), (-1, 0), (1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)])
+    # pawn capture attacks, indexed by colour then square
+    pawn = (_step_table([(-1, 1), (1, 1)]), _step_table([(-1, -1), (1, -1)]))
+    rays = [[0] * 64 for _ in DIRECTIONS]
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for d, (df, dr) in enumerate(DIRECTIONS):
+        for sq in range(64):
+            f, r = sq & 7, sq >> 3
+            path = 0
+            while 0 <= f + df < 8 and 0 <= r + dr < 8:
+                f, r = f + df, r + dr
+                to = r * 8 + f
+                between[sq][to] = path
+                path |= 1 << to
+            rays[d][sq] = path
+    for d in range(4):
+        for sq in range(64):
+            full = rays[d][sq] | rays[d + 4][sq] | 1 << sq
+            for to in bits(rays[d][sq] | rays[d + 4][sq]):
+                line[sq][to] = full
+    rook_mask = [_relevant(sq, ROOK_DIRS, rays) for sq in range(64)]
+    bishop_mask = [_relevant(sq, BISHOP_DIRS, rays) for sq in range(64)]
+    return (zobrist_piece, zobrist_side, zobrist_castle, zobrist_ep, knight, king, pawn,
+            rays, between, line, rook_mask, bishop_mask)
+
+
+# Bump when _build_tables or the score tables change, older cache files are then ignored.
+TABLES_VERSION = 1
+
+
+def _user_cache_dir():
+    '''Per-user cache directory, for installs whose package directory is read-only'''
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        base = os.environ['LOCALAPPDATA']
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'terminal-chess')
+
+
+def _cache_path(name):
+    '''Cache files of a set of tables, next to the bytecode and then in the
+    user cache directory'''
+    filename = 'Chess.{}.{}.{}.marshal'.format(name, sys.implementation.cache_tag, TABLES_VERSION)
+    return (os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__', filename),
+            os.path.join(_user_cache_dir(), filename))
+
+
+TABLES_CACHE = _cache_path('tables')
+
+
+def _load_tables(paths=TABLES_CACHE, build=_build_tables):
+    '''The lookup tables, read from the first cache file in paths that holds
+    them, or computed by build and cached in the first writable one when none
+    does, so importing the module does not rebuild them every time. A
+    read-only install, such as site-packages owned by root, falls back to
+    the user cache directory.
+    '''
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                # one read, marshal.load on the file object reads piecemeal
+                return marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+    tables = build()
+    for path in paths:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # written under another name and renamed, so a concurrent import
+            # never reads half a file
+            temp = '{}.{}'.format(path, os.getpid())
+            with open(temp, 'wb') as f:
+                marshal.dump(tables, f)
+            os.replace(temp, path)
+            break
+        except OSError:
+            pass
+    return tables
+
+
+# BETWEEN[a][b] holds the squares strictly between two aligned squares,
+# LINE[a][b] the full line through both, both are 0 if not aligned.
+(ZOBRIST_PIECE, ZOBRIST_SIDE, ZOBRIST_CASTLE, ZOBRIST_EP,
+ KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS,
+ RAYS, BETWEEN, LINE, ROOK_MASK, BISHOP_MASK) = _load_tables()
+
+# Slider attack lookups keyed by the relevant occupancy of each square,
+# filled in on first use (the same content a magic bitboard table holds).
+ROOK_TABLE = [{} for _ in range(64)]
+BISHOP_TABLE = [{} for _ in range(64)]
+
+
+def rook_attacks(sq, occ):
+    '''Rook attack set from a square for an occupancy bitboard'''
+    key = occ & ROOK_MASK[sq]
+    table = ROOK_TABLE[sq]
+    attacks = table.get(key)
+    if attacks is None:
+        attacks = table[key] = _slide(sq, key, ROOK_DIRS)
+    return attacks
+
+
+def bishop_attacks(sq, occ):
+    '''Bishop attack set from a square for an occupancy bitboard'''
+    key = occ & BISHOP_MASK[sq]
+    table = BISHOP_TABLE[sq]
+    attacks = table.get(key)
+    if attacks is None:
+        attacks = table[key] = _slide(sq, key, BISHOP_DIRS)
+    return attacks
@@ -0,0 +1,611 @@
+from .bitboards import (WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, p_symbols, FULL, QUIET,
+                        DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EP_CAPTURE, PROMOTION, PROMO_CAPTURE,
+                        WK, WQ, BK, BQ, CASTLE_MASK, PACKED, square, encode, bits, ZOBRIST_PIECE,
+                        ZOBRIST_SIDE, ZOBRIST_CASTLE, ZOBRIST_EP, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS,
+                        BETWEEN, LINE, rook_attacks, bishop_attacks)
+from .scores import FULL_PHASE, PSQT
+# References:
+# https://www.chessprogramming.org/Bitboards
+# https://www.chessprogramming.org/Incremental_Updates
+# https://www.chessprogramming.org/Move_Generation
+
+
+class position:
+    '''Bitboard position
+    twelve 64-bit piece sets indexed by piece code,
+    occupancy masks per colour and for the whole board,
+    and a square to piece code mailbox (-1 for empty squares).
+    Moves are made and unmade in place, each make_move pushes
+    an undo record of the state it destroys onto history.
+    Per-colour attack counts per square are kept up to date by
+    make_move and unmake_move, after placing pieces directly with
+    put and remove call refresh_attacks.
+    The 64-bit Zobrist key covers pieces, side to move, castling rights
+    and the en-passant file (only while a capture is possible), put and
+    remove update its piece terms and make_move the rest.
+    put and remove also keep psqt, the packed material and piece-square
+    score, so moves update the evaluation by their from, to and capture terms.
+    Methods: setup, set_fen, fen, put, remove, refresh_attacks, compute_key,
+    compute_psqt, phase, make_move, unmake_move, repetitions, is_legal, encode_move,
+    attacks, targets, can_reach, attackers, attacked_by, is_attacked, king, in_check
+    '''
+
+    def __init__(self):
+        '''Initialize an empty board with white to move'''
+        self.bb = [0] * 12
+        self.occ = [0, 0]
+        self.occupied = 0
+        self.mailbox = [-1] * 64
+        self.side = WHITE
+        self.castling = 0
+        # en-passant target square, -1 if none
+        self.ep = -1
+        self.halfmove = 0
+        self.fullmove = 1
+        self.key = 0
+        # material and piece-square score, see PSQT
+        self.psqt = 0
+        # undo records: (move, captured code, castling, ep, halfmove, key)
+        self.history = []
+        # number of pieces of each colour attacking each square
+        self.attack_count = [[0] * 64, [0] * 64]
+
+    def setup(self):
+        '''Place all pieces on their starting squares'''
+        self.__init__()
+        back_rank = [ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK]
+        for f in range(8):
+            self.put(f, back_rank[f])
+            self.put(8 + f, PAWN)
+            self.put(48 + f, 6 + PAWN)
+            self.put(56 + f, 6 + back_rank[f])
+        self.side = WHITE
+        self.castling = WK | WQ | BK | BQ
+        self.refresh_attacks()
+        self.key = self.compute_key()
+        return self
+
+    def set_fen(self, fen):
+        '''Set up the position described by a FEN string
+
+        keyword arg:
+        fen -- Forsyth-Edwards Notation, the move counters may be omitted.
+        '''
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError("Invalid FEN: " + fen)
+        self.__init__()
+        ranks = fields[0].split('/')
+        if len(ranks) != 8:
+            raise ValueError("Invalid FEN: " + fen)
+        for r, row in enumerate(ranks):
+            f = 0
+            for ch in row:
+                if ch.isdigit():
+                    f += int(ch)
+                elif ch in p_symbols and f < 8:
+                    self.put((7 - r) * 8 + f, p_symbols.index(ch))
+                    f += 1
+                else:
+                    raise ValueError("Invalid FEN: " + fen)
+            if f != 8:
+                raise ValueError("Invalid FEN: " + fen)
+        if fields[1] not in ('w', 'b') or self.bb[KING].bit_count() != 1 or self.bb[6 + KING].bit_count() != 1:
+            raise ValueError("Invalid FEN: " + fen)
+        self.side = WHITE if fields[1] == 'w' else BLACK
+        for ch in fields[2]:
+            if ch in 'KQkq':
+                self.castling |= (WK, WQ, BK, BQ)['KQkq'.index(ch)]
+        if fields[3] != '-':
+            if len(fields[3]) != 2 or fields[3][0] not in 'abcdefgh' or fields[3][1] not in '36':
+                raise ValueError("Invalid FEN: " + fen)
+            self.ep = square(('abcdefgh'.index(fields[3][0]) + 1, int(fields[3][1])))
+        if len(fields) >= 6:
+            self.halfmove = int(fields[4])
+            self.fullmove = int(fields[5])
+        self.refresh_attacks()
+        self.key = self.compute_key()
+        return self
+
+    def fen(self):
+        '''Forsyth-Edwards Notation of the position'''
+        rows = []
+        for r in range(7, -1, -1):
+            row = ''
+            empty = 0
+            for f in range(8):
+                code = self.mailbox[r * 8 + f]
+                if code < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += p_symbols[code]
+            rows.append(row + (str(empty) if empty else ''))
+        castling = ''.join(ch for ch, bit in zip('KQkq', (WK, WQ, BK, BQ)) if self.castling & bit)
+        ep = '-' if self.ep < 0 else 'abcdefgh'[self.ep & 7] + str((self.ep >> 3) + 1)
+        return ' '.join(['/'.join(rows), 'wb'[self.side], castling or '-', ep,
+                         str(self.halfmove), str(self.fullmove)])
+
+    def pack(self):
+        '''Fixed-size binary encoding of the position, PACKED.size bytes'''
+        occupied = self.occupied
+        if occupied.bit_count() > 32:
+            raise ValueError("Cannot pack a position with more than 32 pieces")
+        mailbox = self.mailbox
+        nibbles = bytearray(16)
+        for i, sq in enumerate(bits(occupied)):
+            nibbles[i >> 1] |= mailbox[sq] << ((i & 1) << 2)
+        flags = self.side | self.castling << 1
+        if self.ep >= 0:
+            flags |= ((self.ep & 7) + 1) << 5
+        return PACKED.pack(occupied, bytes(nibbles), flags, self.halfmove, self.fullmove)
+
+    def set_packed(self, data):
+        '''Set up the position from the encoding made by pack
+
+        keyword arg:
+        data -- PACKED.size bytes, or a buffer holding them at its start
+        '''
+        occupied, nibbles, flags, halfmove, fullmove = PACKED.unpack_from(data)
+        self.__init__()
+        for i, sq in enumerate(bits(occupied)):
+            code = nibbles[i >> 1] >> ((i & 1) << 2) & 15
+            if code >= 12:
+                raise ValueError("Invalid packed position")
+            self.put(sq, code)
+        self.side = flags & 1
+        self.castling = flags >> 1 & 15
+        ep_file = flags >> 5 & 15
+        if ep_file:
+            # the en passant square is behind the pawn that just moved
+            self.ep = (40 if self.side == WHITE else 16) + ep_file - 1
+        self.halfmove = halfmove
+        self.fullmove = fullmove
+        self.refresh_attacks()
+        self.key = self.compute_key()
+        return self
+
+    def put(self, sq, code):
+        '''Place a piece code on an empty square'''
+        bit = 1 << sq
+        self.bb[code] |= bit
+        self.occ[code >= 6] |= bit
+        self.occupied |= bit
+        self.mailbox[sq] = code
+        self.key ^= ZOBRIST_PIECE[code][sq]
+        self.psqt += PSQT[code][sq]
+
+    def remove(self, sq):
+        '''Lift the piece off a square and return its code'''
+        code = self.mailbox[sq]
+        bit = 1 << sq
+        self.bb[code] ^= bit
+        self.occ[code >= 6] ^= bit
+        self.occupied ^= bit
+        self.mailbox[sq] = -1
+        self.key ^= ZOBRIST_PIECE[code][sq]
+        self.psqt -= PSQT[code][sq]
+        return code
+
+    def _ep_key(self):
+        '''Zobrist term of the en-passant file, only present
+        when a pawn of the side to move could capture there.
+        '''
+        if self.ep >= 0 and PAWN_ATTACKS[self.side ^ 1][self.ep] & self.bb[self.side * 6 + PAWN]:
+            return ZOBRIST_EP[self.ep & 7]
+        return 0
+
+    def compute_key(self):
+        '''Zobrist key of the position computed from scratch'''
+        key = ZOBRIST_CASTLE[self.castling] ^ self._ep_key()
+        if self.side == BLACK:
+            key ^= ZOBRIST_SIDE
+        for sq in bits(self.occupied):
+            key ^= ZOBRIST_PIECE[self.mailbox[sq]][sq]
+        return key
+
+    def compute_psqt(self):
+        '''Packed material and piece-square score computed from scratch'''
+        mailbox = self.mailbox
+        return sum(PSQT[mailbox[sq]][sq] for sq in bits(self.occupied))
+
+    def phase(self):
+        '''Game phase from FULL_PHASE with every piece on down to 0'''
+        bb = self.bb
+        phase = ((bb[KNIGHT] | bb[BISHOP] | bb[6 + KNIGHT] | bb[6 + BISHOP]).bit_count()
+                 + 2 * (bb[ROOK] | bb[6 + ROOK]).bit_count() + 4 * (bb[QUEEN] | bb[6 + QUEEN]).bit_count())
+        return min(phase, FULL_PHASE)
+
+    def refresh_attacks(self):
+        '''Recount the attacks on every square from scratch'''
+        self.attack_count = [[0] * 64, [0] * 64]
+        self._count(self.occupied, 1)
+
+    def _count(self, squares, delta):
+        '''Add delta to the attack counts of every square
+        attacked by the pieces on a set of squares.
+        '''
+        counts = self.attack_count
+        mailbox = self.mailbox
+        for sq in bits(squares):
+            count = counts[mailbox[sq] >= 6]
+            for target in bits(self.attacks(sq)):
+                count[target] += delta
+
+    def _affected(self, changed):
+        '''Squares of the pieces whose attacks depend on a set of
+        changed squares: the pieces on them, and the sliders
+        whose rays reach one of them.
+        '''
+        bb = self.bb
+        occupied = self.occupied
+        diagonal = bb[BISHOP] | bb[QUEEN] | bb[6 + BISHOP] | bb[6 + QUEEN]
+        straight = bb[ROOK] | bb[QUEEN] | bb[6 + ROOK] | bb[6 + QUEEN]
+        sliders = 0
+        for sq in bits(changed):
+            if diagonal:
+                sliders |= bishop_attacks(sq, occupied) & diagonal
+            if straight:
+                sliders |= rook_attacks(sq, occupied) & straight
+        return sliders & ~changed | occupied & changed
+
+    def _changed(self, move, side):
+        '''Squares whose contents a move by a colour changes'''
+        frm = move & 63
+        to = move >> 6 & 63
+        flag = move >> 12
+        changed = 1 << frm | 1 << to
+        if flag == EP_CAPTURE:
+            changed |= 1 << (to - 8 if side == WHITE else to + 8)
+        elif flag == KING_CASTLE:
+            changed |= 1 << (frm + 3) | 1 << (frm + 1)
+        elif flag == QUEEN_CASTLE:
+            changed |= 1 << (frm - 4) | 1 << (frm - 1)
+        return changed
+
+    def make_move(self, move):
+        '''Apply a move in place
+        and push its undo record onto history.
+        Only the attacks of the pieces the move affects are recounted.
+
+        keyword arg:
+        move -- 16-bit move int, see encode.
+        '''
+        frm = move & 63
+        to = move >> 6 & 63
+        flag = move >> 12
+        side = self.side
+        changed = self._changed(move, side)
+        affected = self._affected(changed)
+        self._count(affected, -1)
+        key = self.key
+        self.key ^= self._ep_key() ^ ZOBRIST_CASTLE[self.castling]
+        captured = -1
+        if flag == EP_CAPTURE:
+            captured = self.remove(to - 8 if side == WHITE else to + 8)
+        elif self.mailbox[to] >= 0:
+            captured = self.remove(to)
+        self.history.append((move, captured, self.castling, self.ep, self.halfmove, key))
+        code = self.remove(frm)
+        if flag & PROMOTION:
+            self.put(to, side * 6 + KNIGHT + (flag & 3))
+        else:
+            self.put(to, code)
+        # the rook jumps over the king
+        if flag == KING_CASTLE:
+            self.put(frm + 1, self.remove(frm + 3))
+        elif flag == QUEEN_CASTLE:
+            self.put(frm - 1, self.remove(frm - 4))
+        self.castling &= CASTLE_MASK[frm] & CASTLE_MASK[to]
+        self.ep = (frm + to) >> 1 if flag == DOUBLE_PUSH else -1
+        if code % 6 == PAWN or captured >= 0:
+            self.halfmove = 0
+        else:
+            self.halfmove += 1
+        if side == BLACK:
+            self.fullmove += 1
+        self.side = side ^ 1
+        self.key ^= ZOBRIST_SIDE ^ ZOBRIST_CASTLE[self.castling] ^ self._ep_key()
+        self._count(affected & ~changed | self.occupied & changed, 1)
+
+    def unmake_move(self):
+        '''Take back the last move made
+        by popping its undo record off history, return the move.
+        '''
+        move, captured, self.castling, self.ep, self.halfmove, key = self.history.pop()
+        frm = move & 63
+        to = move >> 6 & 63
+        flag = move >> 12
+        side = self.side = self.side ^ 1
+        changed = self._changed(move, side)
+        affected = self._affected(changed)
+        self._count(affected, -1)
+        if side == BLACK:
+            self.fullmove -= 1
+        code = self.remove(to)
+        if flag & PROMOTION:
+            code = side * 6 + PAWN
+        self.put(frm, code)
+        if flag == KING_CASTLE:
+            self.put(frm + 3, self.remove(frm + 1))
+        elif flag == QUEEN_CASTLE:
+            self.put(frm - 4, self.remove(frm - 1))
+        if captured >= 0:
+            if flag == EP_CAPTURE:
+                self.put(to - 8 if side == WHITE else to + 8, captured)
+            else:
+                self.put(to, captured)
+        self.key = key
+        self._count(affected & ~changed | self.occupied & changed, 1)
+        return move
+
+    def repetitions(self):
+        '''Number of earlier occurrences of the current position,
+        looking back only as far as the last capture or pawn move.
+        '''
+        count = 0
+        history = self.history
+        for i in range(2, min(self.halfmove, len(history)) + 1, 2):
+            if history[-i][5] == self.key:
+                count += 1
+        return count
+
+    def is_legal(self, move):
+        '''If a pseudo-legal move of the side to move
+        leaves its own king safe, tested on the occupancy after the move.
+        '''
+        frm = move & 63
+        to = move >> 6 & 63
+        flag = move >> 12
+        side = self.side
+        if self.mailbox[frm] % 6 == KING:
+            if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+                return move in iter_legal_moves(self)
+            return not self.attackers(to, side ^ 1, self.occupied ^ 1 << frm)
+        captured = 1 << to
+        if flag == EP_CAPTURE:
+            captured = 1 << (to - 8 if side == WHITE else to + 8)
+        after = self.occupied & ~(1 << frm) & ~captured | 1 << to
+        return not self.attackers(self.king(side), side ^ 1, after) & ~captured
+
+    def encode_move(self, frm, to, promotion=QUEEN):
+        '''Build the move int for a piece moving between two squares,
+        working out captures, pawn double pushes, en passant,
+        promotions and castling from the position.
+
+        keyword arg:
+        frm -- square the piece moves from
+        to -- square the piece moves to
+        promotion -- piece type a pawn promotes to on the last rank
+        '''
+        kind = self.mailbox[frm] % 6
+        capture = self.mailbox[to] >= 0
+        if kind == PAWN:
+            if to >> 3 in (0, 7):
+                return encode(frm, to, (PROMO_CAPTURE if capture else PROMOTION) + promotion - KNIGHT)
+            if to == self.ep and (to - frm) & 7:
+                return encode(frm, to, EP_CAPTURE)
+            if abs(to - frm) == 16:
+                return encode(frm, to, DOUBLE_PUSH)
+        elif kind == KING and to - frm == 2:
+            return encode(frm, to, KING_CASTLE)
+        elif kind == KING and frm - to == 2:
+            return encode(frm, to, QUEEN_CASTLE)
+        return encode(frm, to, CAPTURE if capture else QUIET)
+
+    def attacks(self, sq):
+        '''Squares attacked by the piece on a square,
+        pawns attack diagonally only.
+        '''
+        code = self.mailbox[sq]
+        kind = code % 6
+        if kind == PAWN:
+            return PAWN_ATTACKS[code >= 6][sq]
+        elif kind == KNIGHT:
+            return KNIGHT_ATTACKS[sq]
+        elif kind == BISHOP:
+            return bishop_attacks(sq, self.occupied)
+        elif kind == ROOK:
+            return rook_attacks(sq, self.occupied)
+        elif kind == QUEEN:
+            return rook_attacks(sq, self.occupied) | bishop_attacks(sq, self.occupied)
+        return KING_ATTACKS[sq]
+
+    def targets(self, sq):
+        '''Pseudo-legal destinations of the piece on a square:
+        its attacks minus own pieces, with pawns pushing forward
+        and capturing only onto enemy pieces.
+        '''
+        code = self.mailbox[sq]
+        color = code >= 6
+        if code % 6 != PAWN:
+            return self.attacks(sq) & ~self.occ[color]
+        empty = ~self.occupied & FULL
+        if color == WHITE:
+            push = 1 << (sq + 8) & empty
+            if push and sq < 16:
+                push |= 1 << (sq + 16) & empty
+        else:
+            push = 1 << (sq - 8) & empty if sq >= 8 else 0
+            if push and sq >= 48:
+                push |= 1 << (sq - 16) & empty
+        enemy = self.occ[not color]
+        if self.ep >= 0:
+            enemy |= 1 << self.ep
+        return push | PAWN_ATTACKS[color][sq] & enemy
+
+    def can_reach(self, frm, to):
+        '''If the piece on a square has a pseudo-legal move to another,
+        looking only at the one table entry, pawn step or ray between them.
+        '''
+        code = self.mailbox[frm]
+        color = code >= 6
+        kind = code % 6
+        if frm == to or self.occ[color] >> to & 1:
+            return False
+        if kind == KNIGHT:
+            return bool(KNIGHT_ATTACKS[frm] >> to & 1)
+        elif kind == KING:
+            return bool(KING_ATTACKS[frm] >> to & 1)
+        elif kind == PAWN:
+            if PAWN_ATTACKS[color][frm] >> to & 1:
+                return bool(self.occ[not color] >> to & 1) or to == self.ep
+            step = -8 if color else 8
+            if to == frm + step:
+                return not self.occupied >> to & 1
+            if to == frm + 2 * step and frm >> 3 == (6 if color else 1):
+                return not self.occupied & (1 << (frm + step) | 1 << to)
+            return False
+        if not LINE[frm][to]:
+            return False
+        straight = (frm & 7) == (to & 7) or frm >> 3 == to >> 3
+        if kind == ROOK and not straight or kind == BISHOP and straight:
+            return False
+        return not BETWEEN[frm][to] & self.occupied
+
+    def attackers(self, sq, color, occupied=None):
+        '''Bitboard of the pieces of a colour attacking a square'''
+        if occupied is None:
+            occupied = self.occupied
+        bb = self.bb
+        base = color * 6
+        diagonal = bb[base + BISHOP] | bb[base + QUEEN]
+        straight = bb[base + ROOK] | bb[base + QUEEN]
+        return ((PAWN_ATTACKS[not color][sq] & bb[base + PAWN])
+                | (KNIGHT_ATTACKS[sq] & bb[base + KNIGHT])
+                | (KING_ATTACKS[sq] & bb[base + KING])
+                | (bishop_attacks(sq, occupied) & diagonal if diagonal else 0)
+                | (rook_attacks(sq, occupied) & straight if straight else 0))
+
+    def attacked_by(self, color):
+        '''Union of all squares attacked by a colour'''
+        attacked = 0
+        for sq in bits(self.occ[color]):
+            attacked |= self.attacks(sq)
+        return attacked
+
+    def is_attacked(self, sq, color):
+        '''If a square is attacked by a colour, from the attack counts'''
+        return self.attack_count[color][sq] > 0
+
+    def king(self, color):
+        '''Square of the king of a colour'''
+        return self.bb[color * 6 + KING].bit_length() - 1
+
+    def in_check(self, color):
+        '''If the king of a colour is attacked'''
+        return self.attack_count[not color][self.king(color)] > 0
+
+
+def iter_legal_moves(pos):
+    '''Lazily generate exactly the legal moves of the side to move
+    in one pass: the checkers, the check-evasion target mask and
+    the pinned pieces with their pin lines are computed once,
+    then each piece's targets are masked by them.
+    King moves come first, so callers that only need one move stop early.
+    Yields 16-bit move ints.
+
+    keyword arg:
+    pos -- bitboard position
+    '''
+    side = pos.side
+    enemy = side ^ 1
+    bb = pos.bb
+    occupied = pos.occupied
+    own = pos.occ[side]
+    their = pos.occ[enemy]
+    base = enemy * 6
+    king_sq = pos.king(side)
+    enemy_count = pos.attack_count[enemy]
+
+    checkers = pos.attackers(king_sq, enemy) if enemy_count[king_sq] else 0
+    diagonal = bb[base + BISHOP] | bb[base + QUEEN]
+    straight = bb[base + ROOK] | bb[base + QUEEN]
+    # The king cannot step back along the line of a checking slider,
+    # the square behind it is only unattacked because the king blocks it.
+    xray = 0
+    for sq in bits(checkers & (diagonal | straight)):
+        xray |= LINE[sq][king_sq] ^ 1 << sq
+    for to in bits(KING_ATTACKS[king_sq] & ~own & ~xray):
+        if not enemy_count[to]:
+            yield king_sq | to << 6 | (CAPTURE if their >> to & 1 else QUIET) << 12
+    # Double check, only the king can move.
+    if checkers & (checkers - 1):
+        return
+    if checkers:
+        checker = checkers.bit_length() - 1
+        target_mask = checkers | BETWEEN[king_sq][checker]
+    else:
+        checker = -1
+        target_mask = FULL
+        home = 56 * side
+        rights = pos.castling >> (2 * side) if king_sq == home + 4 else 0
+        if rights & 1 and bb[side * 6 + ROOK] >> (home + 7) & 1 \
+                and not occupied & (0b01100000 << home) \
+                and not enemy_count[home + 5] and not enemy_count[home + 6]:
+            yield encode(king_sq, home + 6, KING_CASTLE)
+        if rights & 2 and bb[side * 6 + ROOK] >> home & 1 \
+                and not occupied & (0b00001110 << home) \
+                and not enemy_count[home + 3] and not enemy_count[home + 2]:
+            yield encode(king_sq, home + 2, QUEEN_CASTLE)
+
+    # Pinned pieces may only move along the line to the pinning slider,
+    # snipers are found with the king's rays through own pieces.
+    pinned = 0
+    pin_line = {}
+    snipers = (rook_attacks(king_sq, their) & straight) | (bishop_attacks(king_sq, their) & diagonal)
+    for sq in bits(snipers):
+        blockers = BETWEEN[king_sq][sq] & occupied
+        if blockers and not blockers & (blockers - 1) and blockers & own:
+            pinned |= blockers
+            pin_line[blockers.bit_length() - 1] = LINE[king_sq][sq]
+
+    pawns = bb[side * 6 + PAWN]
+    for frm in bits(own & ~pawns & ~(1 << king_sq)):
+        targets = pos.targets(frm) & target_mask
+        if pinned >> frm & 1:
+            targets &= pin_line[frm]
+        for to in bits(targets):
+            yield frm | to << 6 | (CAPTURE if their >> to & 1 else QUIET) << 12
+    for frm in bits(pawns):
+        targets = pos.targets(frm)
+        if pinned >> frm & 1:
+            targets &= pin_line[frm]
+        if pos.ep >= 0 and targets >> pos.ep & 1:
+            targets ^= 1 << pos.ep
+            # En passant takes two pawns off one rank, so test the king
+            # directly against the occupancy after the capture.
+            captured = pos.ep - 8 if side == WHITE else pos.ep + 8
+            after = occupied ^ (1 << frm | 1 << captured | 1 << pos.ep)
+            if not pos.attackers(king_sq, enemy, after) & ~(1 << captured):
+                yield encode(frm, pos.ep, EP_CAPTURE)
+        for to in bits(targets & target_mask):
+            capture = their >> to & 1
+            if to >> 3 in (0, 7):
+                flag = PROMO_CAPTURE if capture else PROMOTION
+                for promo in range(4):
+                    yield frm | to << 6 | (flag + promo) << 12
+            elif capture:
+                yield frm | to << 6 | CAPTURE << 12
+            elif to - frm in (16, -16):
+                yield frm | to << 6 | DOUBLE_PUSH << 12
+            else:
+                yield frm | to << 6
+
+
+def legal_moves(pos):
+    '''List the legal moves of the side to move as 16-bit move ints
+
+    keyword arg:
+    pos -- bitboard position
+    '''
+    return list(iter_legal_moves(pos))
+
+
+def has_legal_move(pos):
+    '''If the side to move has any legal move, stopping at the first'''
+    for _ in iter_legal_moves(pos):
+        return True
+    return False
@@ -0,0 +1,369 @@
+from .bitboards import (WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, KING_CASTLE, QUEEN_CASTLE, CAPTURE,
+                        PROMOTION, bits, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks,
+                        bishop_attacks)
+from .board import position, iter_legal_moves, legal_moves, has_legal_move
+# References:
+# https://en.wikipedia.org/wiki/Algebraic_notation_(chess)
+# https://en.wikipedia.org/wiki/Rules_of_chess
+
+
+class IllegalMoveError(ValueError):
+    '''Raised for a move command that cannot be parsed or is not legal'''
+
+
+class AmbiguousMoveError(IllegalMoveError):
+    '''Raised when more than one legal move matches a move command,
+    the matching move ints are kept in candidates.
+    '''
+
+    def __init__(self, message, candidates):
+        super().__init__(message)
+        self.candidates = candidates
+
+
+# Move text is tokenised through this table: each character maps to
+# its token class and value (file 0-7, rank 0-7, piece type).
+FILE_TOKEN, RANK_TOKEN, PIECE_TOKEN, CAPTURE_TOKEN, DASH_TOKEN, PROMO_TOKEN = range(6)
+SAN_TOKENS = dict([(c, (FILE_TOKEN, i)) for i, c in enumerate('abcdefgh')] +
+                  [(c, (RANK_TOKEN, i)) for i, c in enumerate('12345678')] +
+                  [(c, (PIECE_TOKEN, KNIGHT + i)) for i, c in enumerate('NBRQK')] +
+                  [('x', (CAPTURE_TOKEN, 0)), (':', (CAPTURE_TOKEN, 0)),
+                   ('-', (DASH_TOKEN, 0)), ('=', (PROMO_TOKEN, 0))])
+FILE_A = 0x0101010101010101
+# Parsed move text by (text, case_sensitive), emptied when it grows past NOTATION_CACHE.
+_notation = {}
+NOTATION_CACHE = 65536
+# Moves by (position key, text, case_sensitive), least recently used first.
+_move_cache = {}
+MOVE_CACHE = 65536
+
+
+def _parse_notation(san, case_sensitive):
+    text = san.strip().rstrip('+#!?')
+    if text.endswith('e.p.'):
+        text = text[:-4].rstrip()
+    castle = text.upper().replace('0', 'O')
+    if castle == 'O-O':
+        return KING, -1, -1, -1, QUEEN, KING_CASTLE
+    if castle == 'O-O-O':
+        return KING, -1, -1, -1, QUEEN, QUEEN_CASTLE
+    if not case_sensitive:
+        # the terminal game takes lower case piece letters, 'b' is
+        # a bishop unless a rank follows it, it is a two letter pawn move
+        # or the move promotes, which bishops never do (bxa8=q)
+        text = text.lower()
+        promotes = len(text) > 2 and text[-1] in 'nbrq' and text[-2] in '=18'
+        if text[:1] in ('n', 'r', 'q', 'k') or (text[:1] == 'b' and len(text) > 2 and text[1] not in '12345678'
+                                                 and not promotes):
+            text = text[0].upper() + text[1:]
+    tokens = [SAN_TOKENS.get(ch) for ch in text]
+    # promotion: '=Q', or a bare letter after the destination rank as in e8Q and e7e8q
+    promotion = None
+    if len(text) > 2 and text[-1] in 'NBRQnbrq' and tokens[-2] is not None and tokens[-2][0] in (RANK_TOKEN,
+                                                                                                   PROMO_TOKEN):
+        promotion = KNIGHT + 'NBRQ'.index(text[-1].upper())
+        tokens = tokens[:-2] if tokens[-2][0] == PROMO_TOKEN else tokens[:-1]
+    kind = PAWN
+    if tokens and tokens[0] is not None and tokens[0][0] == PIECE_TOKEN:
+        kind = tokens[0][1]
+        tokens = tokens[1:]
+    if len(tokens) < 2 or None in tokens or tokens[-2][0] != FILE_TOKEN or tokens[-1][0] != RANK_TOKEN:
+        raise IllegalMoveError("Cannot parse move: " + san)
+    to = tokens[-1][1] * 8 + tokens[-2][1]
+    rest = tokens[:-2]
+    if rest and rest[-1][0] in (CAPTURE_TOKEN, DASH_TOKEN):
+        rest = rest[:-1]
+    # disambiguating file and rank, or the whole from square of long algebraic text
+    file = rank = -1
+    if rest and rest[0][0] == FILE_TOKEN:
+        file = rest.pop(0)[1]
+    if rest and rest[0][0] == RANK_TOKEN:
+        rank = rest.pop(0)[1]
+    if rest or (promotion is not None and (kind != PAWN or to >> 3 not in (0, 7))):
+        raise IllegalMoveError("Cannot parse move: " + san)
+    return kind, file, rank, to, QUEEN if promotion is None else promotion, 0
+
+
+def parse_notation(san, case_sensitive=True):
+    '''Parse move text without a position: SAN (Nbd2, R1e2, exd5, e8=Q,
+    O-O-O, with or without +, # and annotations) and long algebraic
+    (Ng1-f3, e7xe8=Q, UCI e2e4 and e7e8q). The result is memoised.
+    Returns (piece type, from file or -1, from rank or -1, to square,
+    promotion piece type, castling flag or 0), raises IllegalMoveError.
+
+    keyword arg:
+    san -- move text
+    case_sensitive -- piece letters are upper case, as in SAN,
+                      otherwise 'b' is a bishop as in the terminal game.
+    '''
+    key = (san, case_sensitive)
+    parsed = _notation.get(key)
+    if parsed is None:
+        parsed = _parse_notation(san, case_sensitive)
+        if len(_notation) >= NOTATION_CACHE:
+            _notation.clear()
+        _notation[key] = parsed
+    return parsed
+
+
+def _sources(pos, kind, to):
+    '''Bitboard of the pieces of a type of the side to move
+    that have a pseudo-legal move to a square.
+    '''
+    side = pos.side
+    mine = pos.bb[side * 6 + kind]
+    if pos.occ[side] >> to & 1:
+        return 0
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[to] & mine
+    elif kind == BISHOP:
+        return bishop_attacks(to, pos.occupied) & mine
+    elif kind == ROOK:
+        return rook_attacks(to, pos.occupied) & mine
+    elif kind == QUEEN:
+        return (rook_attacks(to, pos.occupied) | bishop_attacks(to, pos.occupied)) & mine
+    elif kind == KING:
+        return KING_ATTACKS[to] & mine
+    # pawns capture diagonally onto enemy pieces or en passant,
+    # and push straight onto empty squares
+    if pos.occ[side ^ 1] >> to & 1 or to == pos.ep:
+        return PAWN_ATTACKS[side ^ 1][to] & mine
+    step = -8 if side == WHITE else 8
+    if not 0 <= to + step < 64 or pos.occupied >> to & 1:
+        return 0
+    if mine >> (to + step) & 1:
+        return 1 << (to + step)
+    if to >> 3 == (3 if side == WHITE else 4) and not pos.occupied >> (to + step) & 1:
+        return mine & 1 << (to + 2 * step)
+    return 0
+
+
+def resolve(pos, parsed, san=''):
+    '''The legal move of a position matching parsed move text,
+    raises IllegalMoveError, or AmbiguousMoveError with the candidates
+    when the text does not tell them apart.
+
+    keyword arg:
+    pos -- bitboard position
+    parsed -- tuple from parse_notation
+    san -- the text, for error messages
+    '''
+    kind, file, rank, to, promotion, castle = parsed
+    if castle:
+        for move in iter_legal_moves(pos):
+            if move >> 12 == castle:
+                return move
+        raise IllegalMoveError("Illegal move: " + san)
+    if file >= 0 and rank >= 0:
+        # a whole from square: the piece standing there moves,
+        # so UCI text without piece letters resolves, castling as e1g1 too
+        frm = rank * 8 + file
+        code = pos.mailbox[frm]
+        if code < 0 or code // 6 != pos.side or (kind != PAWN and code % 6 != kind):
+            raise IllegalMoveError("Illegal move: " + san)
+        move = pos.encode_move(frm, to, promotion)
+        if code % 6 == KING and abs(to - frm) == 2:
+            if move in iter_legal_moves(pos):
+                return move
+        elif _sources(pos, code % 6, to) >> frm & 1 and pos.is_legal(move):
+            return move
+        raise IllegalMoveError("Illegal move: " + san)
+    sources = _sources(pos, kind, to)
+    if file >= 0:
+        sources &= FILE_A << file
+    if rank >= 0:
+        sources &= 0xFF << 8 * rank
+    moves = []
+    for frm in bits(sources):
+        move = pos.encode_move(frm, to, promotion)
+        if pos.is_legal(move):
+            moves.append(move)
+    if not moves:
+        raise IllegalMoveError("Illegal move: " + san)
+    if len(moves) > 1:
+        raise AmbiguousMoveError("Ambiguous move: " + san, moves)
+    return moves[0]
+
+
+def parse_move(pos, san, case_sensitive=True):
+    '''Legal move int of move text in a position, see parse_notation,
+    cached by position key and text.
+    '''
+    key = (pos.key, san, case_sensitive)
+    move = _move_cache.pop(key, None)
+    if move is None:
+        move = resolve(pos, parse_notation(san, case_sensitive), san)
+        if len(_move_cache) >= MOVE_CACHE:
+            del _move_cache[next(iter(_move_cache))]
+    # reinserted as the most recently used
+    _move_cache[key] = move
+    return move
+
+
+def square_name(sq):
+    '''Algebraic name of a square, e.g. e4'''
+    return 'abcdefgh'[sq & 7] + str((sq >> 3) + 1)
+
+
+def _suffix(pos, move):
+    '''+ or # when a move gives check or mate'''
+    pos.make_move(move)
+    try:
+        if not pos.in_check(pos.side):
+            return ''
+        return '+' if has_legal_move(pos) else '#'
+    finally:
+        pos.unmake_move()
+
+
+def san(pos, move):
+    '''Standard algebraic text of a legal move, e.g. Nbd2, exd5, e8=Q+, O-O-O,
+    disambiguated by file, then rank, then both, as few as needed.
+    '''
+    frm, to, flag = move & 63, move >> 6 & 63, move >> 12
+    if flag == KING_CASTLE:
+        return 'O-O' + _suffix(pos, move)
+    if flag == QUEEN_CASTLE:
+        return 'O-O-O' + _suffix(pos, move)
+    kind = pos.mailbox[frm] % 6
+    if kind == PAWN:
+        text = 'abcdefgh'[frm & 7] + 'x' if flag & CAPTURE else ''
+        text += square_name(to)
+        if flag & PROMOTION:
+            text += '=' + 'NBRQ'[flag & 3]
+        return text + _suffix(pos, move)
+    text = 'NBRQK'[kind - 1]
+    others = [sq for sq in bits(_sources(pos, kind, to) & ~(1 << frm)) if pos.is_legal(pos.encode_move(sq, to))]
+    if others:
+        if all(sq & 7 != frm & 7 for sq in others):
+            text += 'abcdefgh'[frm & 7]
+        elif all(sq >> 3 != frm >> 3 for sq in others):
+            text += str((frm >> 3) + 1)
+        else:
+            text += square_name(frm)
+    if flag & CAPTURE:
+        text += 'x'
+    return text + square_name(to) + _suffix(pos, move)
+
+
+def lan(pos, move):
+    '''Long algebraic text of a legal move, e.g. Ng1-f3, e5xd6, e7-e8=Q+'''
+    frm, to, flag = move & 63, move >> 6 & 63, move >> 12
+    if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+        return san(pos, move)
+    kind = pos.mailbox[frm] % 6
+    text = ('NBRQK'[kind - 1] if kind != PAWN else '') + square_name(frm) + ('x' if flag & CAPTURE else '-')
+    text += square_name(to)
+    if flag & PROMOTION:
+        text += '=' + 'NBRQ'[flag & 3]
+    return text + _suffix(pos, move)
+
+
+class Game:
+    '''Headless game
+    the rules engine without any terminal input or output,
+    moves are pushed as SAN text or move ints and errors are raised
+    as IllegalMoveError / AmbiguousMoveError.
+    Methods: parse_san, push_san, push, pop, legal_moves, san, lan, is_check, outcome, replay
+    '''
+
+    def __init__(self, fen=None):
+        '''Start a game from the initial position or a FEN string'''
+        self.position = position()
+        if fen:
+            self.position.set_fen(fen)
+        else:
+            self.position.setup()
+
+    def parse_san(self, san, case_sensitive=True):
+        '''Resolve move text against the legal moves: standard algebraic
+        (Nbd2, R1e2, exd5, e8=Q, O-O-O, check and mate suffixes) or long
+        algebraic (Ng1-f3, e7xe8=Q, UCI e2e4), see parse_notation.
+        Returns the move int.
+
+        keyword arg:
+        san -- move text, e.g. 'e4', 'Nbd2', 'exd5', 'e8=Q', 'O-O-O', 'g1f3'
+        case_sensitive -- piece letters are upper case, as in SAN,
+                          otherwise 'b' is a bishop as in the terminal game.
+        '''
+        return parse_move(self.position, san, case_sensitive)
+
+    def push_san(self, san, case_sensitive=True):
+        '''Parse and make a move in standard algebraic notation,
+        returns the move int.
+        '''
+        move = self.parse_san(san, case_sensitive)
+        self.position.make_move(move)
+        return move
+
+    def push(self, move):
+        '''Make a legal move int'''
+        self.position.make_move(move)
+
+    def pop(self):
+        '''Take back the last move, returns its move int'''
+        return self.position.unmake_move()
+
+    def legal_moves(self):
+        '''List the legal move ints of the side to move'''
+        return legal_moves(self.position)
+
+    def san(self, move):
+        '''Standard algebraic text of a legal move'''
+        return san(self.position, move)
+
+    def lan(self, move):
+        '''Long algebraic text of a legal move'''
+        return lan(self.position, move)
+
+    def is_check(self):
+        '''If the side to move is in check'''
+        return self.position.in_check(self.position.side)
+
+    def insufficient_material(self):
+        '''If neither side can possibly mate:
+        bare kings, or a single knight or bishop left.
+        '''
+        bb = self.position.bb
+        if bb[PAWN] | bb[ROOK] | bb[QUEEN] | bb[6 + PAWN] | bb[6 + ROOK] | bb[6 + QUEEN]:
+            return False
+        minors = bb[KNIGHT] | bb[BISHOP] | bb[6 + KNIGHT] | bb[6 + BISHOP]
+        return not minors & (minors - 1)
+
+    def outcome(self):
+        '''Result of the game, None while it goes on.
+        Returns a (result, reason) tuple, e.g. ('1-0', 'checkmate'),
+        ('1/2-1/2', 'stalemate'), ('1/2-1/2', 'threefold repetition').
+        '''
+        pos = self.position
+        if not has_legal_move(pos):
+            if pos.in_check(pos.side):
+                return ('0-1' if pos.side == WHITE else '1-0', 'checkmate')
+            return ('1/2-1/2', 'stalemate')
+        if pos.repetitions() >= 2:
+            return ('1/2-1/2', 'threefold repetition')
+        if pos.halfmove >= 100:
+            return ('1/2-1/2', 'fifty-move rule')
+        if self.insufficient_material():
+            return ('1/2-1/2', 'insufficient material')
+        return None
+
+    def replay(self, moves):
+        '''Push a stream of SAN moves, e.g. a game read from a file,
+        without building the move list first.
+        Returns the number of plies pushed, an IllegalMoveError
+        carries the index of the offending ply in ply and its text in san.
+
+        keyword arg:
+        moves -- iterable of SAN strings
+        '''
+        ply = 0
+        for san in moves:
+            try:
+                self.push_san(san)
+            except IllegalMoveError as e:
+                e.ply = ply
+                e.san = san
+                raise
+            ply += 1
+        return ply
@@ -0,0 +1,595 @@
+import sys
+import time
+# collections.abc without importing the collections package,
+# the interpreter has already loaded it at start-up
+from _collections_abc import Mapping
+from .bitboards import (WHITE, p_symbols, p_names, colors, square, square_pos, uci, bits, ROOK_DIRS,
+                        BISHOP_DIRS, walk, KNIGHT_ATTACKS, KING_ATTACKS, BETWEEN, rook_attacks,
+                        bishop_attacks)
+from .board import position, has_legal_move
+from .game import IllegalMoveError, AmbiguousMoveError, parse_notation, Game
+# References:
+# https://en.wikipedia.org/wiki/Chess
+# https://docs.python.org/3/library/collections.abc.html
+
+
+def move_parse(mv_cmd, pos_dict, case_sensitive=False):
+    '''Parse user command to move a chess piece
+
+    keyword arg:
+    mv_cmd -- user command as a string
+    pos_dict -- position dictionary mapping alpha to num.
+    case_sensitive -- piece letters are upper case as in SAN,
+                      so that 'bxc6' is a pawn and 'Bxc6' a bishop.
+    '''
+
+    mv_cmd_list = list(mv_cmd)
+    pieces = 'rnbqk'
+    if case_sensitive:
+        if mv_cmd_list[0] in 'RNBQK':
+            mv_cmd_list[0] = mv_cmd_list[0].lower()
+        else:
+            pieces = ''
+    # Check if command is a 'pawn capture' move.
+    if mv_cmd_list[1] == 'x' and mv_cmd_list[0] not in pieces:
+        mv_cmd_list.insert(0, 'p')
+        new_pos = (pos_dict[mv_cmd_list[-2]], int(mv_cmd_list[-1]))
+        out_list = mv_cmd_list[:-2]
+        out_list.append(new_pos)
+        # Returning command as list with shorthand of piece,
+        # and a tuple of new position
+        return out_list
+    # Check if command is a pawn move.
+    elif mv_cmd_list[0] not in pieces:
+        mv_cmd_list.insert(0, 'p')
+        new_pos = (pos_dict[mv_cmd_list[-2]], int(mv_cmd_list[-1]))
+        out_list = mv_cmd_list[:-2]
+        out_list.append(new_pos)
+        # Returning command as list with shorthand of piece,
+        # and a tuple of new position
+        return out_list
+    # All other moves.
+    else:
+        if len(mv_cmd_list) == 2:
+            mv_cmd_list.insert(0, 'p')
+        new_pos = (pos_dict[mv_cmd_list[-2]], int(mv_cmd_list[-1]))
+        out_list = mv_cmd_list[:-2]
+        out_list.append(new_pos)
+        # Returning command as list with shorthand of piece,
+        # and a tuple of new position
+        return out_list
+
+
+class chess:
+    '''Chess class
+
+    Contains main game mechanics:
+    initializing board, printing board, main game cycle,
+    piece moving, and checking check.
+    Methods: initialize_board, set_fen, fen, __str__, main, move_piece, check, checkmate, stalemate
+    '''
+    pos_dict = {'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5, 'f': 6, 'g': 7, 'h': 8}
+    p_fig_map = {'P': '♙', 'R': '♖', 'N': '♘', 'B': '♗', 'Q': '♕',
+                 'K': '♔', 'p': '♟', 'r': '♜', 'n': '♞', 'b': '♝',
+                 'q': '♛', 'k': '♚', '.': '.'}
+
+    def __init__(self, player_name1, color1, player_name2, color2, engine1=None, engine2=None, fen=None, book=None,
+                 tablebase=None, archive=None):
+        '''Initialze a game
+        with players and set colors,
+        a player given an engine is played by the computer,
+        the game starts from the position of a FEN string if one is given,
+        engine players take their moves from an opening book while in it
+        and endgame tablebase results are announced once in the tables.
+        Finished games, and games left with 'end', are saved to the
+        game archive file if one is given.
+        '''
+        self.book = book
+        self.tablebase = tablebase
+        self.archive = archive
+        self.start_fen = fen
+        # archive game number of the saved game this one resumes
+        self.resumes = None
+        self.player1 = player(player_name1, color1, engine1)
+        self.player2 = player(player_name2, color2, engine2)
+        # the headless game holds the rules and the bitboard position
+        self.game = Game()
+        self.position = self.game.position
+        # piece objects keyed by (file, rank), read from the bitboards
+        self.board = board_view(self.position)
+        if fen:
+            self.set_fen(fen)
+        else:
+            self.initialize_board()
+
+    def initialize_board(self):
+        '''Initialze the bitboard position
+        with all pieces on their starting squares
+        '''
+        self.position.setup()
+
+    def set_fen(self, fen):
+        '''Set up the board from a FEN string, raises ValueError if invalid'''
+        self.position.set_fen(fen)
+
+    def fen(self):
+        '''FEN string of the current board'''
+        return self.position.fen()
+
+    def __str__(self):
+        '''Print board
+        Align figurines and file/rank indices
+        '''
+        return board_text(self.position.mailbox)
+
+    def main(self):
+        '''Main mechanics
+        Thin terminal shell over Game: cycle user turns,
+        push their moves, disambiguate and report the outcome.
+        The board is drawn by a terminal renderer that only rewrites
+        the squares that changed, with messages below it.
+        '''
+        from render import terminal
+        from cli import interactive
+        screen = terminal()
+
+        # Cycle turns, the side to move follows the position
+        # so that a takeback hands the turn back
+        while True:
+            player = self._to_move()
+            turn_start = time.perf_counter()
+            # an engine player searches instead of prompting
+            if player.engine is not None:
+                # book moves first, searched moves once out of book
+                from_book = self.book.choose(self.position) if self.book else 0
+                move = from_book or player.engine.choose(self.position)
+                mv_cmd = uci(move)
+                self.game.push(move)
+            else:
+                while True:
+                    while True:
+                        try:
+                            # take user command for performing basic checking
+                            # if the command is valid, if end is called
+                            print(player.color[0].upper() + player.color[1:] + " to move.")
+                            mv_cmd = input("Please enter a move in standard algebraic notation: ").lower()
+                            if mv_cmd == 'end':
+                                self._save_unfinished()
+                                print("Thank you for playing!")
+                                sys.exit(0)
+                            elif mv_cmd == 'takeback':
+                                break
+                            elif mv_cmd == 'book':
+                                book_moves = self.book.moves(self.position) if self.book else []
+                                print("Book moves: " + (", ".join("{} ({})".format(uci(m), w) for m, w in book_moves)
+                                                        if book_moves else "none"))
+                                continue
+                            parse_notation(mv_cmd, case_sensitive=False)
+                            break
+                        except SystemExit as e:
+                            sys.exit(e)
+                        except EOFError:
+                            self._save_unfinished()
+                            sys.exit(0)
+                        except:
+                            print("Error: please input with standard algebraic notation, ex: 'e4' or 'Nf3'.")
+                    if mv_cmd == 'takeback':
+                        break
+                    try:
+                        self.game.push_san(mv_cmd, case_sensitive=False)
+                        break
+                    # ask user to disambiguate
+                    except AmbiguousMoveError as e:
+                        piece_to_mv = [self.board[square_pos(m & 63)] for m in e.candidates]
+                        exact_piece = interactive.disambiguate(piece_to_mv, 1)
+                        self.game.push([m for m in e.candidates if m & 63 == square(exact_piece.pos)][0])
+                        break
+                    # No piece can complete the move, ask to input again
+                    except IllegalMoveError:
+                        screen.frame(self.position.mailbox, ["Error: Invalid move, please enter another.",
+                                                             "----------------------------------"])
+            player.time_elapsed += time.perf_counter() - turn_start
+            # messages shown under the board this turn
+            messages = []
+            if player.engine is not None:
+                info = None if from_book else player.engine.info
+                messages.append(player.player_name + " plays " + mv_cmd + (" (book)" if from_book else "") + (
+                                " (depth {}, {} nodes, {:.0f} nodes/s, {:.1f}s, pv {})".format(
+                                    info['depth'], info['nodes'], info['nps'], info['time'], ' '.join(info['pv']))
+                                if info else ""))
+            # undo the last move from the position's undo stack
+            if mv_cmd == 'takeback':
+                if self.position.history:
+                    self._take_back()
+                    # against an engine, its reply is taken back as well
+                    while self.position.history and self._to_move().engine is not None:
+                        self._take_back()
+                    messages.append("Last move taken back.")
+                else:
+                    messages.append("There is no move to take back.")
+                screen.frame(self.position.mailbox, messages + ["----------------------------------"])
+                continue
+            # the piece taken, if any, joins the mover's captures
+            captured = self.position.history[-1][1]
+            if captured >= 0:
+                player.captured.append(p_symbols[captured])
+            # checkmate, stalemate or a draw ends the game
+            outcome = self.game.outcome()
+            if outcome:
+                if outcome[1] == 'checkmate':
+                    messages.append("Checkmate! " + player.player_name + " has won.")
+                elif outcome[1] == 'stalemate':
+                    messages.append("Stalemate! The game is drawn.")
+                else:
+                    messages.append("Draw by " + outcome[1] + "! The game is drawn.")
+                if self.archive:
+                    self.save(outcome[0], outcome[1])
+                screen.frame(self.position.mailbox, messages)
+                break
+            # check if check, and print warning.
+            if self.game.is_check():
+                if player.color == 'black': messages.append("White King in check!")
+                elif player.color == 'white': messages.append("Black King in check!")
+            # forced mates and dead draws from the endgame tablebase
+            known = self.tablebase.probe(self.position) if self.tablebase else None
+            if known:
+                winner = colors[self.position.side ^ (known[0] < 0)]
+                messages.append("Tablebase: {} mates in {}.".format(winner[0].upper() + winner[1:],
+                                                                    (known[1] + 1) // 2))
+            elif known is not None:
+                messages.append("Tablebase: the position is a dead draw.")
+            screen.frame(self.position.mailbox, messages + ["----------------------------------"])
+
+    def _to_move(self):
+        return self.player1 if self.position.side == WHITE else self.player2
+
+    def record(self, result='*', reason=None):
+        '''Headers and move ints of the game so far, for the game archive'''
+        headers = {'Date': time.strftime('%Y.%m.%d'), 'White': self.player1.player_name,
+                   'Black': self.player2.player_name, 'Result': result}
+        if reason:
+            headers['Termination'] = reason
+        if self.start_fen:
+            headers['FEN'] = self.start_fen
+        for tag, p in (('White', self.player1), ('Black', self.player2)):
+            headers[tag + 'Time'] = '{:.1f}'.format(p.time_elapsed)
+            if p.engine is not None:
+                headers[tag + 'Engine'] = p.engine.time_limit or ''
+        if self.resumes is not None:
+            headers['Resumes'] = self.resumes
+        return headers, [entry[0] for entry in self.position.history]
+
+    def save(self, result='*', reason=None):
+        '''Append the game to the archive file, returns its game number'''
+        from archive import game_archive
+        headers, moves = self.record(result, reason)
+        with game_archive(self.archive) as archive:
+            start = position().set_fen(self.start_fen) if self.start_fen else None
+            return archive.append(headers, moves, start)
+
+    def _save_unfinished(self):
+        '''Save a game left before its end, so that it can be resumed'''
+        if self.archive and self.position.history:
+            try:
+                number = self.save()
+            except (OSError, ValueError) as e:
+                print("Error: the game could not be saved: {}".format(e))
+                return
+            print("Game saved as game {} of {}, choose '3' at the menu to resume it.".format(number, self.archive))
+
+    def resume(self, moves, times=(0.0, 0.0)):
+        '''Continue a saved game: play its moves, recording captures,
+        and restore the players' thinking times
+
+        keyword arg:
+        moves -- move ints from the start position
+        times -- seconds elapsed of player1 and player2
+        '''
+        for move in moves:
+            mover = self._to_move()
+            self.game.push(move)
+            captured = self.position.history[-1][1]
+            if captured >= 0:
+                mover.captured.append(p_symbols[captured])
+        self.player1.time_elapsed, self.player2.time_elapsed = times
+
+    def _take_back(self):
+        '''Take back the last move, and its capture from the mover's captures'''
+        captured = self.position.history[-1][1]
+        self.game.pop()
+        if captured >= 0:
+            self._to_move().captured.pop()
+
+    def move_peice(self, piece_to_del, pos_to_move, piece_name, p_color, castling=False, rook=None):
+        """Move pice
+        by making the move in place on the bitboard position,
+        which records it on the undo stack for takeback.
+        Pawns reaching the last rank are promoted to queens.
+
+        keywoard arg:
+        piece_to_del -- piece object to be moved
+        pos_to_move -- tuple for new position
+        piece_name -- shorthand name of object to be moved
+        p_color -- color of user set
+        castling -- if move is castling
+        rook -- rook object to be moved, implied by the king's move
+        """
+
+        # castling moves are told apart by the king moving two files,
+        # make_move then moves the rook along with it
+        move = self.position.encode_move(square(piece_to_del.pos), square(pos_to_move))
+        self.position.make_move(move)
+        captured = self.position.history[-1][1]
+        if captured >= 0:
+            (self.player1 if self.player1.color == p_color else self.player2).captured.append(p_symbols[captured])
+
+    def check(self, p_color):
+        """Check if check is established
+        by finding position of king,
+        and if opponent's pieces can reach that position.
+
+        keyword arg:
+        p_color -- user's set color.
+        """
+
+        side = colors.index(p_color)
+        # find opponent king
+        king_sq = self.position.king(not side)
+        # if my piece can reach the king
+        if not self.position.is_attacked(king_sq, side):
+            return False
+        attackers = self.position.attackers(king_sq, side)
+        if attackers:
+            first = (attackers & -attackers).bit_length() - 1
+            return (self.board[square_pos(first)], self.board[square_pos(king_sq)])
+        return False
+
+    def checkmate(self, p_color, checking_p):
+        '''Check is checkmate is established
+        The opponent is in check and has no legal move,
+        captures, king moves and blocks are all part of
+        the legal move generation.
+
+        keyword arg:
+        p_color -- user's set color.
+        checking_p -- (checking piece, king) tuple from check.
+        '''
+        return bool(checking_p) and not has_legal_move(self.position)
+
+    def stalemate(self, p_color):
+        '''Check if stalemate is established
+        The opponent is not in check but has no legal move.
+
+        keyword arg:
+        p_color -- user's set color.
+        '''
+        return not self.check(p_color) and not has_legal_move(self.position)
+
+
+class player:
+    """Player class
+    store player name, set color,
+    play time elapsed in seconds, capture pieces,
+    and the engine choosing its moves, None for a person
+    """
+
+    def __init__(self, player_name, color, engine=None):
+        self.player_name = player_name
+        self.color = color.lower()
+        self.engine = engine
+        self.time_elapsed = 0
+        self.captured = []
+
+
+class board_view(Mapping):
+    '''Board view
+    maps (file, rank) tuples to piece objects, which are
+    built on demand from the mailbox of a bitboard position.
+    '''
+
+    def __init__(self, position):
+        self.position = position
+
+    def __getitem__(self, pos):
+        if not (1 <= pos[0] <= 8 and 1 <= pos[1] <= 8):
+            raise KeyError(pos)
+        code = self.position.mailbox[square(pos)]
+        if code < 0:
+            raise KeyError(pos)
+        return piece_classes[code % 6](p_names[code % 6], colors[code >= 6], pos)
+
+    def __iter__(self):
+        for sq in bits(self.position.occupied):
+            yield square_pos(sq)
+
+    def __len__(self):
+        return self.position.occupied.bit_count()
+
+
+def glyph(code):
+    '''Figurine of a piece code, '.' for an empty square'''
+    return chess.p_fig_map[p_symbols[code] if code >= 0 else '.']
+
+
+# Rank lines by (rank, piece codes), emptied when it grows past RANK_CACHE.
+_rank_lines = {}
+RANK_CACHE = 4096
+
+
+def rank_line(rank, codes):
+    '''Text of one rank of the board, cached by its piece codes
+
+    keyword arg:
+    rank -- rank number, 1 to 8
+    codes -- tuple of the eight piece codes of the rank, files a to h
+    '''
+    line = _rank_lines.get((rank, codes))
+    if line is None:
+        if len(_rank_lines) >= RANK_CACHE:
+            _rank_lines.clear()
+        line = _rank_lines[rank, codes] = (str(rank) + '  ' + ''.join(glyph(code) + ' ' for code in codes)
+                                           + ' ' + str(rank))
+    return line
+
+
+def board_text(mailbox):
+    '''The board as printed by the terminal game, ranks 8 to 1'''
+    lines = ['   a b c d e f g h']
+    for r in range(7, -1, -1):
+        lines.append(rank_line(r + 1, tuple(mailbox[r * 8:r * 8 + 8])))
+    return "\n".join(lines) + '\n   a b c d e f g h\n'
+
+
+class piece:
+    '''Chess piece class
+    initialize piece with shorthand name, color, position
+
+    '''
+    # no per-instance dict, pieces are built on every board lookup
+    __slots__ = ('piece_name', 'color', 'pos')
+    n = [1, 2, 3, 4, 5, 6, 7]
+    # ray directions of sliders, walked by iter_moves
+    directions = ()
+
+    def __init__(self, name, color, pos):
+        '''Initialze chess piece
+        with short hand name, color,
+        and initial position.
+
+        '''
+        self.piece_name = name
+        self.color = color
+        self.pos = pos
+
+    def __str__(self):
+        if self.color == 'white':
+            return self.piece_name.upper()
+        else:
+            return self.piece_name.lower()
+
+    def valid_move(self, file, rank, move, game, x=1):
+        '''Check if the legal move of a piece
+        is possibile in current board state.
+
+        '''
+        new_file = file + move[0] * x
+        new_rank = rank + move[1] * x
+        # Cannot be out of bound
+        if new_file < 1 or new_file > 8 or new_rank < 1 or new_rank > 8:
+            return False
+        # Only the step or ray towards the destination is looked at,
+        # own pieces and blocked paths rule it out.
+        return self.can_reach(game, (new_file, new_rank))
+
+    def clear_path(self, file, rank, move, game, x):
+        """Check if the path
+        to a new positon is clear of other pieces
+        """
+        new_pos = (file + move[0] * x, rank + move[1] * x)
+        between = BETWEEN[square((file, rank))][square(new_pos)]
+        return not between & game.position.occupied
+
+    def targets(self, game):
+        '''Bitboard of the pseudo-legal destinations of the piece'''
+        return game.position.targets(square(self.pos))
+
+    def available_moves(self, game):
+        '''List the (file, rank) tuples the piece can move to'''
+        return [square_pos(sq) for sq in bits(self.targets(game))]
+
+    def iter_moves(self, game):
+        '''Lazily yield the (file, rank) tuples the piece can move to,
+        sliders walk one ray at a time and stop at the first blocker,
+        so a caller looking for one square can stop early.
+        '''
+        pos = game.position
+        if not self.directions:
+            for sq in bits(self.targets(game)):
+                yield square_pos(sq)
+            return
+        own = pos.occ[self.color == 'black']
+        frm = square(self.pos)
+        for d in self.directions:
+            for sq in walk(frm, d, pos.occupied):
+                if not own >> sq & 1:
+                    yield square_pos(sq)
+
+    def can_reach(self, game, new_pos):
+        '''If the piece can move to a (file, rank) tuple,
+        without generating any of its other moves.
+        '''
+        if not (1 <= new_pos[0] <= 8 and 1 <= new_pos[1] <= 8):
+            return False
+        return game.position.can_reach(square(self.pos), square(new_pos))
+
+
+class Pawn(piece):
+    """Pawn class, child of piece
+    Redefines the available moves for a pawn.
+    """
+    __slots__ = ()
+    def targets(self, game):
+        # single and double pushes onto empty squares, diagonal captures
+        return game.position.targets(square(self.pos))
+
+
+class Rook(piece):
+    """Rook class, child of piece
+    Redefines the available moves for a rook.
+    """
+    __slots__ = ()
+    directions = ROOK_DIRS
+
+    def targets(self, game):
+        pos = game.position
+        return rook_attacks(square(self.pos), pos.occupied) & ~pos.occ[self.color == 'black']
+
+
+class Knight(piece):
+    """Knight class, child of piece
+    Redefines the available moves for a knight.
+    """
+    __slots__ = ()
+    def targets(self, game):
+        pos = game.position
+        return KNIGHT_ATTACKS[square(self.pos)] & ~pos.occ[self.color == 'black']
+
+
+class Bishop(piece):
+    """Bishop class, child of piece
+    Redefines the available moves for a bishop.
+    """
+    __slots__ = ()
+    directions = BISHOP_DIRS
+
+    def targets(self, game):
+        pos = game.position
+        return bishop_attacks(square(self.pos), pos.occupied) & ~pos.occ[self.color == 'black']
+
+
+class Queen(piece):
+    """Queen class, child of piece
+    Redefines the available moves for a queen.
+    """
+    __slots__ = ()
+    directions = ROOK_DIRS + BISHOP_DIRS
+
+    def targets(self, game):
+        pos = game.position
+        sq = square(self.pos)
+        attacks = rook_attacks(sq, pos.occupied) | bishop_attacks(sq, pos.occupied)
+        return attacks & ~pos.occ[self.color == 'black']
+
+
+class King(piece):
+    """King class, child of piece
+    Redefines the available moves for a king.
+    """
+    __slots__ = ()
+    def targets(self, game):
+        pos = game.position
+        return KING_ATTACKS[square(self.pos)] & ~pos.occ[self.color == 'black']
+
+
+# Piece classes indexed by piece type.
+piece_classes = [Pawn, Knight, Bishop, Rook, Queen, King]
@@ -0,0 +1,138 @@
+import sys
+import time
+import argparse
+import multiprocessing
+from Chess import position, legal_moves, uci
+from engine import engine, bench_positions, mate_suite, format_score, MATE, MATE_BOUND
+# References:
+# https://docs.python.org/3/library/multiprocessing.html
+# https://www.chessprogramming.org/Parallel_Search
+
+# Transposition table per root move, small enough to allocate per task.
+TASK_HASH_MB = 4
+
+
+def analyse_move(task):
+    '''Search the subtree below one root move to a fixed depth
+    with a fresh engine, so that the result does not depend on
+    which process runs it or what it searched before.
+    Returns a result dict: move, score and mate from the root side's
+    view, line starting with the root move, nodes.
+
+    keyword arg:
+    task -- (FEN of the root position, root move, depth in plies below it)
+    '''
+    fen, move, depth = task
+    pos = position().set_fen(fen)
+    pos.make_move(move)
+    searcher = engine(TASK_HASH_MB)
+    reply = searcher.search(pos, max_depth=depth)
+    if searcher.info:
+        score = -searcher.info['score']
+        line = [uci(move)] + searcher.info['pv']
+        nodes = searcher.info['nodes']
+    else:
+        # no reply: the root move mates or stalemates
+        score = MATE if pos.in_check(pos.side) else 0
+        line = [uci(move)]
+        nodes = 1
+    if reply and len(line) == 1:
+        line.append(uci(reply))
+    mate = None
+    if abs(score) >= MATE_BOUND:
+        # plies to mate below the root move, plus the root move itself
+        plies = MATE - abs(score) + 1
+        mate = (plies + 1) // 2 if score > 0 else -((plies + 1) // 2)
+    return {'move': uci(move), 'score': score, 'mate': mate, 'line': line, 'nodes': nodes}
+
+
+def merge(results):
+    '''Order root move results best first,
+    ties broken by move text so that the order is the same
+    whatever order the results arrived in.
+    '''
+    return sorted(results, key=lambda r: (-r['score'], r['move']))
+
+
+def analyse(fen, depth, workers=None):
+    '''Analyse every root move of a position
+    splitting the root moves across a pool of worker processes.
+    Returns the merged list of result dicts, best first.
+
+    keyword arg:
+    fen -- position to analyse
+    depth -- plies searched below each root move
+    workers -- number of processes, 0 or 1 analyses in this process
+               with identical output (default: CPU count)
+    '''
+    pos = position().set_fen(fen)
+    tasks = [(fen, move, depth) for move in legal_moves(pos)]
+    workers = multiprocessing.cpu_count() if workers is None else workers
+    if workers <= 1 or len(tasks) <= 1:
+        return merge(map(analyse_move, tasks))
+    with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+        # one root move per task, the subtrees vary widely in size
+        return merge(pool.imap_unordered(analyse_move, tasks, chunksize=1))
+
+
+def format_result(result):
+    '''One line report of a root move'''
+    if result['mate'] is not None:
+        score = ('mate in ' if result['mate'] > 0 else 'mated in ') + str(abs(result['mate']))
+    else:
+        score = format_score(result['score'])
+    return "{:<7} {:<12} nodes {:<8} line {}".format(
+        result['move'], score, result['nodes'], ' '.join(result['line']))
+
+
+def benchmark(depth=2, max_workers=None, out=sys.stdout):
+    '''Time-to-depth scaling
+    analyse the bench positions and the mate suite with 1 to max_workers
+    processes, checking that every worker count gives the same results.
+    Returns a list of (workers, seconds, speedup).
+    '''
+    max_workers = max_workers or multiprocessing.cpu_count()
+    fens = bench_positions + [fen for fen, _ in mate_suite]
+    counts = sorted({1, max_workers} | {n for n in (2, 4, 8, 16, 32, 64) if n < max_workers})
+    timings = []
+    reference = None
+    for workers in counts:
+        start = time.perf_counter()
+        results = [analyse(fen, depth, workers) for fen in fens]
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = results
+        elif results != reference:
+            raise AssertionError("{} workers gave different results".format(workers))
+        speedup = timings[0][1] / elapsed if timings else 1.0
+        timings.append((workers, elapsed, speedup))
+        print("workers {:>3}  depth {}  {:8.2f}s  speedup {:5.2f}x".format(
+              workers, depth, elapsed, speedup), file=out)
+    return timings
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Analyse every root move of a position across processes.")
+    parser.add_argument('fen', nargs='?', default=bench_positions[0], help="FEN of the position to analyse")
+    parser.add_argument('-d', '--depth', type=int, default=2, help="plies searched below each root move")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes, 0 to analyse in this process (default: CPU count)")
+    parser.add_argument('--bench', action='store_true',
+                        help="time the fixed positions with 1 up to --workers processes")
+    args = parser.parse_args(argv)
+    if args.bench:
+        benchmark(args.depth, args.workers)
+        return 0
+    start = time.perf_counter()
+    results = analyse(args.fen, args.depth, args.workers)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        print(format_result(result))
+    nodes = sum(r['nodes'] for r in results)
+    print("{} root moves, {} nodes in {:.2f}s".format(len(results), nodes, elapsed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+import os
+import sys
+import mmap
+import time
+import random
+import struct
+import argparse
+from array import array
+from Chess import Game, IllegalMoveError, position, board_text, san, PACKED
+from pgn import read_games, san_moves
+# References:
+# https://docs.python.org/3/library/mmap.html
+# https://www.chessprogramming.org/Encoding_Moves
+# https://en.wikipedia.org/wiki/Key_frame
+
+# File header: magic, keyframe interval.
+HEADER = struct.Struct('<4sHH')
+MAGIC = b'CGA1'
+# Game records: record length, header text length, plies, then the
+# header text as UTF-8 'name<TAB>value' lines, a packed position every
+# keyframe interval plies starting with the start position, and the
+# 16-bit move ints little-endian.
+GAME = struct.Struct('<III')
+KEYFRAME = PACKED.size
+# Offsets of the game records in the index file, one per game.
+OFFSET = struct.Struct('<Q')
+# Plies between keyframes: seeking replays at most KEYFRAMES - 1 moves.
+# The interval is a 16-bit header field, so at most MAX_KEYFRAMES.
+KEYFRAMES = 32
+MAX_KEYFRAMES = 0xFFFF
+
+
+def default_archive():
+    '''Archive the terminal game saves to, in the user data directory:
+    $XDG_DATA_HOME/terminal-chess, ~/.local/share/terminal-chess when
+    XDG_DATA_HOME is not set, or %APPDATA%\\terminal-chess on Windows
+    '''
+    if os.name == 'nt' and os.environ.get('APPDATA'):
+        base = os.environ['APPDATA']
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'terminal-chess', 'games.cga')
+
+
+def encode_headers(headers):
+    '''Header text of a dict of header names and values'''
+    return ''.join('{}\t{}\n'.format(name, str(value).replace('\t', ' ').replace('\n', ' '))
+                   for name, value in headers.items()).encode('utf-8')
+
+
+def decode_headers(data):
+    '''Dict of header names and values of header text'''
+    headers = {}
+    for line in bytes(data).decode('utf-8').splitlines():
+        name, _, value = line.partition('\t')
+        headers[name] = value
+    return headers
+
+
+def _moves_array(data):
+    '''array of the little-endian 16-bit moves of a buffer'''
+    moves = array('H', bytes(data))
+    if sys.byteorder == 'big':
+        moves.byteswap()
+    return moves
+
+
+class game_archive:
+    '''Game archive
+    an append-only file of game records, each its headers, 16-bit moves
+    and a packed keyframe of the position every KEYFRAMES plies, with an
+    index file of record offsets beside it. Records are read in place
+    through a read-only mmap, so opening an archive reads the index only
+    and reaching any ply sets up the keyframe before it and replays fewer
+    than KEYFRAMES moves.
+    Methods: append, headers, moves, position_at, game, close
+    '''
+
+    def __init__(self, path, keyframes=KEYFRAMES):
+        '''Open or create an archive
+
+        keyword arg:
+        path -- archive file, the index is path + '.idx', its directory is created
+        keyframes -- plies between keyframes of a new archive, 1 to MAX_KEYFRAMES
+        '''
+        if not 1 <= keyframes <= MAX_KEYFRAMES:
+            raise ValueError("Keyframe interval must be 1 to {}: {}".format(MAX_KEYFRAMES, keyframes))
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a+b')
+        size = os.fstat(self.file.fileno()).st_size
+        if not size:
+            self.file.write(HEADER.pack(MAGIC, keyframes, 0))
+            self.file.flush()
+            size = HEADER.size
+        self.file.seek(0)
+        magic, self.keyframes, _ = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or not self.keyframes:
+            self.file.close()
+            raise ValueError("Not a game archive: " + path)
+        self.offsets = array('Q')
+        self.index = open(path + '.idx', 'a+b')
+        self.index.seek(0)
+        self.offsets.frombytes(self.index.read())
+        # records written after the last indexed one, when the index was
+        # not updated, are found by hopping over the record lengths
+        end = self.offsets[-1] if self.offsets else HEADER.size
+        if self.offsets:
+            self.file.seek(end)
+            end += GAME.unpack(self.file.read(GAME.size))[0]
+        while end + GAME.size <= size:
+            self.file.seek(end)
+            length = GAME.unpack(self.file.read(GAME.size))[0]
+            if end + length > size:
+                break
+            self.offsets.append(end)
+            self.index.write(OFFSET.pack(end))
+            end += length
+        self.index.flush()
+        self.map = None
+        self.mapped = 0
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+        self.index.close()
+
+    def append(self, headers, moves, start=None):
+        '''Append a game, returns its game number.
+        The moves are replayed for the keyframes and must be legal.
+
+        keyword arg:
+        headers -- dict of header names and values
+        moves -- move ints from the start position
+        start -- start position, a FEN string or position (default: standard)
+        '''
+        if isinstance(start, str):
+            start = position().set_fen(start)
+        pos = position().set_packed(start.pack()) if start is not None else position().setup()
+        frames = [pos.pack()]
+        for ply, move in enumerate(moves, 1):
+            pos.make_move(move)
+            if not ply % self.keyframes:
+                frames.append(pos.pack())
+        text = encode_headers(headers)
+        data = array('H', moves)
+        if sys.byteorder == 'big':
+            data.byteswap()
+        body = text + b''.join(frames) + data.tobytes()
+        offset = self.file.seek(0, os.SEEK_END)
+        self.file.write(GAME.pack(GAME.size + len(body), len(text), len(data)) + body)
+        self.file.flush()
+        self.index.write(OFFSET.pack(offset))
+        self.index.flush()
+        self.offsets.append(offset)
+        return len(self.offsets) - 1
+
+    def _record(self, number):
+        '''(mmap, offset of the record body, header length, plies) of a game'''
+        offset = self.offsets[number]
+        if self.map is None or offset >= self.mapped:
+            # the file grew since it was mapped
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.mapped = len(self.map)
+        _, text, plies = GAME.unpack_from(self.map, offset)
+        return self.map, offset + GAME.size, text, plies
+
+    def headers(self, number):
+        '''Headers of a game as a dict'''
+        data, body, text, _ = self._record(number)
+        return decode_headers(data[body:body + text])
+
+    def plies(self, number):
+        '''Number of moves of a game'''
+        return self._record(number)[3]
+
+    def moves(self, number, first=0, last=None):
+        '''Moves of a game from ply first up to ply last as an array of ints'''
+        data, body, text, plies = self._record(number)
+        last = plies if last is None else min(last, plies)
+        start = body + text + (plies // self.keyframes + 1) * KEYFRAME
+        return _moves_array(data[start + 2 * first:start + 2 * max(first, last)])
+
+    def position_at(self, number, ply):
+        '''Position of a game after ply moves, from the keyframe at or before it
+
+        keyword arg:
+        number -- game number
+        ply -- moves played, 0 for the start position
+        '''
+        data, body, text, plies = self._record(number)
+        if not 0 <= ply <= plies:
+            raise IndexError("Game {} has {} plies".format(number, plies))
+        frame = ply // self.keyframes
+        pos = position().set_packed(data[body + text + frame * KEYFRAME:body + text + (frame + 1) * KEYFRAME])
+        for move in self.moves(number, frame * self.keyframes, ply):
+            pos.make_move(move)
+        return pos
+
+    def game(self, number):
+        '''(headers, Game replayed to its last move) of a game'''
+        game = Game()
+        game.position = self.position_at(number, 0)
+        for move in self.moves(number):
+            game.push(move)
+        return self.headers(number), game
+
+
+def import_pgn(archive, lines):
+    '''Append the games of a PGN stream, each up to its first illegal move,
+    returns the number of games appended.
+    '''
+    count = 0
+    for _, headers, movetext in read_games(lines):
+        try:
+            game = Game(headers.get('FEN'))
+        except ValueError:
+            continue
+        start = game.position.pack()
+        moves = []
+        for text in san_moves(movetext):
+            try:
+                move = game.parse_san(text)
+            except IllegalMoveError:
+                break
+            game.push(move)
+            moves.append(move)
+        archive.append(headers, moves, position().set_packed(start))
+        count += 1
+    return count
+
+
+def benchmark(path, games=1000, seeks=5000, seed=0, out=sys.stdout):
+    '''Bytes per game against PGN movetext and seek latency to random
+    plies with keyframes every 8, 32 and 128 plies and none at all,
+    over seeded random games. Returns a list of
+    (keyframe interval, bytes per game, p50 and p99 seek seconds).
+    '''
+    from notation import random_corpus
+    rng = random.Random(seed)
+    corpus = [moves for moves in random_corpus(games, seed, max_plies=300)]
+    played = []
+    for texts in corpus:
+        game = Game()
+        for text in texts:
+            game.push_san(text)
+        played.append([entry[0] for entry in game.position.history])
+    headers = {'Event': 'random', 'White': 'white player', 'Black': 'black player', 'Result': '*'}
+    pgn_bytes = sum(len(encode_headers(headers)) + len(' '.join(texts)) + 1 for texts in corpus) / games
+    plies = sum(len(moves) for moves in played) / games
+    print("{} games, {:.0f} plies per game, PGN {:.0f} bytes per game".format(games, plies, pgn_bytes), file=out)
+    results = []
+    for interval in (8, 32, 128, MAX_KEYFRAMES):
+        for name in (path, path + '.idx'):
+            if os.path.exists(name):
+                os.remove(name)
+        start = time.perf_counter()
+        with game_archive(path, interval) as archive:
+            for moves in played:
+                archive.append(headers, moves)
+        writing = time.perf_counter() - start
+        with game_archive(path) as archive:
+            targets = [(number, rng.randint(0, len(played[number]))) for number in
+                       (rng.randrange(games) for _ in range(seeks))]
+            latencies = []
+            for number, ply in targets:
+                start = time.perf_counter()
+                archive.position_at(number, ply)
+                latencies.append(time.perf_counter() - start)
+        size = (os.path.getsize(path) - HEADER.size) / games
+        latencies.sort()
+        p50, p99 = latencies[len(latencies) // 2], latencies[len(latencies) * 99 // 100]
+        results.append((interval, size, p50, p99))
+        print("keyframes {:>6}: {:6.0f} bytes per game, {:6.0f} games/s written, seek p50 {:5.0f} us, p99 {:5.0f} us".format(
+              interval if interval < MAX_KEYFRAMES else 'none', size, games / writing, p50 * 1e6, p99 * 1e6), file=out)
+    for name in (path, path + '.idx'):
+        os.remove(name)
+    return results
+
+
+def _keyframes(text):
+    '''argparse type of --keyframes'''
+    value = int(text)
+    if not 1 <= value <= MAX_KEYFRAMES:
+        raise argparse.ArgumentTypeError("must be 1 to {}".format(MAX_KEYFRAMES))
+    return value
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Store games in a compact archive with fast access to any ply.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('import', help="append the games of a PGN file to an archive")
+    add.add_argument('archive')
+    add.add_argument('pgn', help="PGN file, '-' for standard input")
+    add.add_argument('--keyframes', type=_keyframes, default=KEYFRAMES, help="plies between keyframes of a new archive")
+    listing = commands.add_parser('list', help="list the games of an archive")
+    listing.add_argument('archive')
+    show = commands.add_parser('show', help="show a game, or its board at a ply")
+    show.add_argument('archive')
+    show.add_argument('game', type=int)
+    show.add_argument('--ply', type=int, help="draw the board after this many moves")
+    bench = commands.add_parser('bench', help="bytes per game and seek latency")
+    bench.add_argument('--file', default='bench.cga', help="archive written and removed")
+    bench.add_argument('-n', '--games', type=int, default=1000)
+    bench.add_argument('--seeks', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        benchmark(args.file, args.games, args.seeks)
+        return 0
+    if args.command == 'import':
+        source = sys.stdin if args.pgn == '-' else open(args.pgn, encoding='utf-8', errors='replace')
+        try:
+            with game_archive(args.archive, args.keyframes) as archive:
+                count = import_pgn(archive, source)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        print("{} games appended".format(count))
+        return 0
+    if not os.path.exists(args.archive):
+        parser.error("no archive " + args.archive)
+    with game_archive(args.archive) as archive:
+        if args.command == 'list':
+            for number in range(len(archive)):
+                headers = archive.headers(number)
+                print("{:>6}  {} - {}  {}  {} plies  {}".format(
+                      number, headers.get('White', '?'), headers.get('Black', '?'),
+                      headers.get('Result', '*'), archive.plies(number), headers.get('Date', '')))
+        elif args.ply is not None:
+            pos = archive.position_at(args.game, args.ply)
+            print(board_text(pos.mailbox), end='')
+            print(pos.fen())
+        else:
+            for name, value in archive.headers(args.game).items():
+                print('[{} "{}"]'.format(name, value))
+            pos = archive.position_at(args.game, 0)
+            texts = []
+            for move in archive.moves(args.game):
+                if pos.side == 0 or not texts:
+                    texts.append('{}.{}'.format(pos.fullmove, '' if pos.side == 0 else '..'))
+                texts.append(san(pos, move))
+                pos.make_move(move)
+            print(' '.join(texts))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import os
+import sys
+import mmap
+import time
+import random
+import struct
+import argparse
+import tempfile
+from Chess import Game, IllegalMoveError, position, legal_moves, uci
+from pgn import read_games, san_moves
+# References:
+# https://docs.python.org/3/library/mmap.html
+# http://hgm.nubati.net/book_format.html
+
+# Book entries, sorted by key then move: Zobrist key, move int,
+# weight and a learn field, big-endian so that the file sorts bytewise.
+ENTRY = struct.Struct('>QHHI')
+KEY = struct.Struct('>Q')
+# Weight of a move by the game result for the side that played it.
+result_weights = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1)}
+
+
+def collect(lines, max_plies=24):
+    '''Count the moves played in the opening of a PGN corpus
+    returns a dict mapping (position key, move) to its weight:
+    2 per win, 1 per draw or unknown result, 0 per loss.
+
+    keyword arg:
+    lines -- iterable of PGN text lines
+    max_plies -- plies of every game that go into the book
+    '''
+    weights = {}
+    for _, headers, movetext in read_games(lines):
+        white, black = result_weights.get(headers.get('Result'), (1, 1))
+        try:
+            game = Game(headers.get('FEN'))
+        except ValueError:
+            continue
+        pos = game.position
+        for ply, san in enumerate(san_moves(movetext)):
+            if ply >= max_plies:
+                break
+            try:
+                move = game.parse_san(san)
+            except IllegalMoveError:
+                break
+            entry = (pos.key, move)
+            weights[entry] = weights.get(entry, 0) + (white if pos.side == 0 else black)
+            game.push(move)
+    return weights
+
+
+def write(path, weights, min_weight=1):
+    '''Write a book file from collected weights, returns the number of entries
+
+    keyword arg:
+    path -- output file
+    weights -- dict mapping (position key, move) to weight
+    min_weight -- moves below this weight are left out
+    '''
+    count = 0
+    with open(path, 'wb') as f:
+        for (key, move), weight in sorted(weights.items()):
+            if weight >= min_weight:
+                f.write(ENTRY.pack(key, move, min(weight, 0xFFFF), 0))
+                count += 1
+    return count
+
+
+class opening_book:
+    '''Opening book
+    a sorted file of entries searched in place through a read-only mmap,
+    so a lookup touches a few pages and never loads the whole file,
+    and processes opening the same book share it through the page cache.
+    Methods: entries, moves, choose, close
+    '''
+
+    def __init__(self, path):
+        '''Open a book file
+
+        keyword arg:
+        path -- file written by write
+        '''
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size % ENTRY.size:
+            self.file.close()
+            raise ValueError("Not a book file: " + path)
+        self.count = size // ENTRY.size
+        # mmap cannot map an empty file
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.map:
+            self.map.close()
+        self.file.close()
+
+    def entries(self, key):
+        '''Book entries of a position key
+        returns a list of (move, weight, learn) in move order.
+        '''
+        data = self.map
+        size = ENTRY.size
+        lo, hi = 0, self.count
+        # binary search for the first entry with this key
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if KEY.unpack_from(data, mid * size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < self.count:
+            entry_key, move, weight, learn = ENTRY.unpack_from(data, lo * size)
+            if entry_key != key:
+                break
+            found.append((move, weight, learn))
+            lo += 1
+        return found
+
+    def moves(self, pos):
+        '''Legal book moves of a position
+        returns a list of (move, weight), heaviest first.
+        '''
+        found = self.entries(pos.key)
+        if not found:
+            return []
+        legal = set(legal_moves(pos))
+        return sorted(((move, weight) for move, weight, _ in found if move in legal),
+                      key=lambda entry: (-entry[1], entry[0]))
+
+    def choose(self, pos, rng=random, best=False):
+        '''Book move for a position, 0 when out of book
+
+        keyword arg:
+        pos -- bitboard position
+        rng -- random source for picking moves in proportion to weight
+        best -- always pick the heaviest move
+        '''
+        moves = [(move, weight) for move, weight in self.moves(pos) if weight]
+        if not moves:
+            return 0
+        if best:
+            return moves[0][0]
+        pick = rng.randrange(sum(weight for _, weight in moves))
+        for move, weight in moves:
+            pick -= weight
+            if pick < 0:
+                return move
+
+
+def benchmark(path=None, entries=2000000, lookups=200000, seed=0, out=sys.stdout):
+    '''Lookups per second on a book of random entries
+    half of the lookups are keys in the book, half are misses.
+    Returns (lookups per second, file size in bytes).
+
+    keyword arg:
+    path -- book file to write and keep, None writes a temporary file and removes it
+    '''
+    if path is None:
+        fd, temp = tempfile.mkstemp(suffix='.bin', prefix='bench_book_')
+        os.close(fd)
+        try:
+            return benchmark(temp, entries, lookups, seed, out)
+        finally:
+            os.remove(temp)
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    keys = sorted(rng.getrandbits(64) for _ in range(entries))
+    with open(path, 'wb') as f:
+        # written in blocks to keep the build quick
+        for i in range(0, entries, 65536):
+            f.write(b''.join(ENTRY.pack(key, rng.getrandbits(16), rng.randrange(1, 100), 0)
+                             for key in keys[i:i + 65536]))
+    build = time.perf_counter() - start
+    queries = [rng.choice(keys) if i & 1 else rng.getrandbits(64) for i in range(lookups)]
+    with opening_book(path) as book:
+        start = time.perf_counter()
+        found = sum(1 for key in queries if book.entries(key))
+        elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    print("book: {} entries, {:.1f} MB, written in {:.2f}s".format(entries, size / (1 << 20), build), file=out)
+    print("{} lookups ({} hits) in {:.2f}s: {:.0f} lookups/s, {:.1f} us per lookup".format(
+          lookups, found, elapsed, lookups / elapsed, elapsed / lookups * 1e6), file=out)
+    return lookups / elapsed, size
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Build, probe and benchmark opening books.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="build a book from a PGN file")
+    build.add_argument('pgn', help="PGN file, '-' for standard input")
+    build.add_argument('-o', '--out', default='book.bin', help="book file")
+    build.add_argument('--plies', type=int, default=24, help="plies of every game that go into the book")
+    build.add_argument('--min-weight', type=int, default=1, help="leave out lighter moves")
+    probe = commands.add_parser('probe', help="list the book moves of a position")
+    probe.add_argument('book', help="book file")
+    probe.add_argument('fen', nargs='?', default=None, help="FEN of the position (default: the start)")
+    bench = commands.add_parser('bench', help="lookups per second on a book of random entries")
+    bench.add_argument('--out', default=None,
+                       help="book file to write and keep (default: a temporary file, removed afterwards)")
+    bench.add_argument('--entries', type=int, default=2000000)
+    bench.add_argument('--lookups', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        source = sys.stdin if args.pgn == '-' else open(args.pgn, encoding='utf-8', errors='replace')
+        start = time.perf_counter()
+        try:
+            weights = collect(source, args.plies)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        count = write(args.out, weights, args.min_weight)
+        print("{} entries written to {} in {:.2f}s".format(count, args.out, time.perf_counter() - start))
+    elif args.command == 'probe':
+        pos = position().set_fen(args.fen) if args.fen else position().setup()
+        with opening_book(args.book) as book:
+            for move, weight in book.moves(pos):
+                print("{} {}".format(uci(move), weight))
+    else:
+        benchmark(args.out, args.entries, args.lookups)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
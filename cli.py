@@ -0,0 +1,265 @@
+import os
+import sys
+import argparse
+import compileall
+import subprocess
+from Chess import chess, position, move_parse
+# References:
+# https://docs.python.org/3/using/cmdline.html#cmdoption-X
+# https://packaging.python.org/en/latest/specifications/entry-points/
+
+# Import budget of the rules module in milliseconds, see check_import_time.
+IMPORT_BUDGET_MS = 5.0
+
+
+class interactive:
+    '''Interactive class
+
+    Encapsulates most user interactions: beginning game, move inputs, etc.
+    Methods: move_parse, disambiguate
+    '''
+    move_parse = staticmethod(move_parse)
+
+    def __init__(self):
+        '''init for interactive class
+
+        Initialize game with on-screen instructions,
+        take user inputs to begin/end game.
+        '''
+
+        print("----------------------------------")
+        print("Welcome to the Chess app! ♕")
+        print("----------------------------------")
+        print("The game detects check, checkmate and stalemate.\n"
+              "Enter 'end' at the 'Please enter a move' prompt to exit the app at any time.")
+        while True:
+            print("Enter '1' to play a game of chess, '2' to play against the computer, "
+                  "'3' to resume a saved game, and enter 'end' to exit.")
+            user = input("What would you like to do? ")
+            print("----------------------------------")
+            if user in ('1', '2'):
+                print("White always plays first move!")
+                color1 = 'white'
+                color2 = 'black'
+                engine1 = engine2 = None
+                book = None
+                if user == '1':
+                    player1 = input("Enter white set player name: ")
+                    player2 = input("Enter black set player name: ")
+                else:
+                    # imported here, the engine module imports this one
+                    from engine import engine
+                    name = input("Enter your player name: ")
+                    side = input("Do you want to play white or black? (enter w/b) ").lower()
+                    try:
+                        seconds = float(input("Seconds the computer may think per move (default 3): ") or 3)
+                    except ValueError:
+                        seconds = 3.0
+                    book_path = input("Opening book file for the computer (press enter for none): ").strip()
+                    if book_path:
+                        from book import opening_book
+                        try:
+                            book = opening_book(book_path)
+                        except (OSError, ValueError):
+                            print("Error: cannot open the book, playing without one.")
+                    if side.startswith('b'):
+                        player1, player2 = 'Computer', name
+                        engine1 = engine(time_limit=seconds)
+                    else:
+                        player1, player2 = name, 'Computer'
+                        engine2 = engine(time_limit=seconds)
+                fen = None
+                while True:
+                    fen = input("Enter a FEN to start from, or press enter for the standard position: ").strip()
+                    try:
+                        if fen:
+                            position().set_fen(fen)
+                        break
+                    except ValueError:
+                        print("Error: invalid FEN, please enter another.")
+                print("----------------------------------")
+                print("Initializing a game of chess with " +
+                      player1 + " as " + color1 + ", and " +
+                      player2 + " as " + color2 + ". ")
+                print("----------------------------------")
+                # Initialize a game of chess and print board.
+                from archive import default_archive
+                game = chess(player1, color1, player2, color2, engine1, engine2, fen or None, book,
+                             default_tablebases(), default_archive())
+                print(game)
+                print("----------------------------------")
+                if user == '1':
+                    print("This game of chess follows the standard chess rules, and requires 2 people to play.")
+                else:
+                    print("This game of chess follows the standard chess rules, the computer plays the other side.")
+                print("Enter each move with the standard algebraic chess notation.")
+                print("For example, the pawn at e2 is moved to e4 with the command 'e4'.")
+                print("The knight at g1 can be moved to f3 with the command 'Nf3'")
+                print("Capture is represented with 'x', for example, 'Bxc6' is the command for bishop to capture a piece at c6.")
+                print("To castle, enter 'o-o' on the king side or 'o-o-o' on the queen side.")
+                print("To take back the last move, enter 'takeback'.")
+                if book:
+                    print("To list the opening book moves of the position, enter 'book'.")
+                print("----------------------------------")
+                print("The algebraic letter for each piece are:\n", chess.p_fig_map)
+                print("For more information on the notation, please visit:\nhttps://en.wikipedia.org/wiki/Algebraic_notation_(chess)")
+                print("----------------------------------")
+                yn = input("Now let us start the game? (enter y/n) ").lower()
+                print("----------------------------------")
+                if yn == 'y':
+                    game.main()
+                    print("Thank you for playing!")
+                    sys.exit(0)
+                elif yn != 'y':
+                    pass
+            elif user == '3':
+                game = saved_game()
+                if game is None:
+                    print("There is no unfinished game to resume.")
+                    continue
+                print("Resuming " + game.player1.player_name + " against " + game.player2.player_name +
+                      " after " + str(len(game.position.history)) + " moves.")
+                print(game)
+                print("----------------------------------")
+                game.main()
+                print("Thank you for playing!")
+                sys.exit(0)
+            elif user == 'end':
+                print("Thank you for playing!")
+                sys.exit(0)
+            else:
+                print("""Error: Enter 1 to play a game of chess, 2 to play against the computer, and enter end() to exit.""")
+
+    def disambiguate(list_to_disambiguate, case):
+        '''Disambiguate user intent
+        Either multiple piece can achieve the same move,
+        or King can castle to both rooks.
+
+        keyword arg:
+        list_to_disambiguate -- list of possibilities.
+        case -- argument passing which kind of disambiguation.
+        '''
+        pos_dict = {1: 'a', 2: 'b', 3: 'c', 4: 'd', 5: 'e', 6: 'f', 7: 'g', 8: 'h'}
+        while True:
+            try:
+                if case == 1:
+                    print("More than one piece can achieve the move, please disambiguate.")
+                    # iterate through list to ask which the user wants
+                    for i in range(len(list_to_disambiguate)):
+                        name = list_to_disambiguate[i].piece_name
+                        pos = pos_dict[list_to_disambiguate[i].pos[0]] + str(list_to_disambiguate[i].pos[1])
+                        print(str(i) + ". {} at {} can be moved.".format(name, pos))
+                    choice = int(input("Please choose from the above 0, 1,.... Enter just '1' to choose 1. "))
+                    # check user choice
+                    assert choice in range(len(list_to_disambiguate))
+                    return list_to_disambiguate[choice]
+                elif case == 2:
+                    # show list to ask which the user wants
+                    pos1 = pos_dict[list_to_disambiguate[0][0]] + str(list_to_disambiguate[0][1])
+                    pos2 = pos_dict[list_to_disambiguate[1][0]] + str(list_to_disambiguate[1][1])
+                    print("The King can castle either way, please disambiguate.")
+                    print("King can Castle to {} or {}.".format(pos1, pos2))
+                    choice = int(input("Enter '0' or '1' to choose from {} or {}, respectively.".format(pos1, pos2)))
+                    # check user choice
+                    assert choice in (0, 1)
+                    return list_to_disambiguate[choice]
+            except:
+                print("Please enter command following on-screen instructions.")
+                print("----------------------------------")
+
+
+def default_tablebases():
+    '''Endgame tables, when generated into the default directory'''
+    from tablebase import tablebase, DEFAULT_DIR
+    return tablebase(DEFAULT_DIR) if os.path.isdir(DEFAULT_DIR) else None
+
+
+def saved_game(path=None):
+    '''The last unfinished game of the game archive that was not resumed
+    since, set up to continue, None when there is none
+    '''
+    from archive import game_archive, default_archive
+    path = path or default_archive()
+    if not os.path.exists(path):
+        return None
+    with game_archive(path) as archive:
+        # later games name the game they resumed
+        resumed = set()
+        for number in range(len(archive) - 1, -1, -1):
+            headers = archive.headers(number)
+            if 'Resumes' in headers:
+                resumed.add(int(headers['Resumes']))
+            if headers.get('Result') == '*' and number not in resumed:
+                break
+        else:
+            return None
+        moves = archive.moves(number)
+    engines = []
+    for tag in ('White', 'Black'):
+        if tag + 'Engine' in headers:
+            # imported only when the computer plays a side
+            from engine import engine
+            engines.append(engine(time_limit=float(headers[tag + 'Engine'] or 3)))
+        else:
+            engines.append(None)
+    game = chess(headers['White'], 'white', headers['Black'], 'black', engines[0], engines[1],
+                 headers.get('FEN'), None, default_tablebases(), path)
+    game.resumes = number
+    game.resume(moves, (float(headers.get('WhiteTime', 0)), float(headers.get('BlackTime', 0))))
+    return game
+
+
+def import_time(module='Chess', runs=5):
+    '''Cumulative import time of a module in milliseconds, the best of
+    runs fresh interpreters started with python -X importtime
+    '''
+    here = os.path.dirname(os.path.abspath(__file__))
+    # measured with up to date bytecode, as an installed package has
+    path = os.path.join(here, module)
+    if os.path.isdir(path):
+        compileall.compile_dir(path, quiet=1)
+    else:
+        compileall.compile_file(path + '.py', quiet=1)
+    best = None
+    for _ in range(runs):
+        done = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                              cwd=here, capture_output=True, text=True, check=True)
+        for line in done.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                ms = int(fields[1]) / 1000
+                best = ms if best is None else min(best, ms)
+    return best
+
+
+def check_import_time(budget=IMPORT_BUDGET_MS, out=sys.stdout):
+    '''Check that importing the rules module stays within budget
+    milliseconds and has no side effects, returns True when it does.
+    '''
+    ms = import_time()
+    here = os.path.dirname(os.path.abspath(__file__))
+    # a prompt at import would block on the closed standard input
+    quiet = subprocess.run([sys.executable, '-c', 'import Chess'], cwd=here, stdin=subprocess.DEVNULL,
+                           capture_output=True, text=True, timeout=30)
+    ok = ms <= budget and not quiet.stdout and quiet.returncode == 0
+    print("import Chess: {:.2f} ms (budget {:.1f} ms), output at import: {}: {}".format(
+          ms, budget, repr(quiet.stdout[:40]) if quiet.stdout else "none", "ok" if ok else "FAILED"), file=out)
+    return ok
+
+
+def main(argv=None):
+    '''Command line entry point, the terminal game'''
+    parser = argparse.ArgumentParser(description="Play chess in the terminal.")
+    parser.add_argument('--check-import', action='store_true',
+                        help="check the import time of the rules module and exit")
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help="import budget in milliseconds")
+    args = parser.parse_args(argv)
+    if args.check_import:
+        return 0 if check_import_time(args.budget) else 1
+    interactive()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
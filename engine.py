@@ -0,0 +1,369 @@
+import sys
+import time
+import argparse
+from Chess import (position, legal_moves, uci, unpack_score, WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN,
+                   CAPTURE, PROMOTION, EP_CAPTURE, FULL_PHASE, EG_SHIFT)
+from transposition import transposition_table, EXACT, LOWER, UPPER
+# References:
+# https://www.chessprogramming.org/Alpha-Beta
+# https://www.chessprogramming.org/Iterative_Deepening
+# https://www.chessprogramming.org/Quiescence_Search
+# https://www.chessprogramming.org/MVV-LVA
+# https://www.chessprogramming.org/Tapered_Eval
+# https://www.chessprogramming.org/PeSTO%27s_Evaluation_Function
+
+INF = 32000
+MATE = 31000
+# scores beyond this are mates, stored in the table relative to the node
+MATE_BOUND = MATE - 1000
+MAX_PLY = 96
+# centipawn values by piece type, for move ordering
+values = [100, 320, 330, 500, 900, 0]
+# sign bit and mask of the middlegame half of a packed score
+SIGN = 1 << EG_SHIFT - 1
+LOW = (1 << EG_SHIFT) - 1
+
+
+def tapered(score, phase):
+    '''Blend a packed middlegame and endgame score by the game phase,
+    white's view
+    '''
+    mg, eg = unpack_score(score)
+    return (mg * phase + eg * (FULL_PHASE - phase)) // FULL_PHASE
+
+
+def evaluate(pos):
+    '''Static evaluation in centipawns from the side to move's view:
+    material and piece-square tables tapered between the middlegame and
+    the endgame. The table terms are updated by every move in pos.psqt,
+    only the phase is counted here.
+    '''
+    score = pos.psqt
+    # unpack_score and position.phase inlined, this runs at every leaf
+    mg = (score + SIGN & LOW) - SIGN
+    eg = (score - mg) >> EG_SHIFT
+    bb = pos.bb
+    phase = ((bb[KNIGHT] | bb[BISHOP] | bb[6 + KNIGHT] | bb[6 + BISHOP]).bit_count()
+             + 2 * (bb[ROOK] | bb[6 + ROOK]).bit_count() + 4 * (bb[QUEEN] | bb[6 + QUEEN]).bit_count())
+    if phase > FULL_PHASE:
+        phase = FULL_PHASE
+    score = (mg * phase + eg * (FULL_PHASE - phase)) // FULL_PHASE
+    return score if pos.side == WHITE else -score
+
+
+def evaluate_full(pos):
+    '''evaluate recomputed from the pieces on the board'''
+    score = tapered(pos.compute_psqt(), pos.phase())
+    return score if pos.side == WHITE else -score
+
+
+class SearchStopped(Exception):
+    '''Raised inside the search when the time or node budget runs out'''
+
+
+class engine:
+    '''Search engine
+    negamax alpha-beta with iterative deepening, a transposition table,
+    check extension and a quiescence search on captures.
+    Moves are ordered hash move first, then captures by MVV-LVA,
+    promotions, two killer moves per ply and the history heuristic.
+    Methods: search, choose
+    '''
+
+    def __init__(self, hash_mb=16, time_limit=None, node_limit=None, max_depth=MAX_PLY):
+        '''Set up an engine
+
+        keyword arg:
+        hash_mb -- transposition table budget in megabytes
+        time_limit -- default seconds per move
+        node_limit -- default nodes per move
+        max_depth -- default deepest iteration
+        '''
+        self.table = transposition_table(hash_mb)
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_depth = max_depth
+        self.nodes = 0
+        self.info = None
+
+    def search(self, pos, time_limit=None, node_limit=None, max_depth=None, report=None):
+        '''Search a position by iterative deepening
+        and return the best move of the last completed iteration,
+        or 0 when there is no legal move. The position is restored.
+
+        keyword arg:
+        pos -- bitboard position
+        time_limit -- seconds for this move, falls back to the engine's default
+        node_limit -- nodes for this move, falls back to the engine's default
+        max_depth -- deepest iteration
+        report -- callback given an info dict after every iteration:
+                  depth, score, nodes, time, nps, pv (UCI move texts)
+        '''
+        self.time_limit_now = time_limit if time_limit is not None else self.time_limit
+        self.node_limit_now = node_limit if node_limit is not None else self.node_limit
+        max_depth = max_depth or self.max_depth
+        self.start = time.perf_counter()
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 64 for _ in range(12)]
+        self.pv = [[] for _ in range(MAX_PLY + 2)]
+        self.table.new_search()
+        self.info = None
+        root_moves = legal_moves(pos)
+        if not root_moves:
+            return 0
+        best = root_moves[0]
+        depth_before = len(pos.history)
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._search(pos, depth, -INF, INF, 0)
+            except SearchStopped:
+                # unwind the moves the aborted iteration left on the board
+                while len(pos.history) > depth_before:
+                    pos.unmake_move()
+                break
+            if self.pv[0]:
+                best = self.pv[0][0]
+            elapsed = time.perf_counter() - self.start
+            self.info = {'depth': depth, 'score': score, 'nodes': self.nodes,
+                         'time': elapsed, 'nps': self.nodes / elapsed if elapsed else 0.0,
+                         'pv': [uci(m) for m in self.pv[0]]}
+            if report:
+                report(self.info)
+            # a new iteration costs more than all earlier ones together
+            if self.time_limit_now and elapsed > self.time_limit_now / 2:
+                break
+            if abs(score) >= MATE_BOUND and MATE - abs(score) <= depth or len(root_moves) == 1:
+                break
+        return best
+
+    def choose(self, pos):
+        '''Best move within the engine's default budget'''
+        return self.search(pos)
+
+    def _check_limits(self):
+        if self.node_limit_now and self.nodes >= self.node_limit_now:
+            raise SearchStopped()
+        if self.time_limit_now and time.perf_counter() - self.start >= self.time_limit_now:
+            raise SearchStopped()
+
+    def _order(self, pos, moves, hash_move, ply):
+        '''Sort moves best first for the search'''
+        mailbox = pos.mailbox
+        killers = self.killers[ply]
+        history = self.history
+        keyed = []
+        for move in moves:
+            if move == hash_move:
+                key = 1 << 30
+            elif move >> 12 & CAPTURE:
+                to = move >> 6 & 63
+                victim = PAWN if move >> 12 == EP_CAPTURE else mailbox[to] % 6
+                # most valuable victim, then least valuable attacker
+                key = (1 << 24) + values[victim] * 16 - mailbox[move & 63] % 6
+            elif move >> 12 & PROMOTION:
+                key = (1 << 23) + (move >> 12 & 3)
+            elif move == killers[0]:
+                key = (1 << 22) + 1
+            elif move == killers[1]:
+                key = 1 << 22
+            else:
+                key = history[mailbox[move & 63]][move >> 6 & 63]
+            keyed.append((key, move))
+        keyed.sort(reverse=True)
+        return [move for _, move in keyed]
+
+    def _search(self, pos, depth, alpha, beta, ply):
+        '''Negamax alpha-beta, returns the score from the side to move's view'''
+        self.nodes += 1
+        if not self.nodes & 1023:
+            self._check_limits()
+        self.pv[ply] = []
+        if ply:
+            if pos.halfmove >= 100 or pos.repetitions():
+                return 0
+            # mate distance pruning
+            alpha = max(alpha, -MATE + ply)
+            beta = min(beta, MATE - ply - 1)
+            if alpha >= beta:
+                return alpha
+        in_check = pos.in_check(pos.side)
+        if in_check:
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiesce(pos, alpha, beta, ply)
+
+        hash_move = 0
+        entry = self.table.probe(pos.key)
+        if entry:
+            hash_move = entry[0]
+            if ply and entry[1] >= depth:
+                score = entry[3]
+                if score >= MATE_BOUND:
+                    score -= ply
+                elif score <= -MATE_BOUND:
+                    score += ply
+                if entry[2] == EXACT or entry[2] == LOWER and score >= beta \
+                        or entry[2] == UPPER and score <= alpha:
+                    return score
+
+        moves = legal_moves(pos)
+        if not moves:
+            return -MATE + ply if in_check else 0
+        alpha_start = alpha
+        best_score = -INF
+        best_move = 0
+        for move in self._order(pos, moves, hash_move, ply):
+            pos.make_move(move)
+            score = -self._search(pos, depth - 1, -beta, -alpha, ply + 1)
+            pos.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+                    if alpha >= beta:
+                        # quiet moves that cut off are remembered for ordering
+                        if not move >> 12 & (CAPTURE | PROMOTION):
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[pos.mailbox[move & 63]][move >> 6 & 63] += depth * depth
+                        break
+
+        if best_score >= beta:
+            flag = LOWER
+        elif best_score > alpha_start:
+            flag = EXACT
+        else:
+            flag = UPPER
+        stored = best_score
+        if stored >= MATE_BOUND:
+            stored += ply
+        elif stored <= -MATE_BOUND:
+            stored -= ply
+        self.table.store(pos.key, depth, flag, stored, best_move)
+        return best_score
+
+    def _quiesce(self, pos, alpha, beta, ply):
+        '''Search captures and promotions until the position is quiet,
+        all evasions when in check.
+        '''
+        self.nodes += 1
+        if not self.nodes & 1023:
+            self._check_limits()
+        self.pv[ply] = []
+        in_check = pos.in_check(pos.side)
+        if in_check:
+            moves = legal_moves(pos)
+            if not moves:
+                return -MATE + ply
+        else:
+            # a stand-pat cutoff needs no moves
+            stand_pat = evaluate(pos)
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            moves = [m for m in legal_moves(pos) if m >> 12 & (CAPTURE | PROMOTION)]
+        if ply >= MAX_PLY:
+            return evaluate(pos)
+        best_score = -INF if in_check else alpha
+        for move in self._order(pos, moves, 0, min(ply, MAX_PLY)):
+            pos.make_move(move)
+            score = -self._quiesce(pos, -beta, -alpha, ply + 1)
+            pos.unmake_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+                    if alpha >= beta:
+                        break
+        return best_score
+
+
+def format_score(score):
+    '''Score text: pawns with sign, or mate in moves'''
+    if abs(score) >= MATE_BOUND:
+        moves = (MATE - abs(score) + 1) // 2
+        return ('#' if score > 0 else '#-') + str(moves)
+    return '{:+.2f}'.format(score / 100)
+
+
+def format_info(info):
+    '''One line report of a search iteration'''
+    return "depth {} score {} nodes {} time {:.2f}s nps {:.0f} pv {}".format(
+        info['depth'], format_score(info['score']), info['nodes'],
+        info['time'], info['nps'], ' '.join(info['pv']))
+
+
+# Positions with a forced mate for the side to move, with its length in moves.
+mate_suite = [
+    ("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", 1),
+    ("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4", 1),
+    ("kbK5/pp6/1P6/8/8/8/8/R7 w - - 0 1", 2),
+    ("r5rk/5p1p/5R2/4B3/8/8/7P/7K w - - 0 1", 3),
+]
+bench_positions = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+]
+
+
+def bench(depth=4, hash_mb=16, out=sys.stdout):
+    '''Throughput and strength benchmark:
+    fixed depth searches of the bench positions, then the mate suite.
+    Returns (total nodes, seconds, mates found, mates in the suite).
+    '''
+    nodes = 0
+    elapsed = 0.0
+    for fen in bench_positions:
+        searcher = engine(hash_mb)
+        move = searcher.search(position().set_fen(fen), max_depth=depth)
+        info = searcher.info
+        nodes += info['nodes']
+        elapsed += info['time']
+        print("{:<60} {} {}".format(fen[:60], uci(move), format_info(info)), file=out)
+    print("bench: {} nodes in {:.2f}s, {:.0f} nps".format(nodes, elapsed, nodes / elapsed), file=out)
+    found = 0
+    suite = mate_suite
+    for fen, mate_in in suite:
+        searcher = engine(hash_mb)
+        searcher.search(position().set_fen(fen), max_depth=2 * mate_in + 1)
+        score = searcher.info['score']
+        solved = score >= MATE_BOUND and (MATE - score + 1) // 2 == mate_in
+        found += solved
+        print("mate in {}: {} {}".format(mate_in, 'found' if solved else 'MISSED', format_info(searcher.info)), file=out)
+    print("mates: {}/{}".format(found, len(suite)), file=out)
+    return nodes, elapsed, found, len(suite)
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Search a position with the alpha-beta engine.")
+    parser.add_argument('fen', nargs='?', default=bench_positions[0], help="FEN of the position to search")
+    parser.add_argument('-t', '--time', type=float, default=None, help="seconds for the move")
+    parser.add_argument('-n', '--nodes', type=int, default=None, help="node budget for the move")
+    parser.add_argument('-d', '--depth', type=int, default=None, help="deepest iteration")
+    parser.add_argument('--hash', type=float, default=16, metavar='MB', help="transposition table size")
+    parser.add_argument('--bench', action='store_true', help="run the fixed depth benchmark and mate suite")
+    args = parser.parse_args(argv)
+    if args.bench:
+        _, _, found, total = bench(args.depth or 4, args.hash)
+        return 0 if found == total else 1
+    if args.time is None and args.nodes is None and args.depth is None:
+        args.time = 5.0
+    searcher = engine(args.hash)
+    move = searcher.search(position().set_fen(args.fen), args.time, args.nodes, args.depth,
+                           report=lambda info: print(format_info(info)))
+    print("bestmove " + (uci(move) if move else '(none)'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
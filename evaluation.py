@@ -0,0 +1,207 @@
+import sys
+import time
+import random
+import argparse
+from Chess import position, legal_moves, unpack_score, PSQT, PHASE_WEIGHTS, FULL_PHASE
+from engine import evaluate, evaluate_full
+from perft import positions as perft_positions
+# References:
+# https://www.chessprogramming.org/Tapered_Eval
+# https://www.chessprogramming.org/Incremental_Updates
+# https://numpy.org/doc/stable/reference/generated/numpy.take.html
+
+# Batch tables, built on first use: [code + 1, square] with row 0 for empty squares.
+_tables = None
+
+
+def _numpy():
+    '''NumPy, imported on first use, it is only needed for batches'''
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Batch evaluation needs NumPy: pip install numpy") from None
+    return numpy
+
+
+def _batch_tables(np):
+    '''Flattened middlegame, endgame and phase tables indexed by
+    (piece code + 1) * 64 + square
+    '''
+    global _tables
+    if _tables is None:
+        mg = np.zeros((13, 64), dtype=np.int32)
+        eg = np.zeros((13, 64), dtype=np.int32)
+        phase = np.zeros((13, 64), dtype=np.int32)
+        for code in range(12):
+            for sq in range(64):
+                mg[code + 1, sq], eg[code + 1, sq] = unpack_score(PSQT[code][sq])
+            phase[code + 1] = PHASE_WEIGHTS[code % 6]
+        _tables = mg.ravel(), eg.ravel(), phase.ravel()
+    return _tables
+
+
+def mailboxes(positions):
+    '''(mailboxes, sides) arrays of positions: piece codes as an
+    (n, 64) int8 array, -1 for empty squares, and the sides to move.
+    '''
+    np = _numpy()
+    boards = np.array([pos.mailbox for pos in positions], dtype=np.int8).reshape(-1, 64)
+    sides = np.array([pos.side for pos in positions], dtype=np.int8)
+    return boards, sides
+
+
+def evaluate_batch(boards, sides=None):
+    '''Evaluate many positions at once with table gathers,
+    the same scores as engine.evaluate. Returns an int32 array.
+
+    keyword arg:
+    boards -- list of positions, or an (n, 64) array of mailboxes
+    sides -- sides to move for an array of mailboxes, scores are from
+             the side to move's view; None scores them from white's view
+    '''
+    np = _numpy()
+    if not hasattr(boards, 'shape'):
+        boards, sides = mailboxes(boards)
+    mg, eg, weights = _batch_tables(np)
+    index = (boards.astype(np.int32) + 1) * 64 + np.arange(64, dtype=np.int32)
+    phase = np.minimum(np.take(weights, index).sum(axis=1), FULL_PHASE)
+    score = (np.take(mg, index).sum(axis=1) * phase
+             + np.take(eg, index).sum(axis=1) * (FULL_PHASE - phase)) // FULL_PHASE
+    if sides is not None:
+        score = np.where(sides == 0, score, -score)
+    return score.astype(np.int32)
+
+
+def random_games(games, seed=0, max_plies=200):
+    '''Every position of seeded random games, a copy per ply'''
+    rng = random.Random(seed)
+    found = []
+    for _ in range(games):
+        pos = position().setup()
+        for _ in range(max_plies):
+            moves = legal_moves(pos)
+            if not moves:
+                break
+            pos.make_move(rng.choice(moves))
+            found.append(position().set_fen(pos.fen()))
+    return found
+
+
+def _check_tree(pos, depth):
+    '''Compare the incremental score with a recomputation at every node
+    of a tree, after each make_move and after each unmake_move.
+    Returns the number of nodes checked.
+    '''
+    if pos.psqt != pos.compute_psqt() or evaluate(pos) != evaluate_full(pos):
+        raise AssertionError("incremental evaluation differs from a full recomputation in " + pos.fen())
+    if not depth:
+        return 1
+    nodes = 1
+    for move in legal_moves(pos):
+        pos.make_move(move)
+        nodes += _check_tree(pos, depth - 1)
+        pos.unmake_move()
+        if pos.psqt != pos.compute_psqt():
+            raise AssertionError("unmake_move leaves a different evaluation in " + pos.fen())
+    return nodes
+
+
+def check(games=200, depth=2, seed=0, out=sys.stdout):
+    '''Check that the incremental evaluation always equals a full
+    recomputation: at every node of a small tree below each perft position,
+    which covers castling, en passant and promotions, and along seeded random
+    games, and that the batch scores match when NumPy is available.
+    Returns the number of positions checked.
+    '''
+    checked = 0
+    for fen, _ in perft_positions.values():
+        checked += _check_tree(position().set_fen(fen), depth)
+    rng = random.Random(seed)
+    played = []
+    for _ in range(games):
+        pos = position().setup()
+        while True:
+            moves = legal_moves(pos)
+            if not moves or pos.halfmove >= 100 or len(pos.history) >= 300:
+                break
+            pos.make_move(rng.choice(moves))
+            checked += _check_tree(pos, 0)
+            played.append(position().set_fen(pos.fen()))
+        while pos.history:
+            pos.unmake_move()
+        checked += _check_tree(pos, 0)
+    try:
+        batch = evaluate_batch(played)
+    except ImportError:
+        batch = None
+    if batch is not None and batch.tolist() != [evaluate(pos) for pos in played]:
+        raise AssertionError("batch evaluation differs from evaluate")
+    print("incremental evaluation equals a full recomputation in {} positions{}".format(
+          checked, ", batch scores match" if batch is not None else ""), file=out)
+    return checked
+
+
+def benchmark(count=20000, seed=0, out=sys.stdout):
+    '''Nodes per second of make_move, evaluate and unmake_move with the
+    incremental evaluation against a full recomputation, over the moves
+    of the positions of seeded random games, and evaluations per second
+    of batches from positions and from mailbox arrays.
+    Returns a dict of the rates.
+    '''
+    found = []
+    games = 0
+    while len(found) < count:
+        found.extend(random_games(50, seed + games))
+        games += 50
+    found = found[:count]
+    rng = random.Random(seed)
+    # one legal move of every position, a search visits nodes the same way
+    nodes = [(pos, rng.choice(moves)) for pos, moves in ((pos, legal_moves(pos)) for pos in found) if moves]
+    rates = {}
+    for name, func in (('incremental', evaluate), ('full recomputation', evaluate_full)):
+        start = time.perf_counter()
+        for pos, move in nodes:
+            pos.make_move(move)
+            func(pos)
+            pos.unmake_move()
+        rates[name] = len(nodes) / (time.perf_counter() - start)
+        print("{:<20} {:>12.0f} nodes/s, make, evaluate and unmake".format(name, rates[name]), file=out)
+    try:
+        start = time.perf_counter()
+        boards, sides = mailboxes(found)
+        evaluate_batch(boards, sides)
+        rates['batch of positions'] = count / (time.perf_counter() - start)
+        start = time.perf_counter()
+        evaluate_batch(boards, sides)
+        rates['batch of mailboxes'] = count / (time.perf_counter() - start)
+    except ImportError:
+        pass
+    for name in ('batch of positions', 'batch of mailboxes'):
+        if name in rates:
+            print("{:<20} {:>12.0f} evaluations/s".format(name, rates[name]), file=out)
+    return rates
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Check and benchmark the static evaluation.")
+    parser.add_argument('fen', nargs='?', help="evaluate a position")
+    parser.add_argument('-n', '--positions', type=int, default=20000, help="positions benchmarked")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true',
+                        help="check the incremental evaluation against a full recomputation")
+    args = parser.parse_args(argv)
+    if args.fen:
+        pos = position().set_fen(args.fen)
+        mg, eg = unpack_score(pos.psqt)
+        print("middlegame {} endgame {} phase {}/{}: {} from the side to move's view".format(
+              mg, eg, pos.phase(), FULL_PHASE, evaluate(pos)))
+        return 0
+    if args.check:
+        check(seed=args.seed)
+    benchmark(args.positions, args.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
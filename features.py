@@ -0,0 +1,223 @@
+import sys
+import time
+import argparse
+from array import array
+from Chess import Game, IllegalMoveError, board_view
+from pgn import read_games, san_moves
+from packed import random_positions
+# References:
+# https://numpy.org/doc/stable/reference/generated/numpy.unpackbits.html
+# https://numpy.org/doc/stable/reference/generated/numpy.lib.format.open_memmap.html
+
+# Feature planes are indexed [position, piece code, rank - 1, file - 1],
+# piece codes as in Chess.p_symbols. State columns: side to move,
+# castling rights K, Q, k, q, en passant file (8 when none).
+PLANES = 12
+STATE_COLUMNS = 6
+# .npy headers written for streams are padded to this many bytes
+# so that the final shape can be filled in after the data.
+HEADER_BYTES = 128
+
+
+def _numpy():
+    '''NumPy, imported on first use, it is only needed for features'''
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Feature extraction needs NumPy: pip install numpy") from None
+    return numpy
+
+
+def rows(positions):
+    '''Raw feature rows of positions: the 12 bitboards,
+    then the side to move, castling rights and en passant square.
+    '''
+    for pos in positions:
+        yield pos.bb + [pos.side, pos.castling, pos.ep]
+
+
+def game_rows(games):
+    '''Raw feature rows of every position of games, the start position
+    and the position after each move. Replays stop at an illegal move
+    and games with an invalid start position are skipped.
+
+    keyword arg:
+    games -- iterable of SAN move lists, or of (FEN or None, SAN move list)
+    '''
+    for moves in games:
+        fen = None
+        if isinstance(moves, tuple):
+            fen, moves = moves
+        try:
+            game = Game(fen)
+        except ValueError:
+            continue
+        pos = game.position
+        yield pos.bb + [pos.side, pos.castling, pos.ep]
+        for san in moves:
+            try:
+                game.push_san(san)
+            except IllegalMoveError:
+                break
+            yield pos.bb + [pos.side, pos.castling, pos.ep]
+
+
+def pgn_rows(lines):
+    '''Raw feature rows of every position of the games of a PGN stream'''
+    return game_rows((headers.get('FEN'), san_moves(movetext)) for _, headers, movetext in read_games(lines))
+
+
+def encode(batch, planes=None, state=None):
+    '''Vectorised feature encoding of a batch of raw rows
+
+    keyword arg:
+    batch -- list of raw rows from rows, game_rows or pgn_rows
+    planes -- preallocated uint8 array of shape (N, 12, 8, 8) to fill
+    state -- preallocated uint8 array of shape (N, 6) to fill
+    Returns (planes, state).
+    '''
+    np = _numpy()
+    n = len(batch)
+    flat = array('Q')
+    for row in batch:
+        flat.extend(row[:PLANES])
+    # little-endian bytes put a1 first, little bit order puts file a first
+    boards = np.frombuffer(flat, dtype=np.uint64).astype('<u8', copy=False)
+    bits = np.unpackbits(boards.view(np.uint8), bitorder='little')
+    if planes is None:
+        planes = np.empty((n, PLANES, 8, 8), dtype=np.uint8)
+    planes[...] = bits.reshape(n, PLANES, 8, 8)
+    extra = np.array([row[PLANES:] for row in batch], dtype=np.int64).reshape(n, 3)
+    if state is None:
+        state = np.empty((n, STATE_COLUMNS), dtype=np.uint8)
+    state[:, 0] = extra[:, 0]
+    state[:, 1:5] = (extra[:, 1:2] >> np.arange(4)) & 1
+    state[:, 5] = np.where(extra[:, 2] >= 0, extra[:, 2] & 7, 8)
+    return planes, state
+
+
+def extract(positions):
+    '''Feature planes and state of a list of positions, see encode'''
+    return encode(list(rows(positions)))
+
+
+def _header(shape):
+    '''.npy version 1.0 header for uint8 data, padded to HEADER_BYTES'''
+    text = "{{'descr': '|u1', 'fortran_order': False, 'shape': {}, }}".format(tuple(shape))
+    text = text.ljust(HEADER_BYTES - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + len(text).to_bytes(2, 'little') + text.encode('latin1')
+
+
+def write(path, source, chunk_size=65536):
+    '''Encode a stream of raw rows in chunks into two .npy files,
+    path for the planes and path with '.state' before the
+    extension for the state, so memory stays bounded by the chunk.
+    The files load with numpy.load(path, mmap_mode='r').
+    Returns the number of positions written.
+
+    keyword arg:
+    path -- planes file, e.g. 'planes.npy'
+    source -- iterable of raw rows
+    chunk_size -- positions encoded at a time
+    '''
+    np = _numpy()
+    state_path = path[:-4] + '.state.npy' if path.endswith('.npy') else path + '.state.npy'
+    planes = np.empty((chunk_size, PLANES, 8, 8), dtype=np.uint8)
+    state = np.empty((chunk_size, STATE_COLUMNS), dtype=np.uint8)
+    count = 0
+    with open(path, 'wb') as planes_file, open(state_path, 'wb') as state_file:
+        # placeholders, rewritten with the final count
+        planes_file.write(_header((0, PLANES, 8, 8)))
+        state_file.write(_header((0, STATE_COLUMNS)))
+        batch = []
+        for row in source:
+            batch.append(row)
+            if len(batch) == chunk_size:
+                encode(batch, planes, state)
+                planes_file.write(planes.tobytes())
+                state_file.write(state.tobytes())
+                count += len(batch)
+                batch = []
+        if batch:
+            n = len(batch)
+            encode(batch, planes[:n], state[:n])
+            planes_file.write(planes[:n].tobytes())
+            state_file.write(state[:n].tobytes())
+            count += n
+        planes_file.seek(0)
+        planes_file.write(_header((count, PLANES, 8, 8)))
+        state_file.seek(0)
+        state_file.write(_header((count, STATE_COLUMNS)))
+    return count
+
+
+def object_planes(positions):
+    '''The same planes built by walking the piece objects of each board,
+    the slow path the batch encoder replaces, as nested lists.
+    '''
+    result = []
+    for pos in positions:
+        planes = [[[0] * 8 for _ in range(8)] for _ in range(PLANES)]
+        for p in board_view(pos).values():
+            code = 'pnbrqk'.index(p.piece_name) + (6 if p.color == 'black' else 0)
+            planes[code][p.pos[1] - 1][p.pos[0] - 1] = 1
+        result.append(planes)
+    return result
+
+
+def benchmark(count=20000, chunk_size=4096, out=sys.stdout):
+    '''Positions per second of the batch encoder against walking
+    the piece objects, on positions from seeded random games,
+    checking that both give the same planes.
+    Returns (batch positions/s, object positions/s).
+    '''
+    np = _numpy()
+    positions = random_positions(max(1, count // 40), max_plies=80)
+    # every position of the random games would be closer to real data,
+    # repeating the sample keeps the benchmark quick to set up
+    positions = (positions * (count // len(positions) + 1))[:count]
+    raw = list(rows(positions))
+    planes = np.empty((chunk_size, PLANES, 8, 8), dtype=np.uint8)
+    state = np.empty((chunk_size, STATE_COLUMNS), dtype=np.uint8)
+    start = time.perf_counter()
+    for i in range(0, count, chunk_size):
+        batch = raw[i:i + chunk_size]
+        encode(batch, planes[:len(batch)], state[:len(batch)])
+    batch_rate = count / (time.perf_counter() - start)
+    sample = positions[:min(count, 2000)]
+    start = time.perf_counter()
+    slow = object_planes(sample)
+    object_rate = len(sample) / (time.perf_counter() - start)
+    if not np.array_equal(np.array(slow, dtype=np.uint8), extract(sample)[0]):
+        raise AssertionError("Batch planes differ from the piece objects")
+    print("batch encode: {:.0f} positions/s (chunks of {})".format(batch_rate, chunk_size), file=out)
+    print("piece objects: {:.0f} positions/s".format(object_rate), file=out)
+    return batch_rate, object_rate
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Encode positions as (N, 12, 8, 8) NumPy feature planes.")
+    parser.add_argument('pgn', nargs='?', help="PGN file whose positions are encoded, '-' for standard input")
+    parser.add_argument('-o', '--out', default='planes.npy', help="planes file, the state goes to *.state.npy")
+    parser.add_argument('--chunk', type=int, default=65536, help="positions encoded at a time")
+    parser.add_argument('--bench', type=int, default=0, metavar='N', help="benchmark N positions")
+    args = parser.parse_args(argv)
+    if args.bench or not args.pgn:
+        benchmark(args.bench or 20000)
+        return 0
+    source = sys.stdin if args.pgn == '-' else open(args.pgn, encoding='utf-8', errors='replace')
+    start = time.perf_counter()
+    try:
+        count = write(args.out, pgn_rows(source), args.chunk)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    elapsed = time.perf_counter() - start
+    print("{} positions written to {} in {:.2f}s: {:.0f} positions/s".format(
+          count, args.out, elapsed, count / elapsed if elapsed else 0.0), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
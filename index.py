@@ -0,0 +1,527 @@
+import os
+import sys
+import json
+import time
+import zlib
+import heapq
+import random
+import struct
+import argparse
+import multiprocessing
+from array import array
+from bisect import bisect_right
+from collections import deque
+from Chess import Game, IllegalMoveError, position, parse_move, san, uci
+from pgn import read_games, san_moves
+# References:
+# https://en.wikipedia.org/wiki/Log-structured_merge-tree
+# https://docs.python.org/3/library/heapq.html#heapq.merge
+# https://docs.python.org/3/library/os.html#os.pread
+
+# Index entries, sorted by key then game then ply: Zobrist key of a position,
+# game id, ply, the move played next (0 after the last move) and the result,
+# big-endian so that the entries sort bytewise.
+ENTRY = struct.Struct('>QIHHB')
+KEY = struct.Struct('>Q')
+# Segment files: zlib blocks of BLOCK entries, then the directory of the
+# blocks (first key, file offset, compressed length, entries), then a trailer.
+BLOCK = 1024
+DIRECTORY = struct.Struct('<QQII')
+TRAILER = struct.Struct('<4sQQI')
+MAGIC = b'PIX1'
+# Offsets of the game records in games.jsonl, one per game id.
+OFFSET = struct.Struct('<Q')
+# Entries held in memory before they are written as a segment,
+# and segments allowed before they are merged into one.
+FLUSH_ENTRIES = 1 << 20
+MAX_SEGMENTS = 8
+# Blocks kept decompressed per segment.
+CACHE_BLOCKS = 64
+# Result codes by PGN result.
+RESULTS = {'1-0': 1, '0-1': 2, '1/2-1/2': 3}
+result_names = ('*', '1-0', '0-1', '1/2-1/2')
+# Headers kept for every game.
+GAME_HEADERS = ('Event', 'Site', 'Date', 'White', 'Black', 'Result')
+
+
+def game_entries(task):
+    '''Index entries of every position of one game, the start position
+    and the position after each move. The replay stops at an illegal move.
+    Returns (entries, None) or, for a game cut short, (entries, the reason).
+
+    keyword arg:
+    task -- (game id, FEN or None, movetext, result)
+    '''
+    game_id, fen, movetext, result = task
+    try:
+        pos = Game(fen).position
+    except ValueError as e:
+        return [], str(e)
+    code = RESULTS.get(result, 0)
+    entries = []
+    truncated = None
+    ply = 0
+    for text in san_moves(movetext):
+        try:
+            move = parse_move(pos, text)
+        except IllegalMoveError:
+            truncated = "illegal move {} at ply {}".format(text, ply + 1)
+            break
+        entries.append(ENTRY.pack(pos.key, game_id, ply, move, code))
+        pos.make_move(move)
+        ply += 1
+    entries.append(ENTRY.pack(pos.key, game_id, ply, 0, code))
+    return entries, truncated
+
+
+def chunk_entries(tasks):
+    '''game_entries of a list of games'''
+    return [game_entries(task) for task in tasks]
+
+
+def write_segment(path, entries):
+    '''Write sorted entries as a segment file, returns the number of entries
+
+    keyword arg:
+    path -- segment file
+    entries -- iterable of packed entries in sorted order
+    '''
+    directory = []
+    count = 0
+    block = []
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        def flush():
+            data = zlib.compress(b''.join(block))
+            directory.append(DIRECTORY.pack(KEY.unpack_from(block[0])[0], f.tell(), len(data), len(block)))
+            f.write(data)
+        for entry in entries:
+            block.append(entry)
+            if len(block) == BLOCK:
+                flush()
+                count += len(block)
+                block = []
+        if block:
+            flush()
+            count += len(block)
+        start = f.tell()
+        f.write(b''.join(directory))
+        f.write(TRAILER.pack(MAGIC, count, start, len(directory)))
+    os.replace(temp, path)
+    return count
+
+
+class segment:
+    '''Index segment
+    a sorted file of compressed blocks whose directory, the first key
+    of every block, is held in memory: a lookup bisects the directory
+    and reads the one or two blocks that can hold the key.
+    Methods: lookup, entries, close
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        size = os.fstat(self.fd).st_size
+        if size < TRAILER.size:
+            os.close(self.fd)
+            raise ValueError("Not an index segment: " + path)
+        magic, self.count, start, blocks = TRAILER.unpack(os.pread(self.fd, TRAILER.size, size - TRAILER.size))
+        if magic != MAGIC:
+            os.close(self.fd)
+            raise ValueError("Not an index segment: " + path)
+        data = os.pread(self.fd, blocks * DIRECTORY.size, start)
+        # first key and file offset of every block, blocks are contiguous
+        # so the offset of the directory ends the last one
+        self.first_keys = array('Q')
+        self.offsets = array('Q')
+        for first, offset, length, entries in DIRECTORY.iter_unpack(data):
+            self.first_keys.append(first)
+            self.offsets.append(offset)
+        self.offsets.append(start)
+        self.cache = {}
+        self.reads = 0
+
+    def close(self):
+        os.close(self.fd)
+
+    def block(self, i):
+        '''Decompressed entries of block i, cached'''
+        data = self.cache.pop(i, None)
+        if data is None:
+            offset = self.offsets[i]
+            data = zlib.decompress(os.pread(self.fd, self.offsets[i + 1] - offset, offset))
+            self.reads += 1
+            if len(self.cache) >= CACHE_BLOCKS:
+                del self.cache[next(iter(self.cache))]
+        self.cache[i] = data
+        return data
+
+    def lookup(self, key):
+        '''Entries of a position key, a list of (game id, ply, move, result)'''
+        size = ENTRY.size
+        # the last block starting before the key, a run of equal keys
+        # can start at the end of the block before the first one starting with it
+        i = max(0, bisect_right(self.first_keys, key - 1) - 1) if key else 0
+        found = []
+        while i < len(self.first_keys) and self.first_keys[i] <= key:
+            data = self.block(i)
+            lo, hi = 0, len(data) // size
+            while lo < hi:
+                mid = (lo + hi) >> 1
+                if KEY.unpack_from(data, mid * size)[0] < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            for offset in range(lo * size, len(data), size):
+                entry_key, game_id, ply, move, result = ENTRY.unpack_from(data, offset)
+                if entry_key != key:
+                    return found
+                found.append((game_id, ply, move, result))
+            i += 1
+        return found
+
+    def entries(self):
+        '''Iterate the packed entries in order, for merging'''
+        size = ENTRY.size
+        for i in range(len(self.first_keys)):
+            offset = self.offsets[i]
+            data = zlib.decompress(os.pread(self.fd, self.offsets[i + 1] - offset, offset))
+            for i in range(0, len(data), size):
+                yield data[i:i + size]
+
+
+class position_index:
+    '''Position index
+    answers which games reached a position, with the move played next
+    and the result. Games are appended in memory and written as sorted
+    segments, and the smallest segments are merged when there are more
+    than MAX_SEGMENTS, as in a size-tiered log-structured merge tree.
+    MANIFEST lists the live segments, games.jsonl holds the headers of
+    every game, with a Truncated header for a game indexed only up to
+    an illegal move.
+    Methods: add_game, add_pgn, flush, compact, lookup, query, game, close
+    '''
+
+    def __init__(self, directory, flush_entries=FLUSH_ENTRIES, max_segments=MAX_SEGMENTS):
+        '''Open or create an index
+
+        keyword arg:
+        directory -- index directory, created if missing
+        flush_entries -- entries held in memory before a segment is written
+        max_segments -- segments allowed before the smallest are merged
+        '''
+        self.directory = directory
+        self.flush_entries = flush_entries
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+        manifest = os.path.join(directory, 'MANIFEST')
+        state = {'segments': [], 'games': 0, 'next': 0}
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                state = json.load(f)
+        self.games = state['games']
+        self.next_segment = state['next']
+        self.segments = [segment(os.path.join(directory, name)) for name in state['segments']]
+        self.pending = []
+        self.pending_games = []
+        self.games_file = open(os.path.join(directory, 'games.jsonl'), 'ab')
+        self.offsets_file = open(os.path.join(directory, 'games.idx'), 'ab')
+        self.offsets = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        '''Write what is pending and close the files'''
+        self.flush()
+        for seg in self.segments:
+            seg.close()
+        self.games_file.close()
+        self.offsets_file.close()
+
+    def _save_manifest(self):
+        path = os.path.join(self.directory, 'MANIFEST')
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'segments': [os.path.basename(seg.path) for seg in self.segments],
+                       'games': self.games, 'next': self.next_segment}, f)
+        os.replace(path + '.tmp', path)
+
+    def _add(self, headers, result):
+        entries, truncated = result
+        record = {name: headers[name] for name in GAME_HEADERS if name in headers}
+        if truncated:
+            record['Truncated'] = truncated
+        self.pending_games.append(record)
+        self.pending.extend(entries)
+        self.games += 1
+        if len(self.pending) >= self.flush_entries:
+            self.flush()
+
+    def add_game(self, headers, movetext):
+        '''Index the positions of a game, returns its game id
+
+        keyword arg:
+        headers -- dict of PGN headers, FEN and Result are used
+        movetext -- SAN movetext of the game
+        '''
+        game_id = self.games
+        self._add(headers, game_entries((game_id, headers.get('FEN'), movetext, headers.get('Result'))))
+        return game_id
+
+    def add_pgn(self, lines, workers=None, chunk_size=64):
+        '''Index every game of a PGN stream, returns the number of games
+
+        keyword arg:
+        lines -- iterable of PGN text lines
+        workers -- processes replaying games, 0 or 1 to replay them here
+        chunk_size -- games sent to a worker at a time
+        '''
+        first = self.games
+        workers = multiprocessing.cpu_count() if workers is None else workers
+        if workers <= 1:
+            for _, headers, movetext in read_games(lines):
+                self._add(headers, game_entries((self.games, headers.get('FEN'), movetext, headers.get('Result'))))
+            return self.games - first
+        # (headers, async result) of the chunks sent to the workers in game
+        # order; at most two chunks per worker are read ahead, so the stream
+        # is read only as fast as the games are indexed
+        inflight = deque()
+        with multiprocessing.Pool(workers) as pool:
+            chunk = []
+            for number, (_, headers, movetext) in enumerate(read_games(lines), first):
+                chunk.append((headers, (number, headers.get('FEN'), movetext, headers.get('Result'))))
+                if len(chunk) == chunk_size:
+                    inflight.append(self._submit(pool, chunk))
+                    chunk = []
+                    if len(inflight) >= 2 * workers:
+                        self._collect(*inflight.popleft())
+            if chunk:
+                inflight.append(self._submit(pool, chunk))
+            while inflight:
+                self._collect(*inflight.popleft())
+        return self.games - first
+
+    @staticmethod
+    def _submit(pool, chunk):
+        return [headers for headers, _ in chunk], pool.apply_async(chunk_entries, ([task for _, task in chunk],))
+
+    def _collect(self, headers, results):
+        for game_headers, result in zip(headers, results.get()):
+            self._add(game_headers, result)
+
+    def flush(self):
+        '''Write the pending entries as a new segment and merge
+        the segments when there are too many.
+        '''
+        if not self.pending and not self.pending_games:
+            return
+        if self.pending:
+            self.pending.sort()
+            name = 'segment-{:06d}.pix'.format(self.next_segment)
+            self.next_segment += 1
+            write_segment(os.path.join(self.directory, name), self.pending)
+            self.segments.append(segment(os.path.join(self.directory, name)))
+            self.pending = []
+        offset = self.games_file.tell()
+        offsets = []
+        for record in self.pending_games:
+            line = (json.dumps(record) + '\n').encode()
+            offsets.append(OFFSET.pack(offset))
+            offset += len(line)
+            self.games_file.write(line)
+        self.games_file.flush()
+        self.offsets_file.write(b''.join(offsets))
+        self.offsets_file.flush()
+        self.pending_games = []
+        self.offsets = None
+        self._save_manifest()
+        if len(self.segments) > self.max_segments:
+            # merge the smallest segments, down to half the limit, so that
+            # the large ones are not rewritten by every compaction
+            by_size = sorted(self.segments, key=lambda seg: seg.count)
+            self.compact(by_size[:len(self.segments) - self.max_segments // 2])
+
+    def compact(self, segments=None):
+        '''Merge segments into one
+
+        keyword arg:
+        segments -- the segments to merge, default all of them
+        '''
+        self.flush()
+        old = self.segments if segments is None else segments
+        if len(old) < 2:
+            return
+        name = 'segment-{:06d}.pix'.format(self.next_segment)
+        self.next_segment += 1
+        write_segment(os.path.join(self.directory, name), heapq.merge(*[seg.entries() for seg in old]))
+        self.segments = [seg for seg in self.segments if seg not in old]
+        self.segments.append(segment(os.path.join(self.directory, name)))
+        self._save_manifest()
+        for seg in old:
+            seg.close()
+            os.remove(seg.path)
+
+    def lookup(self, key):
+        '''Entries of a position key over all segments and pending games,
+        a list of (game id, ply, move, result) in game order.
+        '''
+        found = []
+        for seg in self.segments:
+            found.extend(seg.lookup(key))
+        if self.pending:
+            prefix = KEY.pack(key)
+            found.extend(ENTRY.unpack(entry)[1:] for entry in self.pending if entry.startswith(prefix))
+        found.sort()
+        return found
+
+    def game(self, game_id):
+        '''Headers of a game by id'''
+        written = self.games - len(self.pending_games)
+        if game_id >= written:
+            return self.pending_games[game_id - written]
+        if self.offsets is None:
+            with open(os.path.join(self.directory, 'games.idx'), 'rb') as f:
+                self.offsets = array('Q', f.read())
+        with open(os.path.join(self.directory, 'games.jsonl'), 'rb') as f:
+            f.seek(self.offsets[game_id])
+            return json.loads(f.readline())
+
+    def query(self, pos, limit=None, headers=True):
+        '''Games that reached a position
+        returns dicts with game, ply, move (SAN, None after the last move),
+        uci, result and the game's headers.
+
+        keyword arg:
+        pos -- bitboard position or FEN
+        limit -- at most this many games, with every hit of each
+        headers -- read the headers of the games
+        '''
+        if isinstance(pos, str):
+            pos = position().set_fen(pos)
+        hits = []
+        games = set()
+        for game_id, ply, move, result in self.lookup(pos.key):
+            if game_id not in games:
+                if limit is not None and len(games) >= limit:
+                    break
+                games.add(game_id)
+            hit = {'game': game_id, 'ply': ply, 'move': san(pos, move) if move else None,
+                   'uci': uci(move) if move else None, 'result': result_names[result]}
+            if headers:
+                hit['headers'] = self.game(game_id)
+            hits.append(hit)
+        return hits
+
+
+def benchmark(directory, games=2000, entries=0, lookups=2000, seed=0, workers=0, out=sys.stdout):
+    '''Indexing throughput on seeded random games, or on entries random
+    entries when given, then the latency of lookups of indexed positions
+    and of misses. Returns (positions indexed per second, p50 and p99 lookup seconds).
+    '''
+    rng = random.Random(seed)
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        os.remove(os.path.join(directory, name))
+    keys = []
+    start = time.perf_counter()
+    with position_index(directory) as index:
+        if entries:
+            # synthetic entries: many positions, each reached by a few games
+            count = 0
+            for i in range(0, entries, FLUSH_ENTRIES):
+                batch = [ENTRY.pack(rng.getrandbits(64), rng.randrange(1 << 24), rng.randrange(200),
+                                    rng.getrandbits(16), rng.randrange(4))
+                         for _ in range(min(FLUSH_ENTRIES, entries - i))]
+                keys.extend(KEY.unpack_from(entry)[0] for entry in batch[:lookups])
+                index.pending.extend(batch)
+                index.flush()
+                count += len(batch)
+            index.compact()
+        else:
+            from notation import random_corpus
+            lines = []
+            for number, moves in enumerate(random_corpus(games, seed)):
+                lines.append('[Event "random {}"]\n[Result "*"]\n\n{} *\n\n'.format(number, ' '.join(moves)))
+            start = time.perf_counter()
+            index.add_pgn(''.join(lines).splitlines(), workers)
+            index.flush()
+            count = sum(seg.count for seg in index.segments)
+        elapsed = time.perf_counter() - start
+        print("indexed {} positions in {:.2f}s: {:.0f} positions/s, {} segments, {:.1f} MB".format(
+              count, elapsed, count / elapsed, len(index.segments),
+              sum(os.path.getsize(seg.path) for seg in index.segments) / (1 << 20)), file=out)
+        if not keys:
+            seg = index.segments[0]
+            for _ in range(lookups):
+                data = seg.block(rng.randrange(len(seg.first_keys)))
+                keys.append(KEY.unpack_from(data, rng.randrange(len(data) // ENTRY.size) * ENTRY.size)[0])
+        for seg in index.segments:
+            seg.cache.clear()
+            seg.reads = 0
+        queries = [keys[i % len(keys)] if i & 1 else rng.getrandbits(64) for i in range(lookups)]
+        latencies = []
+        hits = 0
+        for key in queries:
+            start = time.perf_counter()
+            hits += bool(index.lookup(key))
+            latencies.append(time.perf_counter() - start)
+        reads = sum(seg.reads for seg in index.segments)
+    latencies.sort()
+    p50, p99 = latencies[len(latencies) // 2], latencies[len(latencies) * 99 // 100]
+    print("{} lookups ({} hits): p50 {:.0f} us, p99 {:.0f} us, {:.2f} block reads per lookup".format(
+          lookups, hits, p50 * 1e6, p99 * 1e6, reads / lookups), file=out)
+    return count / elapsed, p50, p99
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Index the positions of a game archive and query them.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="append the games of a PGN file to an index")
+    add.add_argument('index', help="index directory")
+    add.add_argument('pgn', help="PGN file, '-' for standard input")
+    add.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    query = commands.add_parser('query', help="games that reached a position")
+    query.add_argument('index', help="index directory")
+    query.add_argument('fen', help="FEN of the position")
+    query.add_argument('--limit', type=int, default=20)
+    compact = commands.add_parser('compact', help="merge the segments of an index into one")
+    compact.add_argument('index', help="index directory")
+    bench = commands.add_parser('bench', help="indexing throughput and lookup latency")
+    bench.add_argument('--dir', default='bench_index', help="index directory, emptied first")
+    bench.add_argument('--games', type=int, default=2000, help="seeded random games to index")
+    bench.add_argument('--entries', type=int, default=0, help="index this many random entries instead")
+    bench.add_argument('--lookups', type=int, default=2000)
+    bench.add_argument('-j', '--workers', type=int, default=0, help="worker processes")
+    args = parser.parse_args(argv)
+
+    if args.command == 'add':
+        source = sys.stdin if args.pgn == '-' else open(args.pgn, encoding='utf-8', errors='replace')
+        start = time.perf_counter()
+        try:
+            with position_index(args.index) as index:
+                count = index.add_pgn(source, args.workers)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        print("{} games indexed in {:.2f}s".format(count, time.perf_counter() - start))
+    elif args.command == 'query':
+        with position_index(args.index) as index:
+            for hit in index.query(args.fen, args.limit):
+                game = hit['headers']
+                print("game {} ply {}: {} ({}) {} - {} {}".format(
+                      hit['game'], hit['ply'], hit['move'] or '-', hit['result'],
+                      game.get('White', '?'), game.get('Black', '?'), game.get('Date', '')))
+    elif args.command == 'compact':
+        with position_index(args.index) as index:
+            index.compact()
+    else:
+        benchmark(args.dir, args.games, args.entries, args.lookups, workers=args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from Chess import Game, uci
+# References:
+# https://docs.python.org/3/library/asyncio-stream.html
+
+# Distinct scripted games, reused round robin by the sessions.
+SCRIPTS = 64
+
+
+def scripts(count, plies, seed=0):
+    '''Seeded random games as (UCI moves, ended) pairs, ending early
+    on checkmate or a draw so that every move is legal. ended tells
+    whether the rules ended the game, otherwise the side to move
+    resigns once the moves run out.
+    '''
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = Game()
+        moves = []
+        while len(moves) < plies and game.outcome() is None:
+            move = rng.choice(game.legal_moves())
+            game.push(move)
+            moves.append(uci(move))
+        games.append((moves, game.outcome() is not None))
+    return games
+
+
+class client:
+    '''One connection playing one colour of a scripted game,
+    recording the time from sending each move to its acknowledgement.
+    '''
+
+    def __init__(self, reader, writer, color, script, latencies):
+        self.reader = reader
+        self.writer = writer
+        self.color = color
+        self.moves, self.ended = script
+        self.latencies = latencies
+        self.ply = 0
+        self.sent = None
+
+    def _play(self):
+        if self.ply >= len(self.moves):
+            # the script is over, the side to move ends the game
+            # unless the server ends it by the rules
+            if not self.ended:
+                self.writer.write(b'RESIGN\n')
+            return
+        self.sent = time.perf_counter()
+        self.writer.write('MOVE {}\n'.format(self.moves[self.ply]).encode())
+
+    async def run(self):
+        '''Play until the game is over'''
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            words = line.split()
+            if words[0] == b'START':
+                if self.color == 0:
+                    self._play()
+            elif words[0] == b'OK':
+                self.latencies.append(time.perf_counter() - self.sent)
+            elif words[0] == b'MOVED':
+                self.ply += 1
+                if self.ply % 2 == self.color:
+                    self._play()
+            elif words[0] == b'OVER':
+                return
+            elif words[0] == b'ERR':
+                raise RuntimeError(line.decode().strip())
+
+
+async def _connect(host, port, limit):
+    async with limit:
+        return await asyncio.open_connection(host, port)
+
+
+async def run(host, port, sessions, plies, seed=0, out=sys.stdout):
+    '''Play sessions scripted games at once against a server
+    returns (moves, seconds, moves per second, p50 and p99 latency in seconds).
+    '''
+    games = scripts(min(SCRIPTS, sessions), plies, seed)
+    limit = asyncio.Semaphore(256)
+    start = time.perf_counter()
+    streams = await asyncio.gather(*[_connect(host, port, limit) for _ in range(2 * sessions)])
+    print("{} connections in {:.2f}s".format(len(streams), time.perf_counter() - start), file=out)
+    latencies = []
+    players = []
+    for i in range(sessions):
+        (r1, w1), (r2, w2) = streams[2 * i], streams[2 * i + 1]
+        w1.write(b'NEW 3600\n')
+        line = await r1.readline()
+        w2.write(b'JOIN ' + line.split()[1] + b'\n')
+        script = games[i % len(games)]
+        players.append(client(r1, w1, 0, script, latencies))
+        players.append(client(r2, w2, 1, script, latencies))
+    start = time.perf_counter()
+    await asyncio.gather(*[p.run() for p in players])
+    elapsed = time.perf_counter() - start
+    for _, writer in streams:
+        writer.close()
+    latencies.sort()
+    moves = len(latencies)
+    p50 = latencies[moves // 2] if moves else 0.0
+    p99 = latencies[min(moves - 1, moves * 99 // 100)] if moves else 0.0
+    print("{} sessions, {} moves in {:.2f}s: {:.0f} moves/s, latency p50 {:.1f} ms, p99 {:.1f} ms".format(
+          sessions, moves, elapsed, moves / elapsed, p50 * 1000, p99 * 1000), file=out)
+    return moves, elapsed, moves / elapsed, p50, p99
+
+
+def _wait_for_port(host, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Server did not start on {}:{}".format(host, port))
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Load test the game server with scripted games.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-n', '--sessions', type=int, default=1000, help="concurrent games, two connections each")
+    parser.add_argument('--plies', type=int, default=40, help="plies per scripted game")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help="start a server process for the test")
+    args = parser.parse_args(argv)
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, 'server.py', '--host', args.host, '--port', str(args.port)],
+                                  cwd=sys.path[0] or '.')
+        _wait_for_port(args.host, args.port)
+    try:
+        asyncio.run(run(args.host, args.port, args.sessions, args.plies, args.seed))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import sys
+import time
+import random
+import argparse
+import Chess
+from Chess import Game, IllegalMoveError, legal_moves, san, lan, uci, parse_move
+from pgn import read_games, san_moves
+# References:
+# https://en.wikipedia.org/wiki/Algebraic_notation_(chess)
+# https://www.chessprogramming.org/Algebraic_Chess_Notation
+
+
+def random_corpus(games, seed=0, max_plies=120):
+    '''Seeded random games as lists of SAN moves'''
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(games):
+        game = Game()
+        moves = []
+        while len(moves) < max_plies and game.outcome() is None:
+            move = rng.choice(game.legal_moves())
+            moves.append(game.san(move))
+            game.push(move)
+        corpus.append(moves)
+    return corpus
+
+
+def pgn_corpus(lines):
+    '''Games of a PGN stream as (FEN or None, SAN move list), lists so
+    that the corpus can be replayed more than once
+    '''
+    return [(headers.get('FEN'), list(san_moves(movetext))) for _, headers, movetext in read_games(lines)]
+
+
+def clear_caches():
+    '''Empty the memoised notation and move caches'''
+    Chess.game._notation.clear()
+    Chess.game._move_cache.clear()
+
+
+def replay(corpus):
+    '''Parse and play every move of a corpus, timing the parsing only.
+    Games stop at their first illegal move.
+    Returns (seconds spent parsing, (FEN or None, move ints) of the games played).
+    '''
+    clock = time.perf_counter
+    parsing = 0.0
+    played = []
+    for moves in corpus:
+        fen = None
+        if isinstance(moves, tuple):
+            fen, moves = moves
+        pos = Game(fen).position
+        ints = []
+        for text in moves:
+            start = clock()
+            try:
+                move = parse_move(pos, text)
+            except IllegalMoveError:
+                break
+            finally:
+                parsing += clock() - start
+            pos.make_move(move)
+            ints.append(move)
+        played.append((fen, ints))
+    return parsing, played
+
+
+def round_trip(corpus, out=sys.stdout):
+    '''Check that the SAN, long algebraic and UCI text of every legal move
+    of every position of a corpus parses back to the same move,
+    returns the number of moves checked.
+    '''
+    checked = 0
+    for moves in corpus:
+        fen = None
+        if isinstance(moves, tuple):
+            fen, moves = moves
+        game = Game(fen)
+        pos = game.position
+        for text in moves:
+            for move in legal_moves(pos):
+                for written in (san(pos, move), lan(pos, move), uci(move)):
+                    if parse_move(pos, written) != move:
+                        raise AssertionError("{} parses to {} instead of {} in {}".format(
+                            written, uci(parse_move(pos, written)), uci(move), pos.fen()))
+                checked += 1
+            try:
+                pos.make_move(parse_move(pos, text))
+            except IllegalMoveError:
+                break
+    print("round trip: {} moves written as SAN, long algebraic and UCI parse back".format(checked), file=out)
+    return checked
+
+
+def benchmark(corpus, out=sys.stdout):
+    '''Moves parsed per second over a corpus with empty caches and
+    on a second pass over the same games, and SAN written per second,
+    timing the parser and writer only, not making the moves.
+    Returns (cold moves/s, cached moves/s, written moves/s).
+    '''
+    clear_caches()
+    cold, played = replay(corpus)
+    warm, _ = replay(corpus)
+    count = sum(len(ints) for _, ints in played)
+    clock = time.perf_counter
+    writing = 0.0
+    for fen, ints in played:
+        game = Game(fen)
+        for move in ints:
+            start = clock()
+            game.san(move)
+            writing += clock() - start
+            game.push(move)
+    # a corpus without a legal move takes no time at all
+    rates = tuple(count / seconds if seconds else 0.0 for seconds in (cold, warm, writing))
+    print("{} games, {} moves".format(len(corpus), count), file=out)
+    print("parse, empty caches: {:.0f} moves/s".format(rates[0]), file=out)
+    print("parse, cached:       {:.0f} moves/s".format(rates[1]), file=out)
+    print("write SAN:           {:.0f} moves/s".format(rates[2]), file=out)
+    return rates
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Benchmark and check the SAN and long algebraic move parser.")
+    parser.add_argument('pgn', nargs='?', help="PGN corpus, '-' for standard input (default: seeded random games)")
+    parser.add_argument('-n', '--games', type=int, default=2000, help="random games")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true', help="round trip every legal move of the corpus")
+    args = parser.parse_args(argv)
+    if args.pgn:
+        source = sys.stdin if args.pgn == '-' else open(args.pgn, encoding='utf-8', errors='replace')
+        try:
+            corpus = pgn_corpus(source)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+    else:
+        corpus = random_corpus(args.games, args.seed)
+    if args.check:
+        round_trip(corpus)
+    benchmark(corpus)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import sys
+import time
+import pickle
+import random
+import argparse
+from Chess import position, legal_moves, board_view, PACKED
+# References:
+# https://docs.python.org/3/library/struct.html
+# https://www.chessprogramming.org/Board_Representation
+
+RECORD = PACKED.size
+
+
+def pack_positions(positions):
+    '''Concatenate the packed encodings of positions into one bytes object'''
+    return b''.join(pos.pack() for pos in positions)
+
+
+def iter_packed(data):
+    '''Decode the positions of a buffer of packed records, yields positions
+
+    keyword arg:
+    data -- bytes, bytearray, memoryview or mmap holding whole records
+    '''
+    if len(data) % RECORD:
+        raise ValueError("Packed data is not a whole number of {}-byte records".format(RECORD))
+    for offset in range(0, len(data), RECORD):
+        yield position().set_packed(memoryview(data)[offset:offset + RECORD])
+
+
+def save(path, positions):
+    '''Write packed positions to a file, returns the number written'''
+    count = 0
+    with open(path, 'wb') as f:
+        for pos in positions:
+            f.write(pos.pack())
+            count += 1
+    return count
+
+
+def load(path):
+    '''Read every position of a file written by save'''
+    with open(path, 'rb') as f:
+        return list(iter_packed(f.read()))
+
+
+def random_positions(count, seed=0, max_plies=120):
+    '''Positions from seeded random games, one position per game'''
+    rng = random.Random(seed)
+    result = []
+    while len(result) < count:
+        pos = position().setup()
+        for _ in range(rng.randrange(1, max_plies)):
+            moves = legal_moves(pos)
+            if not moves:
+                break
+            pos.make_move(rng.choice(moves))
+        # keep only the position itself, not the game that led to it
+        result.append(position().set_fen(pos.fen()))
+    return result
+
+
+def benchmark(count=2000, seed=0, out=sys.stdout):
+    '''Encode/decode speed and bytes per position
+    of the packed format against FEN and pickled piece dicts,
+    checking that every position round-trips.
+    Returns a dict of the figures.
+    '''
+    positions = random_positions(count, seed)
+    start = time.perf_counter()
+    data = pack_positions(positions)
+    pack_time = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = list(iter_packed(data))
+    unpack_time = time.perf_counter() - start
+    for pos, back in zip(positions, decoded):
+        if back.fen() != pos.fen() or back.key != pos.key:
+            raise AssertionError("Round trip failed: " + pos.fen())
+    start = time.perf_counter()
+    fens = [pos.fen() for pos in positions]
+    fen_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for fen in fens:
+        position().set_fen(fen)
+    set_fen_time = time.perf_counter() - start
+    # a snapshot the old way: a dict of piece objects keyed by (file, rank)
+    snapshots = [pickle.dumps(dict(board_view(pos))) for pos in positions[:200]]
+    figures = {'positions': count,
+               'packed_bytes': RECORD,
+               'fen_bytes': sum(len(fen) for fen in fens) / count,
+               'pickled_board_bytes': sum(map(len, snapshots)) / len(snapshots),
+               'pack_per_s': count / pack_time,
+               'unpack_per_s': count / unpack_time,
+               'fen_per_s': count / fen_time,
+               'set_fen_per_s': count / set_fen_time}
+    print("{} positions, all round-trip".format(count), file=out)
+    print("bytes/position: packed {packed_bytes}, FEN {fen_bytes:.1f}, "
+          "pickled piece dict {pickled_board_bytes:.0f}".format(**figures), file=out)
+    print("encode: packed {pack_per_s:.0f}/s, FEN {fen_per_s:.0f}/s".format(**figures), file=out)
+    print("decode: packed {unpack_per_s:.0f}/s, FEN {set_fen_per_s:.0f}/s".format(**figures), file=out)
+    return figures
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Packed binary position format: convert and benchmark.")
+    parser.add_argument('--bench', type=int, default=0, metavar='N', help="benchmark N random positions")
+    parser.add_argument('--pack', metavar='FILE', help="pack FEN lines from standard input into FILE")
+    parser.add_argument('--unpack', metavar='FILE', help="print the positions of FILE as FEN lines")
+    args = parser.parse_args(argv)
+    if args.pack:
+        count = save(args.pack, (position().set_fen(line) for line in sys.stdin if line.strip()))
+        print("{} positions, {} bytes".format(count, count * RECORD), file=sys.stderr)
+    elif args.unpack:
+        for pos in load(args.unpack):
+            print(pos.fen())
+    else:
+        benchmark(args.bench or 2000)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
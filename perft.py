@@ -0,0 +1,201 @@
+import sys
+import time
+import argparse
+from Chess import chess, position, legal_moves, uci, square, colors
+from transposition import transposition_table, EXACT
+# References:
+# https://www.chessprogramming.org/Perft
+# https://www.chessprogramming.org/Perft_Results
+
+# Well-known perft positions with their expected leaf node counts,
+# indexed by depth - 1.
+positions = {
+    'start': ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+              [20, 400, 8902, 197281, 4865609]),
+    'kiwipete': ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 [48, 2039, 97862, 4085603]),
+    'endgame': ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                [14, 191, 2812, 43238, 674624]),
+    'promotions': ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                   [6, 264, 9467, 422333]),
+    'talkchess': ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  [44, 1486, 62379, 2103487]),
+    'edwards': ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                [46, 2079, 89890, 3894594]),
+}
+
+
+def perft(pos, depth):
+    '''Count the leaf nodes of the legal move tree
+    to a given depth, the last ply is counted without being made.
+
+    keyword arg:
+    pos -- bitboard position, restored when the count returns
+    depth -- number of plies
+    '''
+    moves = legal_moves(pos)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        pos.make_move(move)
+        nodes += perft(pos, depth - 1)
+        pos.unmake_move()
+    return nodes
+
+
+def perft_hashed(pos, depth, table):
+    '''Count leaf nodes like perft, caching subtree counts
+    in a transposition table keyed by the position's Zobrist key.
+
+    keyword arg:
+    pos -- bitboard position, restored when the count returns
+    depth -- number of plies
+    table -- transposition table, the count is kept in the score field
+    '''
+    if depth <= 1:
+        return len(legal_moves(pos)) if depth == 1 else 1
+    entry = table.probe(pos.key)
+    if entry and entry[1] == depth:
+        return entry[3]
+    nodes = 0
+    for move in legal_moves(pos):
+        pos.make_move(move)
+        nodes += perft_hashed(pos, depth - 1, table)
+        pos.unmake_move()
+    table.store(pos.key, depth, EXACT, nodes)
+    return nodes
+
+
+def piece_moves(game):
+    '''Legal moves of the side to move found through the piece objects:
+    available_moves of every piece, dropping moves that leave
+    the own king in check.
+
+    keyword arg:
+    game -- chess game whose position is searched
+    '''
+    pos = game.position
+    side = pos.side
+    moves = []
+    for p in game.board.values():
+        if p.color != colors[side]:
+            continue
+        frm = square(p.pos)
+        for to_pos in p.available_moves(game):
+            to = square(to_pos)
+            move = pos.encode_move(frm, to)
+            pos.make_move(move)
+            if not pos.in_check(side):
+                moves.append(move)
+            pos.unmake_move()
+    return moves
+
+
+def perft_pieces(game, depth):
+    '''Count leaf nodes like perft, generating moves through
+    the piece objects' available_moves instead of legal_moves.
+    Castling and under-promotions are not reachable this way,
+    so counts only agree on positions without them.
+    '''
+    moves = piece_moves(game)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        game.position.make_move(move)
+        nodes += perft_pieces(game, depth - 1)
+        game.position.unmake_move()
+    return nodes
+
+
+def divide(pos, depth):
+    '''Perft split by root move
+    returns a list of (move in UCI text, node count) sorted by move.
+    '''
+    counts = []
+    for move in legal_moves(pos):
+        pos.make_move(move)
+        counts.append((uci(move), perft(pos, depth - 1)))
+        pos.unmake_move()
+    return sorted(counts)
+
+
+def timed(pos, depth):
+    '''Run perft and return (nodes, seconds, nodes per second)'''
+    start = time.perf_counter()
+    nodes = perft(pos, depth)
+    elapsed = time.perf_counter() - start
+    return nodes, elapsed, nodes / elapsed if elapsed else 0.0
+
+
+def verify(max_nodes=100000, out=sys.stdout):
+    '''Regression suite
+    check perft of every known position at each depth
+    whose expected count is at most max_nodes.
+    Returns the number of mismatches.
+    '''
+    failures = 0
+    for name, (fen, expected) in positions.items():
+        pos = position().set_fen(fen)
+        for depth, count in enumerate(expected, 1):
+            if count > max_nodes:
+                break
+            nodes, elapsed, nps = timed(pos, depth)
+            status = 'ok' if nodes == count else 'FAIL (expected {})'.format(count)
+            failures += nodes != count
+            print("{:<11} depth {}  {:>9} nodes  {:8.3f}s  {:>9.0f} nps  {}".format(
+                  name, depth, nodes, elapsed, nps, status), file=out)
+    return failures
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Perft move generation benchmark and regression suite.")
+    parser.add_argument('fen', nargs='?', default='start',
+                        help="FEN string or the name of a known position: " + ", ".join(positions))
+    parser.add_argument('-d', '--depth', type=int, default=3)
+    parser.add_argument('--divide', action='store_true', help="print the node count per root move")
+    parser.add_argument('--pieces', action='store_true',
+                        help="generate moves through the piece objects' available_moves")
+    parser.add_argument('--hash', type=float, default=0, metavar='MB',
+                        help="cache subtree counts in a transposition table of this size")
+    parser.add_argument('--verify', action='store_true', help="run the regression suite")
+    parser.add_argument('--max-nodes', type=int, default=100000,
+                        help="largest expected count the regression suite runs")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        failures = verify(args.max_nodes)
+        print("{} failure(s)".format(failures))
+        return 1 if failures else 0
+
+    fen = positions[args.fen][0] if args.fen in positions else args.fen
+    if args.pieces:
+        game = chess('white', 'white', 'black', 'black')
+        game.position.set_fen(fen)
+        start = time.perf_counter()
+        nodes = perft_pieces(game, args.depth)
+        elapsed = time.perf_counter() - start
+    else:
+        pos = position().set_fen(fen)
+        if args.divide:
+            for move, count in divide(pos, args.depth):
+                print("{}: {}".format(move, count))
+        if args.hash:
+            table = transposition_table(args.hash)
+            start = time.perf_counter()
+            nodes = perft_hashed(pos, args.depth, table)
+            elapsed = time.perf_counter() - start
+        else:
+            nodes, elapsed, _ = timed(pos, args.depth)
+    print("depth {}  nodes {}  time {:.3f}s  nps {:.0f}".format(
+          args.depth, nodes, elapsed, nodes / elapsed if elapsed else 0.0))
+    if args.hash:
+        print("hash " + ", ".join("{} {}".format(k, v if not isinstance(v, float) else round(v, 3))
+                                  for k, v in table.stats().items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
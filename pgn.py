@@ -0,0 +1,285 @@
+import re
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from Chess import Game, IllegalMoveError
+# References:
+# https://docs.python.org/3/library/multiprocessing.html
+# https://en.wikipedia.org/wiki/Portable_Game_Notation
+
+header_re = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+# comments, rest-of-line comments and numeric annotation glyphs
+noise_re = re.compile(r'\{[^}]*\}|;[^\n]*|\$\d+')
+# innermost variation, removed repeatedly to strip nested ones
+variation_re = re.compile(r'\([^()]*\)')
+move_number_re = re.compile(r'^\d+\.+')
+results = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def read_games(lines):
+    '''Split a stream of PGN lines into games
+    without reading the whole input, yields (game id, headers, movetext)
+    with game ids counting from 1.
+
+    keyword arg:
+    lines -- iterable of text lines, e.g. an open file
+    '''
+    game_id = 0
+    headers = {}
+    movetext = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith('[') and not line.startswith('[%'):
+            # a header after movetext starts the next game
+            if movetext:
+                game_id += 1
+                yield game_id, headers, ' '.join(movetext)
+                headers, movetext = {}, []
+            match = header_re.match(line)
+            if match:
+                headers[match.group(1)] = match.group(2)
+        elif line:
+            movetext.append(line)
+    if movetext or headers:
+        game_id += 1
+        yield game_id, headers, ' '.join(movetext)
+
+
+def read_chunks(lines, chunk_size):
+    '''Group the games of a PGN stream into lists of chunk_size games'''
+    chunk = []
+    for game in read_games(lines):
+        chunk.append(game)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def san_moves(movetext):
+    '''Iterate the SAN moves of a movetext,
+    skipping move numbers, comments, variations, NAGs and the result.
+    '''
+    text = noise_re.sub(' ', movetext)
+    while '(' in text:
+        stripped = variation_re.sub(' ', text)
+        if stripped == text:
+            break
+        text = stripped
+    for token in text.split():
+        token = move_number_re.sub('', token)
+        if token and token not in results:
+            yield token
+
+
+def validate_game(game):
+    '''Replay one game through the rules engine
+    returns a result dict: id, headers result, engine outcome,
+    ply count, first illegal move (or None) and final position.
+
+    keyword arg:
+    game -- (game id, headers, movetext) tuple from read_games
+    '''
+    game_id, headers, movetext = game
+    illegal = None
+    try:
+        board = Game(headers.get('FEN'))
+    except ValueError as e:
+        return {'id': game_id,
+                'white': headers.get('White'),
+                'black': headers.get('Black'),
+                'result': headers.get('Result', '*'),
+                'outcome': None,
+                'plies': 0,
+                'illegal': {'ply': 0, 'move': None, 'error': str(e)},
+                'fen': None}
+    plies = 0
+    try:
+        plies = board.replay(san_moves(movetext))
+    except IllegalMoveError as e:
+        plies = e.ply
+        illegal = {'ply': e.ply + 1, 'move': e.san, 'error': str(e)}
+    outcome = board.outcome()
+    return {'id': game_id,
+            'white': headers.get('White'),
+            'black': headers.get('Black'),
+            'result': headers.get('Result', '*'),
+            'outcome': list(outcome) if outcome else None,
+            'plies': plies,
+            'illegal': illegal,
+            'fen': board.position.fen()}
+
+
+def validate_chunk(chunk):
+    '''Validate a list of games, returns the list of result dicts'''
+    return [validate_game(game) for game in chunk]
+
+
+def _worker(tasks, done):
+    '''Worker process loop
+    validate (sequence number, chunk) tasks until a None sentinel.
+    '''
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, chunk = task
+        done.put((seq, validate_chunk(chunk)))
+
+
+class pipeline:
+    '''PGN validation pipeline
+    fans chunks of games out to a pool of worker processes and
+    streams the results back in game order. A feeder thread reads
+    chunks into a bounded task queue, and at most max_inflight chunks
+    are read but not yet handed back, which bounds the memory held
+    by the reorder buffer and gives backpressure all the way to the reader.
+    Methods: run
+    '''
+
+    def __init__(self, workers=None, chunk_size=64, max_inflight=None):
+        '''Configure the pipeline
+
+        keyword arg:
+        workers -- number of worker processes, 0 validates in this process
+        chunk_size -- games per task
+        max_inflight -- chunks read but not yet yielded, default 4 per worker
+        '''
+        self.workers = multiprocessing.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.max_inflight = max_inflight or 4 * max(1, self.workers)
+        self.games = 0
+        self.plies = 0
+        self.illegal = 0
+        self.elapsed = 0.0
+
+    def run(self, lines):
+        '''Validate every game of a PGN line stream,
+        yields the result dicts in the order of the input.
+        '''
+        start = time.perf_counter()
+        try:
+            if self.workers == 0:
+                for chunk in read_chunks(lines, self.chunk_size):
+                    for result in validate_chunk(chunk):
+                        self._count(result)
+                        yield result
+            else:
+                for result in self._parallel(lines):
+                    self._count(result)
+                    yield result
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def _count(self, result):
+        self.games += 1
+        self.plies += result['plies']
+        self.illegal += result['illegal'] is not None
+
+    def _parallel(self, lines):
+        tasks = multiprocessing.Queue(self.workers * 2)
+        done = multiprocessing.Queue(self.workers * 2)
+        slots = threading.BoundedSemaphore(self.max_inflight)
+        total = []
+        failed = []
+        stop = threading.Event()
+
+        def feed():
+            seq = 0
+            try:
+                for chunk in read_chunks(lines, self.chunk_size):
+                    # wait for a free slot, giving up if the consumer has gone
+                    while not slots.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    tasks.put((seq, chunk))
+                    seq += 1
+            except BaseException as e:
+                # handed to the consumer, which re-raises it in run()
+                failed.append(e)
+                return
+            total.append(seq)
+
+        procs = [multiprocessing.Process(target=_worker, args=(tasks, done), daemon=True)
+                 for _ in range(self.workers)]
+        for proc in procs:
+            proc.start()
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        pending = {}
+        expected = 0
+        finished = False
+        try:
+            while not total or expected < total[0]:
+                try:
+                    seq, results = done.get(timeout=0.1)
+                except queue.Empty:
+                    if failed:
+                        raise failed[0]
+                    # workers only exit on a sentinel, any earlier exit lost its chunk
+                    for proc in procs:
+                        if proc.exitcode is not None:
+                            raise RuntimeError("PGN worker process exited with code {}".format(proc.exitcode))
+                    continue
+                pending[seq] = results
+                # hand back every chunk that is next in order
+                while expected in pending:
+                    yield from pending.pop(expected)
+                    expected += 1
+                    slots.release()
+            finished = True
+        finally:
+            stop.set()
+            if finished:
+                feeder.join()
+                for proc in procs:
+                    tasks.put(None)
+            # workers blocked on a full queue cannot see a sentinel
+            for proc in procs:
+                proc.join(timeout=1 if finished else 0)
+                if proc.is_alive():
+                    proc.terminate()
+
+    def report(self):
+        '''Throughput summary line'''
+        elapsed = self.elapsed or 1e-9
+        return ("{} games, {} plies, {} with illegal moves in {:.2f}s: "
+                "{:.0f} games/s, {:.0f} plies/s ({} workers)".format(
+                    self.games, self.plies, self.illegal, self.elapsed,
+                    self.games / elapsed, self.plies / elapsed, self.workers))
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Validate a PGN corpus with the rules engine.")
+    parser.add_argument('pgn', help="PGN file, '-' for standard input")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes, 0 to validate in this process (default: CPU count)")
+    parser.add_argument('--chunk', type=int, default=64, help="games per task")
+    parser.add_argument('-o', '--out', default='-', help="JSON lines output file (default: standard output)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print the throughput report")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.pgn == '-' else open(args.pgn, encoding='utf-8', errors='replace')
+    out = sys.stdout if args.out == '-' else open(args.out, 'w')
+    run = pipeline(args.workers, args.chunk)
+    try:
+        for result in run.run(source):
+            if not args.quiet:
+                out.write(json.dumps(result) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    print(run.report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
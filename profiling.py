@@ -0,0 +1,352 @@
+import sys
+import json
+import time
+import random
+import marshal
+import argparse
+import threading
+import functools
+import Chess
+from Chess import Game, IllegalMoveError, chess, position, piece, p_names
+from pgn import read_games, san_moves
+import render
+# References:
+# https://docs.python.org/3/library/profile.html#the-stats-class
+# https://docs.python.org/3/library/time.html#time.perf_counter_ns
+# https://jsonlines.org/
+
+# Instrumented functions by phase: (phase, owner, attribute), the owner
+# is a class or the Chess package. Methods are replaced on their class and
+# module functions in the package and in every Chess module that imports
+# them, so calls between the rules modules, e.g. Game.legal_moves, are
+# counted, while names copied into other modules with from Chess import ...
+# keep calling the plain function.
+TARGETS = [
+    ('parse', Game, 'parse_san'),
+    ('parse', Chess, 'parse_notation'),
+    ('parse', Chess, 'san'),
+    ('movegen', Chess, 'legal_moves'),
+    ('movegen', position, 'is_legal'),
+    ('movegen', piece, 'available_moves'),
+    ('movegen', piece, 'valid_move'),
+    ('movegen', piece, 'clear_path'),
+    ('apply', position, 'make_move'),
+    ('apply', position, 'unmake_move'),
+    ('check', position, 'in_check'),
+    ('check', chess, 'check'),
+    ('checkmate', Chess, 'has_legal_move'),
+    ('checkmate', Game, 'outcome'),
+    ('checkmate', chess, 'checkmate'),
+    ('checkmate', chess, 'stalemate'),
+    ('render', render.terminal, 'frame'),
+    ('render', chess, '__str__'),
+]
+PHASES = ('parse', 'movegen', 'apply', 'check', 'checkmate', 'render')
+
+# The stats being collected, None while instrumentation is off.
+_active = None
+
+
+def _label(func):
+    '''pstats key of a function: (file, first line, name)'''
+    code = func.__code__
+    return code.co_filename, code.co_firstlineno, func.__qualname__
+
+
+def _legal_moves_pieces(counts, args, result):
+    mailbox = args[0].mailbox
+    for move in result:
+        counts[mailbox[move & 63] % 6] += 1
+
+
+def _available_moves_pieces(counts, args, result):
+    counts[p_names.index(args[0].piece_name)] += len(result)
+
+
+# Moves generated per piece type are counted from these functions' results.
+piece_counters = {'legal_moves': _legal_moves_pieces, 'available_moves': _available_moves_pieces}
+
+
+class stats:
+    '''Instrumentation statistics
+    calls and time of every instrumented function, time per phase,
+    nodes (moves made) and moves generated per piece type.
+    Times are exclusive: time spent in another instrumented function
+    counts towards that one, so the phases add up to the instrumented total.
+    Also works as a pstats source: pstats.Stats(stats) or dump_stats(path).
+    Methods: snapshot, dump, report, create_stats, dump_stats, reset
+    '''
+
+    def __init__(self):
+        # per function: [calls, exclusive ns, inclusive ns, callers]
+        self.functions = {}
+        self.phase_of = {}
+        self.pieces = [0] * 6
+        self.started = time.time()
+
+    def reset(self):
+        '''Zero every counter, in place as the wrappers hold the records'''
+        self.started = time.time()
+        self.pieces[:] = [0] * 6
+        for record in self.functions.values():
+            record[:] = [0, 0, 0, {}]
+
+    def _add(self, label, phase):
+        self.functions[label] = [0, 0, 0, {}]
+        self.phase_of[label] = phase
+
+    @property
+    def nodes(self):
+        '''Moves made, as the engine counts nodes'''
+        return sum(self.functions[label][0] for label in self.functions if label[2] == 'position.make_move')
+
+    def phases(self):
+        '''(calls, seconds) of each phase'''
+        totals = {phase: [0, 0] for phase in PHASES}
+        for label, (calls, own, _, _) in list(self.functions.items()):
+            total = totals[self.phase_of[label]]
+            total[0] += calls
+            total[1] += own
+        return {phase: (calls, ns / 1e9) for phase, (calls, ns) in totals.items()}
+
+    def snapshot(self):
+        '''The statistics as a JSON-ready dict'''
+        return {
+            'time': round(time.time(), 3),
+            'elapsed': round(time.time() - self.started, 3),
+            'nodes': self.nodes,
+            'phases': {phase: {'calls': calls, 'seconds': round(seconds, 6)}
+                       for phase, (calls, seconds) in self.phases().items()},
+            'functions': {label[2]: {'calls': calls, 'seconds': round(own / 1e9, 6)}
+                          for label, (calls, own, _, _) in list(self.functions.items()) if calls},
+            'pieces': dict(zip(p_names, self.pieces)),
+        }
+
+    def dump(self, out):
+        '''Write a snapshot as one JSON line'''
+        out.write(json.dumps(self.snapshot()) + '\n')
+        out.flush()
+
+    def report(self):
+        '''Phase table as text'''
+        lines = ["{:<10} {:>10} {:>10} {:>10}".format('phase', 'calls', 'seconds', 'us/call')]
+        for phase, (calls, seconds) in self.phases().items():
+            lines.append("{:<10} {:>10} {:>10.3f} {:>10.2f}".format(
+                phase, calls, seconds, seconds / calls * 1e6 if calls else 0.0))
+        lines.append("nodes {}, moves generated by piece: {}".format(
+            self.nodes, ', '.join("{} {}".format(name.upper(), count) for name, count in zip(p_names, self.pieces))))
+        return '\n'.join(lines)
+
+    def create_stats(self):
+        '''Fill self.stats in the format of cProfile, for pstats.Stats'''
+        self.stats = {}
+        for label, (calls, own, total, callers) in self.functions.items():
+            if calls:
+                self.stats[label] = (calls, calls, own / 1e9, total / 1e9, dict(callers))
+
+    def dump_stats(self, path):
+        '''Write the statistics to a file that pstats.Stats(path) loads'''
+        self.create_stats()
+        with open(path, 'wb') as f:
+            marshal.dump(self.stats, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if _active is self:
+            disable()
+
+
+def _wrap(func, label, record, stack, counter, counts):
+    '''func timed into record, with a stack of the instrumented calls
+    in progress to split exclusive time and record callers.
+    '''
+    clock = time.perf_counter_ns
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        caller = stack[-1][0] if stack else None
+        stack.append([label, 0])
+        start = clock()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            inner = stack.pop()[1]
+            if stack:
+                stack[-1][1] += elapsed
+            record[0] += 1
+            record[1] += elapsed - inner
+            record[2] += elapsed
+            if caller is not None:
+                record[3][caller] = record[3].get(caller, 0) + 1
+        if counter is not None:
+            counter(counts, args, result)
+        return result
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def _holders(owner, name, func):
+    '''Where an instrumented function is replaced: its owner and,
+    for the Chess package, each Chess module holding it under name
+    '''
+    if owner is not Chess:
+        return [owner]
+    return [owner] + [module for key, module in list(sys.modules.items())
+                      if key.startswith('Chess.') and getattr(module, name, None) is func]
+
+
+def enable(out=None, interval=None):
+    '''Start instrumenting the rules engine, returns the stats object.
+    Nothing is instrumented, and nothing costs time, until this is called:
+    the functions are replaced by timed wrappers and put back by disable.
+
+    keyword arg:
+    out -- text stream that snapshots are written to as JSON lines
+    interval -- seconds between snapshots, the last one is written by disable
+    '''
+    global _active
+    if _active is not None:
+        raise RuntimeError("Instrumentation is already enabled")
+    collected = stats()
+    stack = []
+    originals = []
+    wrappers = {}
+    for phase, owner, name in TARGETS:
+        func = owner.__dict__[name]
+        label = _label(func)
+        collected._add(label, phase)
+        wrappers[label] = _wrap(func, label, collected.functions[label], stack,
+                                piece_counters.get(name), collected.pieces)
+        for holder in _holders(owner, name, func):
+            originals.append((holder, name, func))
+    for owner, name, func in originals:
+        setattr(owner, name, wrappers[_label(func)])
+    collected._originals = originals
+    collected._out = out
+    collected._stop = threading.Event()
+    if out is not None and interval:
+        def dump_every():
+            while not collected._stop.wait(interval):
+                collected.dump(out)
+        threading.Thread(target=dump_every, daemon=True).start()
+    _active = collected
+    return collected
+
+
+def disable():
+    '''Put the plain functions back, returns the stats object'''
+    global _active
+    collected = _active
+    if collected is None:
+        return None
+    for owner, name, func in collected._originals:
+        setattr(owner, name, func)
+    collected._stop.set()
+    _active = None
+    if collected._out is not None:
+        collected.dump(collected._out)
+    return collected
+
+
+def active():
+    '''The stats being collected, None when instrumentation is off'''
+    return _active
+
+
+def play_pgn(lines):
+    '''Replay the games of a PGN stream through the rules engine
+    as a game log would be checked: parse, make, then look for the outcome.
+    Returns the number of plies played.
+    '''
+    plies = 0
+    for _, headers, movetext in read_games(lines):
+        try:
+            game = Game(headers.get('FEN'))
+        except ValueError:
+            continue
+        for san in san_moves(movetext):
+            try:
+                game.push_san(san)
+            except IllegalMoveError:
+                break
+            game.outcome()
+            plies += 1
+    return plies
+
+
+def play_random(games, seed=0, max_plies=200):
+    '''Play seeded random games, returns the number of plies played'''
+    rng = random.Random(seed)
+    plies = 0
+    for _ in range(games):
+        game = Game()
+        while game.outcome() is None and len(game.position.history) < max_plies:
+            game.push(rng.choice(game.legal_moves()))
+            game.is_check()
+            plies += 1
+    return plies
+
+
+def benchmark(games=20, seed=0, out=sys.stdout):
+    '''Plies per second of seeded random games with instrumentation
+    off, on, and off again, checking that off puts back the plain functions.
+    Returns (plies/s off, plies/s on).
+    '''
+    rates = []
+    for on in (False, True):
+        if on:
+            enable()
+        start = time.perf_counter()
+        plies = play_random(games, seed)
+        rates.append(plies / (time.perf_counter() - start))
+        if on:
+            collected = disable()
+    if any(getattr(owner, name) is not func for owner, name, func in collected._originals):
+        raise AssertionError("disable left instrumented functions behind")
+    print("instrumentation off: {:.0f} plies/s".format(rates[0]), file=out)
+    print("instrumentation on:  {:.0f} plies/s ({:.1f}x slower)".format(rates[1], rates[0] / rates[1]), file=out)
+    print(collected.report(), file=out)
+    return tuple(rates)
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Profile move generation, check detection and rendering.")
+    parser.add_argument('pgn', nargs='?', help="replay the games of a PGN file, '-' for standard input")
+    parser.add_argument('--random', type=int, default=0, metavar='N', help="play N seeded random games")
+    parser.add_argument('--jsonl', help="append JSON lines snapshots to this file")
+    parser.add_argument('--interval', type=float, default=10.0, help="seconds between snapshots")
+    parser.add_argument('--pstats', help="write pstats data to this file")
+    parser.add_argument('--bench', action='store_true', help="compare throughput with instrumentation off and on")
+    args = parser.parse_args(argv)
+    if args.bench or not (args.pgn or args.random):
+        benchmark(args.random or 20)
+        return 0
+    out = open(args.jsonl, 'a') if args.jsonl else None
+    collected = enable(out, args.interval)
+    try:
+        if args.pgn:
+            source = sys.stdin if args.pgn == '-' else open(args.pgn, encoding='utf-8', errors='replace')
+            try:
+                plies = play_pgn(source)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+        else:
+            plies = play_random(args.random)
+    finally:
+        disable()
+        if out is not None:
+            out.close()
+    print("{} plies".format(plies))
+    print(collected.report())
+    if args.pstats:
+        collected.dump_stats(args.pstats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import subprocess
+from Chess import Game, board_text, glyph, uci
+# References:
+# https://en.wikipedia.org/wiki/ANSI_escape_code#CSI_(Control_Sequence_Introducer)_sequences
+# https://docs.python.org/3/library/os.html#os.get_terminal_size
+
+CSI = '\x1b['
+# Screen rows of the board: the file letters, eight ranks, the file letters.
+BOARD_ROWS = 10
+# Lines left under the board for messages, prompts and typed moves;
+# a smaller terminal would scroll the board, so it is redrawn every frame.
+STATUS_ROWS = 8
+SEPARATOR = "----------------------------------"
+
+
+def cursor(row, col):
+    '''Escape sequence moving the cursor to a 1-based screen row and column'''
+    return '{}{};{}H'.format(CSI, row, col)
+
+
+def square_cell(sq):
+    '''Screen (row, column) of a square's figurine, a1 = 0,
+    laid out as board_text prints it with the board at the top left.
+    '''
+    return 9 - (sq >> 3), 2 * (sq & 7) + 4
+
+
+class terminal:
+    '''Terminal renderer
+    keeps the last frame drawn and, on a terminal that understands
+    ANSI escapes, only moves the cursor to the squares that changed
+    and rewrites those, then clears and reprints the messages below
+    the board. Whole frames are redrawn on the first frame, after the
+    terminal is resized and when the output is not a terminal at all,
+    where frames are printed one after another as plain text.
+    Methods: frame, reset
+    '''
+
+    def __init__(self, out=None, ansi=None):
+        '''Renderer writing to a stream
+
+        keyword arg:
+        out -- text stream, standard output by default
+        ansi -- use escape sequences, by default when out is a terminal
+        '''
+        self.out = out or sys.stdout
+        if ansi is None:
+            try:
+                ansi = self.out.isatty() and os.environ.get('TERM') != 'dumb'
+            except (AttributeError, ValueError):
+                ansi = False
+        self.ansi = ansi
+        self.last = None
+        self.size = None
+        self.frames = 0
+        self.bytes = 0
+
+    def _terminal_size(self):
+        try:
+            return os.get_terminal_size(self.out.fileno())
+        except (AttributeError, ValueError, OSError):
+            return None
+
+    def reset(self):
+        '''Redraw the whole board on the next frame'''
+        self.last = None
+
+    def render(self, mailbox, messages=()):
+        '''Text of the next frame, recorded as drawn'''
+        if not self.ansi:
+            return board_text(mailbox) + ''.join(line + '\n' for line in messages)
+        size = self._terminal_size()
+        if size is not None and size.lines < BOARD_ROWS + STATUS_ROWS:
+            self.last = None
+        last = self.last
+        if last is None or size != self.size:
+            parts = [CSI + 'H' + CSI + '2J' + board_text(mailbox)]
+            self.size = size
+        else:
+            parts = []
+            for sq in range(64):
+                code = mailbox[sq]
+                if code != last[sq]:
+                    row, col = square_cell(sq)
+                    parts.append(cursor(row, col) + glyph(code))
+            parts.append(cursor(BOARD_ROWS + 1, 1))
+        self.last = list(mailbox)
+        # clear the old messages and typed input under the board
+        parts.append(CSI + 'J')
+        parts.extend(line + '\n' for line in messages)
+        return ''.join(parts)
+
+    def frame(self, mailbox, messages=()):
+        '''Draw a board and the lines of text under it
+
+        keyword arg:
+        mailbox -- the 64 piece codes of the position, a1 first
+        messages -- lines printed under the board
+        '''
+        text = self.render(mailbox, messages)
+        self.out.write(text)
+        self.out.flush()
+        self.frames += 1
+        self.bytes += len(text.encode('utf-8'))
+
+
+class _sink:
+    '''Write-only stream that throws text away, for benchmarks'''
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def benchmark(plies=2000, seed=0, out=sys.stdout):
+    '''Frames per second and bytes written per move of the diff
+    renderer against clearing the screen and printing the whole board,
+    replaying seeded random games into a stream that discards the text,
+    and the cost of spawning clear as the terminal game used to.
+    Returns (diff frames/s, diff bytes per move, full frames/s, full bytes per move).
+    '''
+    rng = random.Random(seed)
+    boards = []
+    game = Game()
+    while len(boards) < plies:
+        if game.outcome() is not None:
+            game = Game()
+        game.push(rng.choice(game.legal_moves()))
+        boards.append(list(game.position.mailbox))
+    messages = ["White to move.", SEPARATOR]
+    sink = _sink()
+
+    screen = terminal(sink, ansi=True)
+    start = time.perf_counter()
+    for board in boards:
+        screen.frame(board, messages)
+    diff_rate = plies / (time.perf_counter() - start)
+    diff_bytes = screen.bytes / plies
+
+    written = 0
+    start = time.perf_counter()
+    for board in boards:
+        text = CSI + 'H' + CSI + '2J' + board_text(board) + ''.join(line + '\n' for line in messages)
+        sink.write(text)
+        written += len(text.encode('utf-8'))
+    full_rate = plies / (time.perf_counter() - start)
+    full_bytes = written / plies
+
+    print("diff: {:.0f} frames/s, {:.0f} bytes per move".format(diff_rate, diff_bytes), file=out)
+    print("full redraw: {:.0f} frames/s, {:.0f} bytes per move".format(full_rate, full_bytes), file=out)
+    if shutil.which('clear'):
+        start = time.perf_counter()
+        for _ in range(20):
+            subprocess.run(['clear'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print("spawning clear: {:.1f} ms per move".format((time.perf_counter() - start) / 20 * 1000), file=out)
+    return diff_rate, diff_bytes, full_rate, full_bytes
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Benchmark the terminal board renderer.")
+    parser.add_argument('-n', '--plies', type=int, default=2000, help="moves rendered")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--show', action='store_true', help="replay a random game on this terminal")
+    args = parser.parse_args(argv)
+    if args.show:
+        rng = random.Random(args.seed)
+        game = Game()
+        screen = terminal()
+        while game.outcome() is None and len(game.position.history) < args.plies:
+            move = rng.choice(game.legal_moves())
+            game.push(move)
+            screen.frame(game.position.mailbox, ["Random move: " + uci(move), SEPARATOR])
+            time.sleep(0.05)
+        return 0
+    benchmark(args.plies, args.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
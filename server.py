@@ -0,0 +1,306 @@
+import sys
+import time
+import asyncio
+import argparse
+import itertools
+from Chess import chess, IllegalMoveError, uci, colors, WHITE, BLACK
+# References:
+# https://docs.python.org/3/library/asyncio-stream.html
+# https://docs.python.org/3/library/asyncio-eventloop.html#asyncio.loop.call_later
+
+# Line protocol, one command per line, words separated by spaces:
+#
+#   client                     server
+#   HELLO <name>               OK HELLO <name>
+#   NEW [seconds [increment]]  GAME <id>, then START when someone joins
+#   JOIN <id>                  START <id> <colour> <seconds> <increment> <fen> to both players
+#   MOVE <san or uci>          OK <uci> to the mover,
+#                              MOVED <uci> <white ms left> <black ms left> <fen> to both
+#   FEN                        FEN <fen>
+#   BOARD                      BOARD, the board as the terminal game prints it, END
+#   CLOCK                      CLOCK <white ms left> <black ms left>
+#   MODE fen|board             board mode also pushes the board after every move
+#   RESIGN                     OVER <result> <reason> to both players
+#   QUIT
+#
+# Errors are answered with ERR <message>. A game ends with OVER <result> <reason>:
+# checkmate, stalemate, draws, resignation, time or an abandoned connection.
+DEFAULT_SECONDS = 300
+
+
+class hosted_game:
+    '''Hosted game
+    a chess game with the connections of its two players
+    and their clocks: every player has seconds plus increment per move,
+    spent time is kept in player.time_elapsed, and a timer ends the game
+    when the player to move runs out.
+    Methods: start, move, left, finish
+    '''
+
+    def __init__(self, game_id, seconds=DEFAULT_SECONDS, increment=0, on_finish=None):
+        self.id = game_id
+        self.seconds = seconds
+        self.increment = increment
+        self.on_finish = on_finish
+        self.board = chess('white', 'white', 'black', 'black')
+        self.sessions = [None, None]
+        # moves made by each colour, each one adds the increment
+        self.moves = [0, 0]
+        self.result = None
+        self.turn_start = None
+        self.timer = None
+
+    def player(self, color):
+        return self.board.player1 if color == WHITE else self.board.player2
+
+    def start(self):
+        '''Both seats are taken, start the clock of white'''
+        fen = self.board.fen()
+        for color, session in enumerate(self.sessions):
+            self.player(color).player_name = session.name
+            session.send("START {} {} {} {} {}".format(self.id, colors[color], self.seconds, self.increment, fen))
+        self._start_turn()
+
+    def left(self, color, now=None):
+        '''Seconds left on a player's clock'''
+        spent = self.player(color).time_elapsed
+        if self.turn_start is not None and self.result is None and self.board.position.side == color:
+            spent += (now or time.monotonic()) - self.turn_start
+        return self.seconds + self.increment * self.moves[color] - spent
+
+    def _start_turn(self):
+        self.turn_start = time.monotonic()
+        side = self.board.position.side
+        loop = asyncio.get_running_loop()
+        self.timer = loop.call_later(max(0.0, self.left(side)), self._flag, side)
+
+    def _flag(self, color):
+        if self.result is None and self.board.position.side == color:
+            self.finish('0-1' if color == WHITE else '1-0', 'time')
+
+    def move(self, color, text):
+        '''Validate and make a player's move, returns its UCI text,
+        raises IllegalMoveError if it is not legal or not their turn.
+        '''
+        game = self.board.game
+        pos = self.board.position
+        if self.result is not None:
+            raise IllegalMoveError("The game is over")
+        if pos.side != color:
+            raise IllegalMoveError("Not your turn")
+        now = time.monotonic()
+        if self.left(color, now) < 0:
+            self.finish('0-1' if color == WHITE else '1-0', 'time')
+            raise IllegalMoveError("Out of time")
+        # SAN or UCI, both resolve through the rules engine's parser
+        move = game.parse_san(text)
+        self.player(color).time_elapsed += now - self.turn_start
+        self.moves[color] += 1
+        self.timer.cancel()
+        game.push(move)
+        return uci(move)
+
+    def after_move(self, move):
+        '''Push the move to both players and end or continue the game'''
+        now = time.monotonic()
+        outcome = self.board.game.outcome()
+        if outcome is None:
+            self._start_turn()
+        update = "MOVED {} {} {} {}".format(move, int(self.left(WHITE, now) * 1000),
+                                           int(self.left(BLACK, now) * 1000), self.board.fen())
+        for session in self.sessions:
+            session.send(update)
+            if session.mode == 'board':
+                session.send_board(self.board)
+        if outcome:
+            self.finish(*outcome)
+
+    def finish(self, result, reason):
+        '''End the game and tell both players'''
+        if self.result is not None:
+            return
+        self.result = (result, reason)
+        if self.timer:
+            self.timer.cancel()
+        for session in self.sessions:
+            if session:
+                session.send("OVER {} {}".format(result, reason))
+                session.game = None
+        if self.on_finish:
+            self.on_finish(self)
+
+
+class session:
+    '''Client connection
+    the player's name, display mode and current game.
+    Methods: send, send_board
+    '''
+
+    def __init__(self, writer, name):
+        self.writer = writer
+        self.name = name
+        self.mode = 'fen'
+        self.game = None
+        self.color = None
+
+    def send(self, line):
+        if not self.writer.is_closing():
+            self.writer.write(line.encode() + b'\n')
+
+    def send_board(self, board):
+        self.send("BOARD\n" + str(board).rstrip('\n') + "\nEND")
+
+
+class game_server:
+    '''Game server
+    hosts any number of games in one process, one asyncio task per
+    connection, and validates every move with the rules engine.
+    Methods: handle, serve
+    '''
+
+    def __init__(self, seconds=DEFAULT_SECONDS, increment=0):
+        self.seconds = seconds
+        self.increment = increment
+        self.games = {}
+        self.ids = itertools.count(1)
+        self.connections = 0
+        self.moves = 0
+
+    async def handle(self, reader, writer):
+        '''Serve one connection until it quits or drops'''
+        self.connections += 1
+        client = session(writer, 'guest{}'.format(self.connections))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode(errors='replace').split()
+                if not words:
+                    continue
+                command = words[0].upper()
+                if command == 'QUIT':
+                    break
+                try:
+                    self.command(client, command, words[1:])
+                except (ValueError, IndexError) as e:
+                    client.send("ERR " + (str(e) or "bad arguments to " + command))
+                # replies wait for the socket, pushes to the opponent do not
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            game = client.game
+            if game is not None:
+                if game.sessions[BLACK] is None:
+                    del self.games[game.id]
+                else:
+                    game.finish('0-1' if client.color == WHITE else '1-0', 'abandoned')
+            writer.close()
+
+    def command(self, client, command, args):
+        '''Carry out one protocol command, raises ValueError on bad input'''
+        game = client.game
+        if command == 'HELLO':
+            client.name = args[0]
+            client.send("OK HELLO " + client.name)
+        elif command == 'NEW':
+            if game is not None:
+                raise ValueError("Already in a game")
+            seconds = float(args[0]) if args else self.seconds
+            increment = float(args[1]) if len(args) > 1 else self.increment
+            game = hosted_game(next(self.ids), seconds, increment, self._finished)
+            game.sessions[WHITE] = client
+            client.game, client.color = game, WHITE
+            self.games[game.id] = game
+            client.send("GAME {}".format(game.id))
+        elif command == 'JOIN':
+            if game is not None:
+                raise ValueError("Already in a game")
+            game = self.games.get(int(args[0]))
+            if game is None or game.sessions[BLACK] is not None:
+                raise ValueError("No open game " + args[0])
+            game.sessions[BLACK] = client
+            client.game, client.color = game, BLACK
+            game.start()
+        elif command == 'MOVE':
+            if game is None or game.sessions[BLACK] is None:
+                raise ValueError("No game in progress")
+            try:
+                move = game.move(client.color, args[0])
+            except IllegalMoveError as e:
+                client.send("ERR " + str(e))
+                return
+            self.moves += 1
+            client.send("OK " + move)
+            game.after_move(move)
+        elif command == 'FEN':
+            if game is None:
+                raise ValueError("No game in progress")
+            client.send("FEN " + game.board.fen())
+        elif command == 'BOARD':
+            if game is None:
+                raise ValueError("No game in progress")
+            client.send_board(game.board)
+        elif command == 'CLOCK':
+            if game is None:
+                raise ValueError("No game in progress")
+            client.send("CLOCK {} {}".format(int(game.left(WHITE) * 1000), int(game.left(BLACK) * 1000)))
+        elif command == 'MODE':
+            if args[0] not in ('fen', 'board'):
+                raise ValueError("Modes are fen and board")
+            client.mode = args[0]
+            client.send("OK MODE " + client.mode)
+        elif command == 'RESIGN':
+            if game is None or game.sessions[BLACK] is None:
+                raise ValueError("No game in progress")
+            game.finish('0-1' if client.color == WHITE else '1-0', 'resignation')
+        else:
+            raise ValueError("Unknown command " + command)
+
+    def _finished(self, game):
+        self.games.pop(game.id, None)
+
+    async def serve(self, host='127.0.0.1', port=8765, ready=None):
+        '''Accept connections until cancelled
+
+        keyword arg:
+        ready -- callable run once the server listens, e.g. to signal a parent
+        '''
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        if ready:
+            ready()
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Host chess games over a line-based TCP protocol.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seconds', type=float, default=DEFAULT_SECONDS, help="default clock per player")
+    parser.add_argument('--increment', type=float, default=0, help="default seconds added per move")
+    parser.add_argument('--stats', help="instrument the rules engine, appending JSON lines snapshots to this file")
+    parser.add_argument('--stats-interval', type=float, default=60.0, help="seconds between snapshots")
+    args = parser.parse_args(argv)
+    server = game_server(args.seconds, args.increment)
+    stats_file = None
+    if args.stats:
+        import profiling
+        stats_file = open(args.stats, 'a')
+        profiling.enable(stats_file, args.stats_interval)
+    print("Serving on {}:{}".format(args.host, args.port), file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stats_file:
+            profiling.disable()
+            stats_file.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,745 @@
+import os
+import sys
+import mmap
+import time
+import zlib
+import struct
+import argparse
+import multiprocessing
+from array import array
+from Chess import (KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks,
+                   position, bits, WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)
+# References:
+# https://www.chessprogramming.org/Retrograde_Analysis
+# https://www.chessprogramming.org/Endgame_Tablebases
+# https://docs.python.org/3/library/mmap.html
+
+# Values, one byte per position, from the side to move's view:
+# DRAW, win in d plies as d (odd, 1-127), loss in d plies as LOSS + d
+# (even, 0 is checkmated). UNDECIDED and NONE are only used while generating.
+DRAW = 0
+LOSS = 128
+UNDECIDED = 253
+NONE = 254
+INVALID = 255
+MAX_PIECES = 4
+# Positions per compressed block of a table file.
+BLOCK = 4096
+# Table file header: magic, positions, block size, number of blocks,
+# followed by the block offsets and the zlib-compressed blocks.
+HEADER = struct.Struct('<4sIII')
+MAGIC = b'TBZ1'
+DEFAULT_DIR = 'tablebases'
+piece_letters = 'PNBRQK'
+letter_values = {'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 0}
+
+
+def _transform(k, sq):
+    '''Square under symmetry k: bit 0 mirrors files, bit 1 mirrors ranks,
+    bit 2 then swaps files and ranks.
+    '''
+    f, r = sq & 7, sq >> 3
+    if k & 1:
+        f = 7 - f
+    if k & 2:
+        r = 7 - r
+    if k & 4:
+        f, r = r, f
+    return r * 8 + f
+
+
+TRANSFORMS = [[_transform(k, sq) for sq in range(64)] for k in range(8)]
+# White king squares of pawnless tables: the a1-d1-d4 triangle.
+TRIANGLE = [r * 8 + f for f in range(4) for r in range(f + 1)]
+# White king squares of tables with pawns: files a-d.
+QUEENSIDE = [r * 8 + f for r in range(8) for f in range(4)]
+
+
+def _side_name(letters):
+    return 'K' + ''.join(sorted(letters, key=piece_letters.index, reverse=True))
+
+
+def material_name(codes):
+    '''Canonical material name of a list of piece codes,
+    e.g. 'KQvKR', with the stronger side first.
+    Returns (name, flip) where flip tells that the colours are swapped.
+    '''
+    white = _side_name(piece_letters[c] for c in codes if c < 6 and c != KING)
+    black = _side_name(piece_letters[c - 6] for c in codes if c >= 6 and c != 6 + KING)
+
+    def strength(side):
+        return len(side), sum(letter_values[ch] for ch in side), side
+
+    if strength(black) > strength(white):
+        return black + 'v' + white, True
+    return white + 'v' + black, False
+
+
+def _order(code):
+    '''Sort key putting piece codes in table order:
+    white king, black king, white pieces then black pieces, strongest first
+    '''
+    if code == KING:
+        return 0, 0
+    if code == 6 + KING:
+        return 1, 0
+    return (2 if code < 6 else 3), -(code % 6)
+
+
+class material:
+    '''Table layout of a material set
+    positions are indexed side * size + white king slot, then 6 bits
+    per further piece. Pawnless tables put the white king in the
+    a1-d1-d4 triangle, tables with pawns on files a-d, and the
+    canonical index of a position is the smallest over the symmetries
+    that do so, with identical pieces in square order.
+    Methods: index, decode
+    '''
+
+    def __init__(self, name):
+        white, black = name.upper().split('V')
+        self.name = white + 'v' + black
+        self.codes = sorted([piece_letters.index(ch) for ch in white] +
+                            [6 + piece_letters.index(ch) for ch in black], key=_order)
+        self.n = len(self.codes)
+        self.pawns = PAWN in self.codes or 6 + PAWN in self.codes
+        self.wk_squares = QUEENSIDE if self.pawns else TRIANGLE
+        self.wk_index = {sq: i for i, sq in enumerate(self.wk_squares)}
+        self.size = len(self.wk_squares) << 6 * (self.n - 1)
+        symmetries = (0, 1) if self.pawns else range(8)
+        self.wk_transforms = [[k for k in symmetries if TRANSFORMS[k][sq] in self.wk_index]
+                              for sq in range(64)]
+        # runs of identical pieces, kept in square order
+        self.groups = []
+        start = 1
+        for i in range(2, self.n + 1):
+            if i == self.n or self.codes[i] != self.codes[start]:
+                if i - start > 1:
+                    self.groups.append((start, i))
+                start = i
+
+    def index(self, sqs, side):
+        '''Canonical index of piece squares (in code order) and side to move'''
+        best = -1
+        wk_index = self.wk_index
+        for k in self.wk_transforms[sqs[0]]:
+            t = TRANSFORMS[k]
+            s = [t[sq] for sq in sqs]
+            for a, b in self.groups:
+                s[a:b] = sorted(s[a:b])
+            i = wk_index[s[0]]
+            for sq in s[1:]:
+                i = i << 6 | sq
+            if best < 0 or i < best:
+                best = i
+        return side * self.size + best
+
+    def decode(self, index):
+        '''Piece squares and side to move of an index'''
+        side, i = divmod(index, self.size)
+        rest = []
+        for _ in range(self.n - 1):
+            rest.append(i & 63)
+            i >>= 6
+        return [self.wk_squares[i]] + rest[::-1], side
+
+
+_materials = {}
+
+
+def get_material(name):
+    if name not in _materials:
+        _materials[name] = material(name)
+    return _materials[name]
+
+
+def locate(codes, sqs, side):
+    '''Table and index of a position given as piece codes and squares
+    in any order, returns (material, index).
+    '''
+    name, flip = material_name(codes)
+    if flip:
+        codes = [(c + 6) % 12 for c in codes]
+        sqs = [sq ^ 56 for sq in sqs]
+        side ^= 1
+    pairs = sorted(zip(codes, sqs), key=lambda p: _order(p[0]))
+    mat = get_material(name)
+    return mat, mat.index([sq for _, sq in pairs], side)
+
+
+def _attacks(code, sq, occ):
+    kind = code % 6
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    elif kind == BISHOP:
+        return bishop_attacks(sq, occ)
+    elif kind == ROOK:
+        return rook_attacks(sq, occ)
+    elif kind == QUEEN:
+        return rook_attacks(sq, occ) | bishop_attacks(sq, occ)
+    elif kind == KING:
+        return KING_ATTACKS[sq]
+    return PAWN_ATTACKS[code >= 6][sq]
+
+
+def _attacked(sq, color, codes, sqs, occ):
+    '''Whether a square is attacked by the pieces of a colour'''
+    for code, frm in zip(codes, sqs):
+        if code // 6 == color and _attacks(code, frm, occ) >> sq & 1:
+            return True
+    return False
+
+
+def negate(value):
+    '''Value of the parent position from a child's value'''
+    if value == DRAW:
+        return DRAW
+    if value < LOSS:
+        return LOSS + value + 1
+    return value - LOSS + 1
+
+
+def rank(value):
+    '''Order of values for the side to move: quick wins first, quick losses last'''
+    if value == DRAW:
+        return 0
+    if value < LOSS:
+        return 1000 - value
+    return -1000 + value - LOSS
+
+
+class _generator:
+    '''Solver state of one table: its layout and the values
+    of the tables its captures and promotions lead to.
+    '''
+
+    def __init__(self, name, directory):
+        self.mat = get_material(name)
+        self.directory = directory
+        self.subtables = {}
+        self.ep_values = {}
+
+    def _child_value(self, codes, sqs, side):
+        if len(codes) == 2:
+            return DRAW
+        mat, index = locate(codes, sqs, side)
+        if mat.name not in self.subtables:
+            with table_file(table_path(self.directory, mat.name)) as table:
+                self.subtables[mat.name] = table.values()
+        return self.subtables[mat.name][index]
+
+    def en_passant(self, codes, sqs, side, to):
+        '''Positions after the legal en passant captures of the pawn
+        that just moved two squares to a square, side is the capturing
+        side. Returns a list of (codes, squares).
+        '''
+        passed = to + (8 if side == WHITE else -8)
+        pawn = side * 6 + PAWN
+        found = []
+        for c, (code, frm) in enumerate(zip(codes, sqs)):
+            if code != pawn or not PAWN_ATTACKS[side][frm] >> passed & 1:
+                continue
+            new_sqs = list(sqs)
+            new_sqs[c] = passed
+            taken = sqs.index(to)
+            new_codes = codes[:taken] + codes[taken + 1:]
+            del new_sqs[taken]
+            occ = 0
+            for sq in new_sqs:
+                occ |= 1 << sq
+            if not _attacked(new_sqs[side], side ^ 1, new_codes, new_sqs, occ):
+                found.append((new_codes, new_sqs))
+        return found
+
+    def children(self, sqs, side):
+        '''Legal moves of a position
+        returns (set of in-table child indices, best conversion value
+        for the side to move or NONE, whether there is any legal move).
+        A double pawn push the opponent can take en passant leads to
+        -1 - index of the position it reaches, whose best en passant
+        capture for the opponent is kept in ep_values.
+        '''
+        mat = self.mat
+        codes = mat.codes
+        occ = 0
+        own = 0
+        for code, sq in zip(codes, sqs):
+            occ |= 1 << sq
+            if code // 6 == side:
+                own |= 1 << sq
+        king = sqs[side]
+        inside = set()
+        conversion = NONE
+        any_move = False
+        for j, code in enumerate(codes):
+            if code // 6 != side:
+                continue
+            frm = sqs[j]
+            if code % 6 == PAWN:
+                step = 8 if side == WHITE else -8
+                targets = PAWN_ATTACKS[side][frm] & occ & ~own
+                if not occ >> (frm + step) & 1:
+                    targets |= 1 << (frm + step)
+                    if frm >> 3 == (1 if side == WHITE else 6) and not occ >> (frm + 2 * step) & 1:
+                        targets |= 1 << (frm + 2 * step)
+            else:
+                targets = _attacks(code, frm, occ) & ~own
+            for to in bits(targets):
+                new_sqs = list(sqs)
+                new_sqs[j] = to
+                new_codes = codes
+                new_occ = occ ^ (1 << frm) | (1 << to)
+                captured = occ >> to & 1
+                pawn = j
+                if captured:
+                    c = sqs.index(to)
+                    if codes[c] % 6 == KING:
+                        continue
+                    new_codes = codes[:c] + codes[c + 1:]
+                    del new_sqs[c]
+                    if c < j:
+                        pawn -= 1
+                own_king = to if j == side else king
+                if _attacked(own_king, side ^ 1, new_codes, new_sqs, new_occ):
+                    continue
+                any_move = True
+                if code % 6 == PAWN and to >> 3 in (0, 7):
+                    for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        promoted = list(new_codes)
+                        promoted[pawn] = side * 6 + kind
+                        value = negate(self._child_value(promoted, new_sqs, side ^ 1))
+                        if conversion == NONE or rank(value) > rank(conversion):
+                            conversion = value
+                elif captured:
+                    value = negate(self._child_value(new_codes, new_sqs, side ^ 1))
+                    if conversion == NONE or rank(value) > rank(conversion):
+                        conversion = value
+                else:
+                    child = mat.index(new_sqs, side ^ 1)
+                    captures = []
+                    if code % 6 == PAWN and abs(to - frm) == 16:
+                        captures = self.en_passant(codes, new_sqs, side ^ 1, to)
+                    if captures:
+                        best = NONE
+                        for ep_codes, ep_sqs in captures:
+                            value = negate(self._child_value(ep_codes, ep_sqs, side))
+                            if best == NONE or rank(value) > rank(best):
+                                best = value
+                        self.ep_values[child] = best
+                        child = -1 - child
+                    inside.add(child)
+        return inside, conversion, any_move
+
+    def valid(self, index):
+        '''Squares and side of a canonical, legal index, or None'''
+        mat = self.mat
+        sqs, side = mat.decode(index)
+        if len(set(sqs)) != mat.n:
+            return None
+        for code, sq in zip(mat.codes, sqs):
+            if code % 6 == PAWN and sq >> 3 in (0, 7):
+                return None
+        if mat.index(sqs, side) != index:
+            return None
+        occ = 0
+        for sq in sqs:
+            occ |= 1 << sq
+        # the side not to move cannot be in check
+        if _attacked(sqs[side ^ 1], side, mat.codes, sqs, occ):
+            return None
+        return sqs, side
+
+    def init_range(self, lo, hi):
+        '''Initial pass over indices lo to hi: mates, stalemates,
+        conversion values and the number of in-table moves.
+        Returns (values, remaining, conversions) as bytes and the
+        ep_values of the double pawn pushes found.
+        '''
+        self.ep_values = {}
+        values = bytearray([INVALID]) * (hi - lo)
+        remaining = bytearray(hi - lo)
+        conversions = bytearray([NONE]) * (hi - lo)
+        codes = self.mat.codes
+        for index in range(lo, hi):
+            found = self.valid(index)
+            if found is None:
+                continue
+            sqs, side = found
+            i = index - lo
+            inside, conversion, any_move = self.children(sqs, side)
+            if not any_move:
+                occ = 0
+                for sq in sqs:
+                    occ |= 1 << sq
+                checked = _attacked(sqs[side], side ^ 1, codes, sqs, occ)
+                values[i] = LOSS if checked else DRAW
+                continue
+            values[i] = UNDECIDED
+            remaining[i] = len(inside)
+            conversions[i] = conversion
+        return bytes(values), bytes(remaining), bytes(conversions), self.ep_values
+
+    def predecessors(self, index):
+        '''Canonical indices of the positions one non-capturing,
+        non-promoting move before a position. Double pawn pushes that
+        can be taken en passant only lead to -1 - index, see children.
+        '''
+        mat = self.mat
+        codes = mat.codes
+        pushed = index < 0
+        sqs, side = mat.decode(-1 - index if pushed else index)
+        mover = side ^ 1
+        occ = 0
+        for sq in sqs:
+            occ |= 1 << sq
+        found = set()
+        for j, code in enumerate(codes):
+            if code // 6 != mover:
+                continue
+            to = sqs[j]
+            if code % 6 == PAWN:
+                sources = 0
+                step = -8 if mover == WHITE else 8
+                rank_from = (to >> 3) + (-1 if mover == WHITE else 1)
+                if 1 <= rank_from <= 6 and not occ >> (to + step) & 1:
+                    if not pushed:
+                        sources |= 1 << (to + step)
+                    if (to >> 3 == (3 if mover == WHITE else 4) and not occ >> (to + 2 * step) & 1
+                            and pushed == bool(self.en_passant(codes, sqs, side, to))):
+                        sources |= 1 << (to + 2 * step)
+            elif pushed:
+                continue
+            else:
+                sources = _attacks(code, to, occ) & ~occ
+            for frm in bits(sources):
+                new_sqs = list(sqs)
+                new_sqs[j] = frm
+                found.add(mat.index(new_sqs, mover))
+        return found
+
+
+_generators = {}
+
+
+def _init_chunk(task):
+    '''Worker: initial pass over one index range'''
+    name, directory, lo, hi = task
+    key = (name, directory)
+    if key not in _generators:
+        _generators[key] = _generator(name, directory)
+    return _generators[key].init_range(lo, hi)
+
+
+def dependencies(name):
+    '''Materials that captures and promotions of a material lead to'''
+    codes = get_material(name).codes
+    found = set()
+    for i, code in enumerate(codes):
+        if code % 6 == KING:
+            continue
+        rest = codes[:i] + codes[i + 1:]
+        if len(rest) > 2:
+            found.add(material_name(rest)[0])
+        if code % 6 == PAWN:
+            for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                found.add(material_name(rest + [code - PAWN + kind])[0])
+    return sorted(found)
+
+
+def table_path(directory, name):
+    return os.path.join(directory, name + '.tbz')
+
+
+def write_table(path, values):
+    '''Write table values as zlib-compressed blocks, returns the file size'''
+    blocks = [zlib.compress(bytes(values[i:i + BLOCK]), 9) for i in range(0, len(values), BLOCK)]
+    offsets = array('Q', [0])
+    for block in blocks:
+        offsets.append(offsets[-1] + len(block))
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(values), BLOCK, len(blocks)))
+        f.write(offsets.tobytes())
+        for block in blocks:
+            f.write(block)
+    # complete files only, a reader never sees a partial table
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+class table_file:
+    '''Compressed table file
+    read through a read-only mmap, a probe decompresses the one block
+    holding the position and keeps recently used blocks.
+    Methods: get, values, close
+    '''
+
+    def __init__(self, path, cache_blocks=64):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.block, blocks = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("Not a tablebase file: " + path)
+        self.offsets = array('Q')
+        self.offsets.frombytes(self.map[HEADER.size:HEADER.size + 8 * (blocks + 1)])
+        self.data = HEADER.size + 8 * (blocks + 1)
+        self.cache = {}
+        self.cache_blocks = cache_blocks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def _block(self, b):
+        block = self.cache.get(b)
+        if block is None:
+            if len(self.cache) >= self.cache_blocks:
+                self.cache.pop(next(iter(self.cache)))
+            block = zlib.decompress(self.map[self.data + self.offsets[b]:self.data + self.offsets[b + 1]])
+            self.cache[b] = block
+        return block
+
+    def get(self, index):
+        '''Value of one position'''
+        return self._block(index // self.block)[index % self.block]
+
+    def values(self):
+        '''All values, decompressed'''
+        return b''.join(self._block_uncached(b) for b in range(len(self.offsets) - 1))
+
+    def _block_uncached(self, b):
+        return zlib.decompress(self.map[self.data + self.offsets[b]:self.data + self.offsets[b + 1]])
+
+
+def generate(name, directory=DEFAULT_DIR, workers=None, out=sys.stdout, chunks_per_worker=8):
+    '''Generate the table of a material set and the tables it depends on,
+    skipping tables already on disk. Returns a list of figure dicts,
+    one per table generated.
+
+    keyword arg:
+    name -- material, e.g. 'KQvK' or 'KBNK'
+    directory -- where the table files go
+    workers -- processes for the initial pass, 0 or 1 for this process only
+    '''
+    if 'v' not in name.lower():
+        # 'KBNK' -> white's pieces up to the second king
+        name = name.upper()
+        name = name[:name.index('K', 1)] + 'v' + name[name.index('K', 1):]
+    codes = get_material(name).codes
+    if len(codes) > MAX_PIECES:
+        raise ValueError("Tables are limited to {} pieces: {}".format(MAX_PIECES, name))
+    name = material_name(codes)[0]
+    figures = []
+    for dependency in dependencies(name):
+        figures += generate(dependency, directory, workers, out, chunks_per_worker)
+    path = table_path(directory, name)
+    if os.path.exists(path):
+        return figures
+    os.makedirs(directory, exist_ok=True)
+    gen = _generator(name, directory)
+    mat = gen.mat
+    total = 2 * mat.size
+    workers = multiprocessing.cpu_count() if workers is None else workers
+
+    start = time.perf_counter()
+    step = -(-total // max(1, workers * chunks_per_worker))
+    tasks = [(name, directory, lo, min(lo + step, total)) for lo in range(0, total, step)]
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            parts = pool.map(_init_chunk, tasks)
+    else:
+        parts = [_init_chunk(task) for task in tasks]
+    values = bytearray(b''.join(part[0] for part in parts))
+    remaining = bytearray(b''.join(part[1] for part in parts))
+    conversions = b''.join(part[2] for part in parts)
+    # positions right after a double pawn push that can be taken en passant,
+    # solved apart as the better for the opponent of the same position
+    # in the table and the best en passant capture
+    ep_values = {}
+    for part in parts:
+        ep_values.update(part[3])
+    ep_nodes = dict.fromkeys(ep_values, UNDECIDED)
+    del parts
+    init_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # seeds from conversions, decided at the level of their distance
+    buckets = {}
+    current = []
+    for index in range(total):
+        value = values[index]
+        if value == LOSS:
+            current.append(index)
+        elif value == UNDECIDED:
+            conversion = conversions[index]
+            if conversion == NONE:
+                continue
+            if conversion != DRAW and conversion < LOSS:
+                buckets.setdefault(conversion, []).append(index)
+            elif not remaining[index]:
+                if conversion == DRAW:
+                    values[index] = DRAW
+                else:
+                    buckets.setdefault(conversion - LOSS, []).append(index)
+    for index, conversion in ep_values.items():
+        if conversion != DRAW and conversion < LOSS:
+            buckets.setdefault(conversion, []).append(-1 - index)
+    depth = 0
+    while current or buckets:
+        following = []
+        # grows while iterating, with the en passant nodes decided at this depth
+        for index in current:
+            if index < 0:
+                lost = ep_nodes[-1 - index] >= LOSS
+            else:
+                lost = values[index] >= LOSS
+                if ep_nodes.get(index) == UNDECIDED:
+                    conversion = ep_values[index]
+                    if rank(values[index]) >= rank(conversion):
+                        ep_nodes[index] = values[index]
+                        current.append(-1 - index)
+                    elif conversion == DRAW:
+                        ep_nodes[index] = DRAW
+                    elif conversion >= LOSS:
+                        buckets.setdefault(conversion - LOSS, []).append(-1 - index)
+            for pred in gen.predecessors(index):
+                if values[pred] != UNDECIDED:
+                    continue
+                if lost:
+                    values[pred] = depth + 1
+                    following.append(pred)
+                    continue
+                conversion = conversions[pred]
+                # a conversion to a draw or a win keeps the position from losing
+                if conversion != NONE and conversion < LOSS:
+                    continue
+                remaining[pred] -= 1
+                if not remaining[pred]:
+                    level = depth + 1
+                    if conversion != NONE:
+                        level = max(level, conversion - LOSS)
+                    if level == depth + 1:
+                        values[pred] = LOSS + level
+                        following.append(pred)
+                    else:
+                        buckets.setdefault(level, []).append(pred)
+        depth += 1
+        if depth >= LOSS - 4:
+            raise ValueError("Distance to mate too long for the table format: " + name)
+        for index in buckets.pop(depth, ()):
+            if index < 0:
+                if ep_nodes[-1 - index] == UNDECIDED:
+                    ep_nodes[-1 - index] = depth if depth & 1 else LOSS + depth
+                    following.append(index)
+            elif values[index] == UNDECIDED:
+                values[index] = depth if depth & 1 else LOSS + depth
+                following.append(index)
+        current = following
+    values = bytes(DRAW if value == UNDECIDED else value for value in values)
+    solve_time = time.perf_counter() - start
+
+    size = write_table(path, values)
+    legal = total - values.count(INVALID)
+    wins = sum(1 for value in values if 0 < value < LOSS)
+    losses = sum(1 for value in values if LOSS <= value < INVALID)
+    longest = max([value for value in values if 0 < value < LOSS] or [0])
+    figure = {'name': name, 'positions': legal, 'indices': total, 'wins': wins,
+              'draws': legal - wins - losses, 'losses': losses,
+              'longest_mate': (longest + 1) // 2, 'init_s': init_time, 'solve_s': solve_time,
+              'raw_bytes': total, 'file_bytes': size}
+    print("{name:<8} {positions:>9} positions  win {wins:>8}  draw {draws:>8}  loss {losses:>8}  "
+          "longest mate {longest_mate:>2}  init {init_s:7.2f}s  solve {solve_s:7.2f}s  "
+          "{raw_bytes:>9} bytes -> {file_bytes:>8}".format(**figure), file=out)
+    return figures + [figure]
+
+
+class tablebase:
+    '''Endgame tablebase
+    probes the tables of a directory for positions with up to
+    MAX_PIECES pieces, without castling rights or a possible
+    en passant capture.
+    Methods: probe, close
+    '''
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self.tables = {}
+
+    def close(self):
+        for table in self.tables.values():
+            if table:
+                table.close()
+        self.tables = {}
+
+    def probe(self, pos):
+        '''Result of a position for the side to move
+        returns (1 win, 0 draw or -1 loss, plies to mate),
+        or None when no table covers the position.
+        '''
+        if pos.occupied.bit_count() > MAX_PIECES or pos.castling:
+            return None
+        side = pos.side
+        if pos.ep >= 0 and PAWN_ATTACKS[side ^ 1][pos.ep] & pos.bb[side * 6 + PAWN]:
+            return None
+        codes = []
+        sqs = []
+        for sq in bits(pos.occupied):
+            codes.append(pos.mailbox[sq])
+            sqs.append(sq)
+        if len(codes) == 2:
+            return 0, 0
+        mat, index = locate(codes, sqs, side)
+        if mat.name not in self.tables:
+            path = table_path(self.directory, mat.name)
+            self.tables[mat.name] = table_file(path) if os.path.exists(path) else None
+        table = self.tables[mat.name]
+        if table is None:
+            return None
+        value = table.get(index)
+        if value == INVALID:
+            return None
+        if value == DRAW:
+            return 0, 0
+        if value < LOSS:
+            return 1, value
+        return -1, value - LOSS
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Generate and probe endgame tablebases.")
+    parser.add_argument('-d', '--dir', default=DEFAULT_DIR, help="table directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    gen = commands.add_parser('generate', help="generate tables and the tables they depend on")
+    gen.add_argument('materials', nargs='+', help="material sets, e.g. KQK KRK KPK KBNK")
+    gen.add_argument('-j', '--workers', type=int, default=None,
+                     help="processes for the initial pass (default: CPU count)")
+    probe = commands.add_parser('probe', help="probe a position")
+    probe.add_argument('fen', help="FEN of the position")
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        for name in args.materials:
+            generate(name, args.dir, args.workers)
+    else:
+        pos = position().set_fen(args.fen)
+        start = time.perf_counter()
+        result = tablebase(args.dir).probe(pos)
+        elapsed = time.perf_counter() - start
+        if result is None:
+            print("not in the tablebase")
+        elif result[0] == 0:
+            print("draw")
+        else:
+            print("{} in {} plies ({:.3f} ms)".format('win' if result[0] > 0 else 'loss', result[1], elapsed * 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import os
+import random
+import pytest
+from Chess import position, legal_moves
+from archive import game_archive, default_archive, main, MAX_KEYFRAMES
+
+
+def random_moves(plies, seed=0):
+    rng = random.Random(seed)
+    pos = position().setup()
+    moves = []
+    for _ in range(plies):
+        choices = legal_moves(pos)
+        if not choices:
+            break
+        moves.append(rng.choice(choices))
+        pos.make_move(moves[-1])
+    return moves
+
+
+@pytest.mark.parametrize('keyframes', [0, -1, MAX_KEYFRAMES + 1])
+def test_rejects_keyframe_intervals(tmp_path, keyframes):
+    with pytest.raises(ValueError):
+        game_archive(str(tmp_path / 'games.cga'), keyframes)
+    assert not os.path.exists(tmp_path / 'games.cga')
+    with pytest.raises(SystemExit):
+        main(['import', str(tmp_path / 'games.cga'), '-', '--keyframes', str(keyframes)])
+
+
+@pytest.mark.parametrize('keyframes', [1, 7, MAX_KEYFRAMES])
+def test_position_at_every_ply(tmp_path, keyframes):
+    moves = random_moves(80)
+    with game_archive(str(tmp_path / 'games.cga'), keyframes) as archive:
+        number = archive.append({'White': 'a', 'Black': 'b'}, moves)
+    with game_archive(str(tmp_path / 'games.cga')) as archive:
+        assert archive.keyframes == keyframes
+        assert list(archive.moves(number)) == moves
+        pos = position().setup()
+        for ply, move in enumerate(moves):
+            assert archive.position_at(number, ply).fen() == pos.fen()
+            pos.make_move(move)
+
+
+def test_default_archive_in_data_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'name', 'posix')
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path))
+    path = default_archive()
+    assert path == os.path.join(str(tmp_path), 'terminal-chess', 'games.cga')
+    with game_archive(path) as archive:
+        archive.append({}, random_moves(4))
+    assert os.path.exists(path)
@@ -0,0 +1,22 @@
+import engine
+from Chess import position
+from engine import INF, MATE, evaluate
+
+
+def test_stand_pat_cutoff_generates_no_moves(monkeypatch):
+    search = engine.engine()
+    pos = position().set_fen('4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1')
+    search.search(pos, max_depth=1)
+
+    def no_moves(pos):
+        raise AssertionError("moves generated before the stand-pat cutoff")
+
+    monkeypatch.setattr(engine, 'legal_moves', no_moves)
+    assert search._quiesce(pos, -INF, -INF + 1, 1) == evaluate(pos)
+
+
+def test_checkmate_in_quiescence():
+    search = engine.engine()
+    pos = position().set_fen('rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3')
+    search.search(pos, max_depth=1)
+    assert search._quiesce(pos, -INF, INF, 1) == -MATE + 1
@@ -0,0 +1,46 @@
+import random
+import pytest
+from Chess import position, legal_moves
+from engine import evaluate, evaluate_full
+from perft import positions
+
+
+def walk(pos, depth):
+    '''Assert the incremental score equals a rescan after every make and unmake'''
+    assert pos.psqt == pos.compute_psqt(), pos.fen()
+    assert evaluate(pos) == evaluate_full(pos), pos.fen()
+    if not depth:
+        return 1
+    nodes = 1
+    for move in legal_moves(pos):
+        pos.make_move(move)
+        nodes += walk(pos, depth - 1)
+        pos.unmake_move()
+        assert pos.psqt == pos.compute_psqt(), pos.fen()
+    return nodes
+
+
+@pytest.mark.parametrize('name', list(positions))
+def test_perft_trees(name):
+    pos = position().set_fen(positions[name][0])
+    before = pos.psqt
+    assert walk(pos, 2) > 1
+    assert pos.psqt == before
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_games(seed):
+    rng = random.Random(seed)
+    pos = position().setup()
+    start = pos.psqt
+    for _ in range(200):
+        moves = legal_moves(pos)
+        if not moves:
+            break
+        pos.make_move(rng.choice(moves))
+        walk(pos, 1)
+    while pos.history:
+        pos.unmake_move()
+        assert pos.psqt == pos.compute_psqt(), pos.fen()
+    assert pos.psqt == start
+
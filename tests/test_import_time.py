@@ -0,0 +1,36 @@
+import os
+import sys
+import subprocess
+from cli import import_time, IMPORT_BUDGET_MS
+from Chess.bitboards import _load_tables
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Shared CI machines start interpreters slower, IMPORT_BUDGET_MS overrides either.
+BUDGET = float(os.environ.get('IMPORT_BUDGET_MS', 2 * IMPORT_BUDGET_MS if os.environ.get('CI') else IMPORT_BUDGET_MS))
+
+
+def test_import_time():
+    ms = import_time()
+    assert ms is not None
+    assert ms <= BUDGET, "import Chess took {:.2f} ms, budget {:.1f} ms".format(ms, BUDGET)
+
+
+def test_import_has_no_side_effects():
+    # a prompt at import would block on the closed standard input
+    done = subprocess.run([sys.executable, '-c', 'import Chess'], cwd=HERE, stdin=subprocess.DEVNULL,
+                          capture_output=True, text=True, timeout=30)
+    assert (done.returncode, done.stdout, done.stderr) == (0, '', '')
+
+
+def test_tables_cached_in_user_directory(tmp_path):
+    # a file where the package cache directory should be, as in a read-only install
+    (tmp_path / 'package').write_text('')
+    paths = (str(tmp_path / 'package' / 'tables'), str(tmp_path / 'user' / 'tables'))
+    builds = []
+    def build():
+        builds.append(1)
+        return (1, 2)
+    assert _load_tables(paths, build) == (1, 2)
+    assert os.path.exists(paths[1])
+    assert _load_tables(paths, build) == (1, 2)
+    assert len(builds) == 1
@@ -0,0 +1,67 @@
+from Chess import Game
+from index import position_index
+
+START = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+def pgn(games, first=0):
+    lines = []
+    for number, movetext in enumerate(games, first):
+        lines += ['[Event "game {}"]'.format(number), '[Result "*"]', '', movetext + ' *', '']
+    return lines
+
+
+def after(*moves):
+    game = Game()
+    game.replay(moves)
+    return game.position.fen()
+
+
+def test_query_pending_games(tmp_path):
+    with position_index(str(tmp_path)) as index:
+        index.add_pgn(pgn(['e4 e5', 'd4 d5']), workers=0)
+        hits = index.query(after('e4'))
+        assert [(hit['game'], hit['move'], hit['headers']['Event']) for hit in hits] == [(0, 'e5', 'game 0')]
+        index.flush()
+        index.add_pgn(pgn(['e4 c5'], 2), workers=0)
+        assert [hit['headers']['Event'] for hit in index.query(after('e4'))] == ['game 0', 'game 2']
+
+
+def test_limit_counts_games(tmp_path):
+    # the second game reaches the start position three times
+    with position_index(str(tmp_path)) as index:
+        index.add_pgn(pgn(['e4', 'Nf3 Nf6 Ng1 Ng8 Nf3 Nf6 Ng1 Ng8', 'd4']), workers=0)
+        hits = index.query(START, limit=2)
+        assert [hit['game'] for hit in hits] == [0, 1, 1, 1]
+
+
+def test_truncated_games(tmp_path):
+    with position_index(str(tmp_path)) as index:
+        index.add_pgn(pgn(['e4 e5 Ke3', 'e4 e5']), workers=0)
+        assert index.game(0)['Truncated'] == 'illegal move Ke3 at ply 3'
+        assert 'Truncated' not in index.game(1)
+        index.flush()
+        assert index.game(0)['Truncated'] == 'illegal move Ke3 at ply 3'
+
+
+def test_workers_match_in_process(tmp_path):
+    games = ['e4 e5 Nf3 Nc6', 'd4 d5 c4', 'e4 c5 Nf3', 'Nf3 d5 g3'] * 5
+    found = []
+    for workers in (0, 2):
+        with position_index(str(tmp_path / str(workers))) as index:
+            assert index.add_pgn(pgn(games), workers, chunk_size=3) == len(games)
+            index.flush()
+            found.append([index.query(after('e4'))] + [index.game(n) for n in range(len(games))])
+    assert found[0] == found[1]
+
+
+def test_compaction_keeps_large_segments(tmp_path):
+    with position_index(str(tmp_path), flush_entries=1, max_segments=4) as index:
+        index.add_pgn(pgn(['e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7']), workers=0)
+        index.compact()
+        large = index.segments[0].path
+        for _ in range(12):
+            index.add_pgn(pgn(['d4']), workers=0)
+            assert len(index.segments) <= 4
+        assert large in [seg.path for seg in index.segments]
+        assert len(index.query(after('d4'))) == 12
@@ -0,0 +1,30 @@
+import io
+from Chess import BISHOP, Game, parse_move, parse_notation, san
+from notation import pgn_corpus, random_corpus, replay, round_trip, benchmark
+
+PGN = ['[Event "a"]', '', '1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 1/2-1/2', '',
+       '[Event "b"]', '', '1. d4 d5 2. c4 dxc4 *', '']
+
+
+def test_pgn_corpus_replays_twice():
+    corpus = pgn_corpus(PGN)
+    first, second = replay(corpus)[1], replay(corpus)[1]
+    assert [len(ints) for _, ints in first] == [len(ints) for _, ints in second] == [6, 4]
+
+
+def test_benchmark_rates():
+    assert all(rate > 0 for rate in benchmark(pgn_corpus(PGN), out=io.StringIO()))
+    assert benchmark([], out=io.StringIO()) == (0.0, 0.0, 0.0)
+
+
+def test_round_trip():
+    assert round_trip(random_corpus(5, seed=1, max_plies=40), out=io.StringIO()) > 0
+
+
+def test_lower_case_pawn_capture_promotes():
+    game = Game('1n5k/P7/8/8/8/8/8/K7 w - - 0 1')
+    for text in ('axb8=q', 'axb8q', 'a7b8n'):
+        assert parse_move(game.position, text, case_sensitive=False)
+    game = Game('n6k/1P6/8/8/8/8/8/K7 w - - 0 1')
+    assert san(game.position, parse_move(game.position, 'bxa8=q', case_sensitive=False)) == 'bxa8=Q+'
+    assert parse_notation('bxa3', case_sensitive=False)[0] == BISHOP
@@ -0,0 +1,28 @@
+import pytest
+from Chess import position
+from perft import positions, perft, perft_hashed
+from transposition import transposition_table
+
+# Largest expected count checked, deeper levels are left to perft.py --verify.
+MAX_NODES = 10000
+
+cases = [(name, depth, count) for name, (fen, expected) in positions.items()
+         for depth, count in enumerate(expected, 1) if count <= MAX_NODES]
+
+
+@pytest.mark.parametrize('name, depth, count', cases)
+def test_perft(name, depth, count):
+    assert perft(position().set_fen(positions[name][0]), depth) == count
+
+
+@pytest.mark.parametrize('name', list(positions))
+def test_perft_hashed(name):
+    fen, expected = positions[name]
+    assert perft_hashed(position().set_fen(fen), 2, transposition_table(1)) == expected[1]
+
+
+def test_perft_restores_position():
+    pos = position().set_fen(positions['kiwipete'][0])
+    fen, key = pos.fen(), pos.key
+    perft(pos, 2)
+    assert (pos.fen(), pos.key, pos.history) == (fen, key, [])
@@ -0,0 +1,47 @@
+import pytest
+import pgn
+from pgn import pipeline, validate_game
+
+GAME = ['[White "a"]', '[Black "b"]', '[Result "1-0"]', '',
+        '1. f3 e5 2. g4 Qh4# 1-0', '']
+
+
+def lines(games, fail=False):
+    for _ in range(games):
+        yield from GAME
+    if fail:
+        raise OSError("read error")
+
+
+def test_result_keys_on_every_path():
+    good = validate_game((1, {'White': 'a', 'Black': 'b'}, 'e4 e5'))
+    bad_fen = validate_game((2, {'White': 'a', 'Black': 'b', 'FEN': 'not a fen'}, 'e4'))
+    illegal = validate_game((3, {}, 'e4 e4'))
+    assert set(good) == set(bad_fen) == set(illegal)
+    assert bad_fen['white'] == 'a' and bad_fen['illegal'] is not None
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_pipeline_in_order(workers):
+    run = pipeline(workers, chunk_size=3)
+    found = list(run.run(lines(20)))
+    assert [result['id'] for result in found] == list(range(1, 21))
+    assert all(result['plies'] == 4 and result['illegal'] is None for result in found)
+
+
+def test_pipeline_reraises_reader_error():
+    run = pipeline(2, chunk_size=3)
+    with pytest.raises(OSError, match="read error"):
+        list(run.run(lines(20, fail=True)))
+
+
+def _dying_worker(tasks, done):
+    tasks.get()
+    raise SystemExit(3)
+
+
+def test_pipeline_reports_dead_worker(monkeypatch):
+    monkeypatch.setattr(pgn, '_worker', _dying_worker)
+    run = pipeline(1, chunk_size=3)
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        list(run.run(lines(20)))
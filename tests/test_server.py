@@ -0,0 +1,31 @@
+import io
+import asyncio
+import pytest
+import loadtest
+from server import game_server
+
+
+async def play(sessions, plies, seed=0):
+    server = game_server()
+    listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        moves = (await asyncio.wait_for(
+            loadtest.run('127.0.0.1', port, sessions, plies, seed, out=io.StringIO()), 60))[0]
+    return server, moves
+
+
+@pytest.mark.parametrize('plies', [20, 21])
+def test_scripted_sessions_finish(plies):
+    server, moves = asyncio.run(play(4, plies))
+    scripts = loadtest.scripts(4, plies)
+    assert moves == server.moves == sum(len(script) for script, _ in scripts)
+    assert server.games == {}
+
+
+def test_sessions_ended_by_the_rules():
+    scripts = loadtest.scripts(8, 400, seed=1)
+    assert any(ended for _, ended in scripts)
+    server, moves = asyncio.run(play(8, 400, seed=1))
+    assert moves == server.moves == sum(len(script) for script, _ in scripts)
+    assert server.games == {}
@@ -0,0 +1,19 @@
+from tablebase import _generator, DRAW
+
+# white Kh1 Pe2, black Ka8 Pd4: e2-e4 can be taken en passant, e2-e3 cannot
+KINGS_AND_PAWNS = [7, 56, 12, 27]
+
+
+def test_double_push_allows_en_passant(tmp_path):
+    gen = _generator('KPvKP', str(tmp_path))
+    # the only conversion is d4xe3 en passant, into KvKP
+    gen._child_value = lambda codes, sqs, side: DRAW
+    mat = gen.mat
+    parent = mat.index(KINGS_AND_PAWNS, 0)
+    pushed = mat.index([7, 56, 28, 27], 1)
+    inside = gen.children(KINGS_AND_PAWNS, 0)[0]
+    assert -1 - pushed in inside and pushed not in inside
+    assert mat.index([7, 56, 20, 27], 1) in inside
+    assert gen.ep_values == {pushed: DRAW}
+    assert parent in gen.predecessors(-1 - pushed)
+    assert parent not in gen.predecessors(pushed)
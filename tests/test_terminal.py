@@ -0,0 +1,18 @@
+from Chess import chess
+
+STALEMATE = '7k/5Q2/6K1/8/8/8/8/8 b - - 0 1'
+
+
+def game(fen=None):
+    return chess('a', 'white', 'b', 'black', fen=fen)
+
+
+def test_stalemate():
+    # white has just moved, black is not in check and has no move
+    assert game(STALEMATE).stalemate('white') is True
+
+
+def test_start_is_not_stalemate():
+    board = game()
+    assert board.stalemate('white') is False
+    assert board.stalemate('black') is False
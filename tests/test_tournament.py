@@ -0,0 +1,17 @@
+import io
+import pytest
+from tournament import run, main, RULES
+
+
+def test_rejects_single_repetition():
+    with pytest.raises(ValueError):
+        run(['random', 'greedy'], 2, workers=0, rules=dict(RULES, repetition=1), report=io.StringIO())
+    with pytest.raises(SystemExit):
+        main(['random', 'greedy', '--repetition', '1'])
+
+
+@pytest.mark.parametrize('repetition', [0, 2])
+def test_repetition_rules_play(repetition):
+    summary = run(['random', 'greedy'], 2, workers=0, rules=dict(RULES, repetition=repetition, max_plies=60),
+                  report=io.StringIO())
+    assert summary['games'] == 2 and not summary['errors']
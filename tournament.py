@@ -0,0 +1,394 @@
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import importlib
+import traceback
+import multiprocessing
+from itertools import combinations
+from Chess import (Game, player, legal_moves, has_legal_move, parse_move, uci,
+                   IllegalMoveError, CAPTURE, EP_CAPTURE, PROMOTION, PAWN, KNIGHT, QUEEN)
+from engine import engine, values
+# References:
+# https://www.chessprogramming.org/Match_Statistics
+# https://en.wikipedia.org/wiki/Elo_rating_system#Mathematical_details
+# https://docs.python.org/3/library/multiprocessing.html#multiprocessing.pool.Pool.imap_unordered
+
+# Draw rules and the move cap, adjudicated as a draw.
+RULES = {'max_plies': 300, 'repetition': 3, 'fifty': 100, 'insufficient': True}
+# z of a two-sided 95% confidence interval
+Z95 = 1.96
+
+
+def random_move(pos, moves, rng):
+    '''Any legal move'''
+    return rng.choice(moves)
+
+
+def greedy_capture(pos, moves, rng):
+    '''The capture or promotion winning the most material, else any move'''
+    mailbox = pos.mailbox
+    best, gain = [], 0
+    for move in moves:
+        flag = move >> 12
+        value = 0
+        if flag == EP_CAPTURE:
+            value = values[PAWN]
+        elif flag & CAPTURE:
+            value = values[mailbox[move >> 6 & 63] % 6]
+        if flag & PROMOTION:
+            value += values[QUEEN] - values[PAWN]
+        if value > gain:
+            best, gain = [move], value
+        elif value == gain and value:
+            best.append(move)
+    return rng.choice(best or moves)
+
+
+def scripted(script):
+    '''Policy playing the moves of a script, SAN or UCI, in order
+    while they are legal, then random moves.
+
+    keyword arg:
+    script -- comma separated moves, e.g. 'e4,Nf3,Bc4'
+    '''
+    texts = [text for text in script.split(',') if text]
+
+    def select(pos, moves, rng):
+        while texts:
+            try:
+                return parse_move(pos, texts.pop(0))
+            except IllegalMoveError:
+                continue
+        return rng.choice(moves)
+    return select
+
+
+def searching(depth):
+    '''Policy searching to a fixed depth with the engine'''
+    searcher = engine(hash_mb=1, max_depth=int(depth or 1))
+
+    def select(pos, moves, rng):
+        return searcher.search(pos)
+    return select
+
+
+# Policies by name: name -> factory(argument) returning select(pos, moves, rng).
+# A spec is 'name' or 'name:argument'; any other dotted name is imported,
+# 'module.function' being a select function itself.
+POLICIES = {
+    'random': lambda arg: random_move,
+    'greedy': lambda arg: greedy_capture,
+    'script': scripted,
+    'engine': searching,
+}
+
+
+class policy:
+    '''Move-selection policy
+    a select(pos, moves, rng) callback behind the engine interface
+    of player, so the chess class could drive it as well as a search engine.
+    Methods: choose
+    '''
+
+    def __init__(self, spec, rng):
+        '''Policy of a spec, e.g. 'random', 'engine:2', 'mymodule.choose'
+
+        keyword arg:
+        spec -- policy name with an optional argument after a colon
+        rng -- random.Random the policy draws from
+        '''
+        name, _, arg = spec.partition(':')
+        if name in POLICIES:
+            self.select = POLICIES[name](arg)
+        elif '.' in name:
+            module, _, attr = name.rpartition('.')
+            self.select = getattr(importlib.import_module(module), attr)
+        else:
+            raise ValueError("Unknown policy: " + spec)
+        self.spec = spec
+        self.rng = rng
+        self.info = None
+
+    def choose(self, pos):
+        '''The policy's move in a position with legal moves'''
+        return self.select(pos, legal_moves(pos), self.rng)
+
+
+def outcome(game, rules, plies):
+    '''Result of a game under the configured draw rules, None while it goes on.
+    Returns a (result, reason) tuple as Game.outcome.
+    '''
+    pos = game.position
+    if not has_legal_move(pos):
+        return game.outcome()
+    if rules['repetition'] and pos.repetitions() >= rules['repetition'] - 1:
+        return ('1/2-1/2', 'repetition')
+    if rules['fifty'] and pos.halfmove >= rules['fifty']:
+        return ('1/2-1/2', 'fifty-move rule')
+    if rules['insufficient'] and game.insufficient_material():
+        return ('1/2-1/2', 'insufficient material')
+    if plies >= rules['max_plies']:
+        return ('1/2-1/2', 'move cap')
+    return None
+
+
+def verify(pos, move):
+    '''Cross-check the rules engine on a move about to be played:
+    the legality tests, move encoding, the incremental Zobrist key and score,
+    raising AssertionError on any disagreement.
+    '''
+    if not pos.is_legal(move):
+        raise AssertionError("is_legal rejects generated move " + uci(move))
+    promotion = (move >> 12 & 3) + KNIGHT if move >> 12 & PROMOTION else QUEEN
+    if pos.encode_move(move & 63, move >> 6 & 63, promotion) != move:
+        raise AssertionError("encode_move disagrees on " + uci(move))
+    key, mailbox = pos.key, list(pos.mailbox)
+    pos.make_move(move)
+    if pos.key != pos.compute_key():
+        raise AssertionError("incremental key differs after " + uci(move))
+    if pos.psqt != pos.compute_psqt():
+        raise AssertionError("incremental evaluation differs after " + uci(move))
+    if has_legal_move(pos) != bool(legal_moves(pos)):
+        raise AssertionError("has_legal_move disagrees after " + uci(move))
+    pos.unmake_move()
+    if pos.key != key or pos.mailbox != mailbox:
+        raise AssertionError("unmake_move does not restore the position after " + uci(move))
+
+
+def play_game(task):
+    '''Play one game, returns its record dict: the task, result and reason,
+    plies, UCI moves, seconds and CPU seconds, and error with traceback
+    when the game crashed or a policy played an illegal move.
+    The game depends only on the task, so a record replays exactly.
+
+    keyword arg:
+    task -- dict of number, seed, pair, round, white, black, opening, rules, verify
+    '''
+    record = dict(task)
+    cpu, start = time.process_time(), time.perf_counter()
+    # both games of a colour-swapped pair start from the same opening
+    opening_rng = random.Random('{}:{}:{}'.format(task['seed'], task['pair'], task['round']))
+    rng = random.Random('{}:{}'.format(task['seed'], task['number']))
+    game = Game()
+    pos = game.position
+    moves = []
+    try:
+        players = (player(task['white'], 'white', policy(task['white'], rng)),
+                   player(task['black'], 'black', policy(task['black'], rng)))
+        result = None
+        while result is None:
+            result = outcome(game, task['rules'], len(moves))
+            if result is not None:
+                break
+            legal = legal_moves(pos)
+            if len(moves) < task['opening']:
+                move = opening_rng.choice(legal)
+            else:
+                mover = players[pos.side]
+                clock = time.perf_counter()
+                move = mover.engine.choose(pos)
+                mover.time_elapsed += time.perf_counter() - clock
+                if move not in legal:
+                    raise IllegalMoveError("{} played illegal move {} at ply {}".format(
+                        mover.player_name, uci(move) if isinstance(move, int) else move, len(moves)))
+            if task['verify']:
+                verify(pos, move)
+            pos.make_move(move)
+            moves.append(move)
+        record['result'], record['reason'] = result
+    except Exception as e:
+        record['result'], record['reason'] = '*', 'error'
+        record['error'] = '{}: {}'.format(type(e).__name__, e)
+        record['traceback'] = traceback.format_exc()
+        record['fen'] = pos.fen()
+    record['plies'] = len(moves)
+    record['moves'] = ' '.join(uci(move) for move in moves)
+    record['seconds'] = time.perf_counter() - start
+    record['cpu'] = time.process_time() - cpu
+    return record
+
+
+def elo(wins, draws, losses):
+    '''Elo difference of a score with its 95% confidence interval,
+    from the normal approximation of the mean score per game.
+    Returns (elo, low, high), infinite when every game was won or lost.
+    '''
+    games = wins + draws + losses
+    if not games:
+        return 0.0, -math.inf, math.inf
+    score = (wins + draws / 2) / games
+    deviation = math.sqrt((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2
+                           + losses * score ** 2) / games / games)
+
+    def rating(s):
+        if s <= 0:
+            return -math.inf
+        if s >= 1:
+            return math.inf
+        return -400 * math.log10(1 / s - 1)
+    return rating(score), rating(score - Z95 * deviation), rating(score + Z95 * deviation)
+
+
+def schedule(players, games, seed=0, opening=0, rules=None, verify=False):
+    '''Tasks of a round robin: games per pair of players, colours
+    alternating so that each opening is played from both sides.
+    '''
+    number = 0
+    for pair, (first, second) in enumerate(combinations(players, 2)):
+        for i in range(games):
+            white, black = (first, second) if i % 2 == 0 else (second, first)
+            yield {'number': number, 'seed': seed, 'pair': pair, 'round': i // 2, 'white': white, 'black': black,
+                   'opening': opening, 'rules': rules or RULES, 'verify': verify}
+            number += 1
+
+
+def run(players, games, workers=None, seed=0, opening=0, rules=None, verify=False, out=None, report=sys.stdout):
+    '''Play a round robin across a process pool, streaming the records
+    as JSON lines as the games finish, and report the results.
+    Returns the summary dict: per pair wins, draws and losses of the first
+    player, plies, CPU seconds, wall seconds and the records with errors.
+
+    keyword arg:
+    players -- policy specs, at least two
+    games -- games per pair of players
+    workers -- processes, 0 or 1 plays in this process (default: CPU count)
+    seed -- base seed, every game's seed is derived from it and its number
+    opening -- random plies played before the policies take over
+    rules -- draw rules and move cap, see RULES
+    verify -- cross-check the rules engine on every move
+    out -- text stream the game records are written to
+    '''
+    repetition = (rules or RULES)['repetition']
+    if repetition and repetition < 2:
+        # the current position has always occurred once
+        raise ValueError("Repetition draws need at least 2 occurrences, or 0 for none: {}".format(repetition))
+    tasks = schedule(players, games, seed, opening, rules, verify)
+    pairs = {pair: [first, second, 0, 0, 0] for pair, (first, second) in enumerate(combinations(players, 2))}
+    summary = {'pairs': pairs, 'games': 0, 'plies': 0, 'cpu': 0.0, 'errors': []}
+    workers = multiprocessing.cpu_count() if workers is None else workers
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        records = pool.imap_unordered(play_game, tasks, chunksize=4) if pool else map(play_game, tasks)
+        for record in records:
+            if out is not None:
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+            summary['games'] += 1
+            summary['plies'] += record['plies']
+            summary['cpu'] += record['cpu']
+            if record['result'] == '*':
+                summary['errors'].append(record)
+                continue
+            tally = pairs[record['pair']]
+            first_white = record['white'] == tally[0]
+            if record['result'] == '1/2-1/2':
+                tally[3] += 1
+            elif (record['result'] == '1-0') == first_white:
+                tally[2] += 1
+            else:
+                tally[4] += 1
+    finally:
+        if pool is not None:
+            pool.terminate()
+    summary['seconds'] = time.perf_counter() - start
+    summary['workers'] = max(workers, 1)
+    if report is not None:
+        print(format_summary(summary), file=report)
+    return summary
+
+
+def format_summary(summary):
+    '''Results table, Elo of the first player of each pair, game length,
+    throughput and the reproducible errors.
+    '''
+    lines = ["{:<14} {:<14} {:>6} {:>6} {:>6} {:>8}  {}".format(
+             'player', 'opponent', 'wins', 'draws', 'losses', 'elo', '95% interval')]
+    for first, second, wins, draws, losses in summary['pairs'].values():
+        rating, low, high = elo(wins, draws, losses)
+        lines.append("{:<14} {:<14} {:>6} {:>6} {:>6} {:>+8.0f}  [{:+.0f}, {:+.0f}]".format(
+                     first, second, wins, draws, losses, rating, low, high))
+    games, plies = summary['games'], summary['plies']
+    lines.append("{} games, {:.1f} plies per game".format(games, plies / games if games else 0.0))
+    lines.append("{:.0f} plies/s per core, {:.0f} plies/s on {} workers".format(
+                 plies / summary['cpu'] if summary['cpu'] else 0.0,
+                 plies / summary['seconds'] if summary['seconds'] else 0.0, summary['workers']))
+    for record in summary['errors']:
+        lines.append("game {} (seed {}, {} - {}) at ply {}: {}".format(
+                     record['number'], record['seed'], record['white'], record['black'],
+                     record['plies'], record['error']))
+    return '\n'.join(lines)
+
+
+def reproduce(path, number):
+    '''Replay game number of a records file in this process,
+    returns (original record, replayed record).
+    '''
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record['number'] == number:
+                break
+        else:
+            raise ValueError("No game {} in {}".format(number, path))
+    task = {name: record[name] for name in ('number', 'seed', 'pair', 'round', 'white', 'black',
+                                          'opening', 'rules', 'verify')}
+    return record, play_game(task)
+
+
+def _repetition(text):
+    '''argparse type of --repetition: 0, or 2 and more'''
+    value = int(text)
+    if value and value < 2:
+        raise argparse.ArgumentTypeError("must be 0 or at least 2")
+    return value
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description="Play move-selection policies against each other across processes.")
+    parser.add_argument('players', nargs='*', default=['random', 'greedy'],
+                        help="policies: random, greedy, engine:DEPTH, script:e4,Nf3,... or module.function")
+    parser.add_argument('-n', '--games', type=int, default=100, help="games per pair of players")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes, 0 to play in this process (default: CPU count)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--opening', type=int, default=0, metavar='PLIES', help="random opening plies")
+    parser.add_argument('--max-plies', type=int, default=RULES['max_plies'], help="move cap, adjudicated a draw")
+    parser.add_argument('--repetition', type=_repetition, default=RULES['repetition'],
+                        help="occurrences of a position that draw, 0 for no repetition draws")
+    parser.add_argument('--fifty', type=int, default=RULES['fifty'],
+                        help="halfmoves without a capture or pawn move that draw, 0 to play on")
+    parser.add_argument('--play-insufficient', action='store_true', help="play on with insufficient material")
+    parser.add_argument('--verify', action='store_true', help="cross-check the rules engine on every move")
+    parser.add_argument('-o', '--out', help="write the game records to this JSON lines file")
+    parser.add_argument('--reproduce', metavar='RECORDS', help="replay a game of a records file")
+    parser.add_argument('--game', type=int, default=0, help="game number to replay")
+    args = parser.parse_args(argv)
+    if args.reproduce:
+        record, replayed = reproduce(args.reproduce, args.game)
+        print(replayed['moves'])
+        print("{} {} after {} plies".format(replayed['result'], replayed['reason'], replayed['plies']))
+        if replayed.get('traceback'):
+            print(replayed['traceback'], end='')
+        same = all(record.get(name) == replayed.get(name) for name in ('moves', 'result', 'error'))
+        print("same as recorded" if same else "differs from the record")
+        return 0 if same else 1
+    if len(args.players) < 2:
+        parser.error("at least two players are needed")
+    rules = {'max_plies': args.max_plies, 'repetition': args.repetition, 'fifty': args.fifty,
+             'insufficient': not args.play_insufficient}
+    out = open(args.out, 'a') if args.out else None
+    try:
+        summary = run(args.players, args.games, args.workers, args.seed, args.opening, rules, args.verify, out)
+    finally:
+        if out is not None:
+            out.close()
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
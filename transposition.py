@@ -0,0 +1,118 @@
+from array import array
+# References:
+# https://docs.python.org/3/library/array.html
+# https://www.chessprogramming.org/Transposition_Table
+
+# Bound flags of a stored score.
+EXACT, LOWER, UPPER = 0, 1, 2
+# Bytes per bucket: two slots of a 64-bit key and a 64-bit data word.
+BUCKET_BYTES = 32
+# Scores are stored offset into an unsigned 32-bit field.
+SCORE_OFFSET = 1 << 31
+
+
+class transposition_table:
+    '''Transposition table
+    fixed-size hash table of search results keyed by Zobrist key.
+    Each bucket has a depth-preferred slot, only replaced by a result
+    of equal or greater depth or one from an older search, and an
+    always-replace slot that takes everything else.
+    Data words pack: move (16 bits) | depth (8) | flag (2) | age (6) | score (32).
+    Methods: probe, store, new_search, clear, hashfull, stats
+    '''
+
+    def __init__(self, megabytes=16):
+        '''Allocate the table within a memory budget
+
+        keyword arg:
+        megabytes -- memory budget, rounded down to a power of two of buckets
+        '''
+        buckets = max(1, int(megabytes * (1 << 20)) // BUCKET_BYTES)
+        self.buckets = 1 << (buckets.bit_length() - 1)
+        self.mask = self.buckets - 1
+        self.keys = array('Q', bytes(16 * self.buckets))
+        self.data = array('Q', bytes(16 * self.buckets))
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def probe(self, key):
+        '''Look up a position
+        returns (move, depth, flag, score), or None on a miss.
+        '''
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        if keys[slot] != key:
+            slot += 1
+            if keys[slot] != key:
+                self.misses += 1
+                # the bucket holds other positions mapping to the same index
+                if self.data[slot - 1] or self.data[slot]:
+                    self.collisions += 1
+                return None
+        data = self.data[slot]
+        if not data:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return (data & 0xFFFF, data >> 16 & 0xFF, data >> 24 & 3,
+                (data >> 32) - SCORE_OFFSET)
+
+    def store(self, key, depth, flag, score, move=0):
+        '''Store a result under the bucket's replacement policy
+
+        keyword arg:
+        key -- Zobrist key of the position
+        depth -- remaining depth the result was searched to
+        flag -- EXACT, LOWER or UPPER bound
+        score -- score of the position, a signed 32-bit int
+        move -- best move found, 0 if none
+        '''
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data
+        preferred = data[slot]
+        if keys[slot] == key or not preferred or depth >= (preferred >> 16 & 0xFF) \
+                or (preferred >> 26 & 0x3F) != self.age:
+            # keep the best move of an earlier search of the same position
+            if not move and keys[slot] == key:
+                move = preferred & 0xFFFF
+        else:
+            slot += 1
+        if data[slot] and keys[slot] != key:
+            self.overwrites += 1
+        keys[slot] = key
+        data[slot] = (move | min(depth, 0xFF) << 16 | flag << 24 | self.age << 26
+                      | (score + SCORE_OFFSET) << 32)
+        self.stores += 1
+
+    def new_search(self):
+        '''Age the table so that entries of earlier searches are replaced first'''
+        self.age = (self.age + 1) & 0x3F
+
+    def clear(self):
+        '''Empty the table and reset the counters'''
+        self.__init__(self.buckets * BUCKET_BYTES / (1 << 20))
+
+    def hashfull(self, sample=1000):
+        '''Permille of slots in use, from the first buckets'''
+        sample = min(sample, self.buckets)
+        used = sum(1 for i in range(2 * sample) if self.data[i])
+        return used * 1000 // (2 * sample)
+
+    def stats(self):
+        '''Counters as a dict'''
+        probes = self.hits + self.misses
+        return {'buckets': self.buckets,
+                'megabytes': self.buckets * BUCKET_BYTES / (1 << 20),
+                'probes': probes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'collisions': self.collisions,
+                'hit_rate': self.hits / probes if probes else 0.0,
+                'stores': self.stores,
+                'overwrites': self.overwrites,
+                'hashfull': self.hashfull()}